@@ -0,0 +1,124 @@
+# bench_embedder.py - Compare the torch, ONNX and NumPy embedding backends
+# Each backend runs in a fresh subprocess so import time and resident
+# memory are not shared. It reports:
+# - import time of the backend's libraries and model load time
+# - RSS after loading
+# - single-query latency (p50/p99) and batch throughput
+# - the largest difference from the torch vectors
+# The ONNX and NumPy backends read the export from scripts/export_onnx.py.
+#
+#   python bench_embedder.py
+#   python bench_embedder.py --backends onnx numpy --queries 500
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+DEFAULT_MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "models", "minilm")
+DEFAULT_DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "dataset.json")
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def worker(args):
+    """Runs inside the subprocess for one backend and prints a JSON result."""
+    sys.path.append(SRC_DIR)
+    start = time.perf_counter()
+    if args.worker == "torch":
+        import sentence_transformers  # noqa: F401
+    else:
+        import lite_encoder  # noqa: F401
+    import_s = time.perf_counter() - start
+
+    from embedder import load_model
+    start = time.perf_counter()
+    model = load_model(args.model, args.worker, args.model_dir, args.threads)
+    load_s = time.perf_counter() - start
+
+    with open(args.dataset, "r", encoding="utf-8") as f:
+        texts = [item["instruction"] for item in json.load(f)][:args.queries]
+
+    def encode(batch):
+        return np.asarray(model.encode(batch, batch_size=len(batch), normalize_embeddings=True), dtype=np.float32)
+
+    encode(texts[:4])  # warm-up
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        encode([text])
+        latencies.append((time.perf_counter() - start) * 1000)
+    start = time.perf_counter()
+    vectors = np.concatenate([encode(texts[i:i + 32]) for i in range(0, len(texts), 32)])
+    batch_s = time.perf_counter() - start
+
+    np.save(args.vectors_out, vectors)
+    print(json.dumps({
+        "import_s": import_s,
+        "load_s": load_s,
+        "rss_mb": rss_mb(),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "batch_qps": len(texts) / batch_s,
+        "torch_loaded": "torch" in sys.modules,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends.")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "numpy"])
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Model for the torch backend")
+    parser.add_argument("--model-dir", default=DEFAULT_MODEL_DIR, help="Export for the onnx/numpy backends")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--vectors-out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args)
+        return
+
+    workdir = tempfile.mkdtemp(prefix="bench_embedder_")
+    results = {}
+    for backend in args.backends:
+        out = os.path.join(workdir, f"{backend}.npy")
+        command = [
+            sys.executable, os.path.abspath(__file__), "--worker", backend, "--vectors-out", out,
+            "--model", args.model, "--model-dir", args.model_dir, "--dataset", args.dataset,
+            "--queries", str(args.queries),
+        ] + (["--threads", str(args.threads)] if args.threads else [])
+        proc = subprocess.run(command, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"{backend}: failed\n{proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else ''}")
+            continue
+        results[backend] = json.loads(proc.stdout.strip().splitlines()[-1])
+        results[backend]["vectors"] = np.load(out)
+
+    reference = results.get("torch", {}).get("vectors")
+    print(f"{'backend':<8} {'import_s':>9} {'load_s':>7} {'rss_mb':>7} {'p50_ms':>7} {'p99_ms':>7} {'batch_qps':>10} {'torch':>6} {'max_diff':>9}")
+    for backend, r in results.items():
+        diff = float(np.abs(r["vectors"] - reference).max()) if reference is not None else float("nan")
+        print(f"{backend:<8} {r['import_s']:>9.2f} {r['load_s']:>7.2f} {r['rss_mb']:>7.0f} {r['p50_ms']:>7.2f} "
+              f"{r['p99_ms']:>7.2f} {r['batch_qps']:>10.0f} {str(r['torch_loaded']):>6} {diff:>9.2e}")
+
+
+if __name__ == "__main__":
+    main()
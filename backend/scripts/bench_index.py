@@ -0,0 +1,104 @@
+# bench_index.py - Latency and recall of the matcher's search indexes
+# Builds synthetic datasets with generate_dataset.py, then compares the
+# exact, IVF and (if installed) HNSW indexes at several sizes. Recall@1
+# counts a hit when the returned row has the same answer as the exact
+# top-1, since paraphrases of one intent are equally good matches.
+#
+#   python bench_index.py                      # MiniLM embeddings, 1k/10k/100k
+#   python bench_index.py --vectors random     # offline, no model download
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from generate_dataset import generate_dataset
+from index import build_index, hnswlib
+
+
+def synthetic_vectors(size, dim, queries, rng):
+    data = rng.standard_normal((size, dim)).astype(np.float32)
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    # Queries are noisy copies of dataset rows, like paraphrased questions
+    rows = rng.choice(size, queries, replace=False)
+    q = data[rows] + 0.05 * rng.standard_normal((queries, dim)).astype(np.float32)
+    q /= np.linalg.norm(q, axis=1, keepdims=True)
+    # Every row is its own answer
+    return data, q, np.arange(size)
+
+
+def model_vectors(size, queries, rng, cache_dir):
+    from embedder import EmbeddingService
+    from embedding_cache import EmbeddingCache
+
+    path = os.path.join(tempfile.gettempdir(), f"bench_dataset_{size}.json")
+    data = generate_dataset(size=size, output_path=path)
+    instructions = [item["instruction"] for item in data]
+    answer_ids = {}
+    answers = np.array([answer_ids.setdefault(item["output"], len(answer_ids)) for item in data])
+
+    embedder = EmbeddingService()
+    cache = EmbeddingCache(cache_dir, embedder.model_name, name=f"bench_{size}")
+    vectors = np.asarray(cache.load(instructions, embedder.encode))
+
+    # Queries are lightly rephrased dataset instructions
+    rows = rng.choice(len(instructions), queries, replace=False)
+    texts = [instructions[r].lower().rstrip("?.").replace("what is", "tell me") for r in rows]
+    return vectors, embedder.encode(texts), answers
+
+
+def run(index, queries, truth, answers):
+    latencies = []
+    hits = 0
+    for q, expected in zip(queries, truth):
+        start = time.perf_counter()
+        rows, _ = index.search(q, k=1)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += int(len(rows) > 0 and answers[rows[0]] == expected)
+    latencies = np.array(latencies)
+    return np.percentile(latencies, 50), np.percentile(latencies, 99), hits / len(truth)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark matcher index backends.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--vectors", choices=["model", "random"], default="model")
+    parser.add_argument("--dim", type=int, default=384, help="Dimension for --vectors random")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[0, 8, 32], help="IVF lists to scan (0: the index default)")
+    parser.add_argument("--ef", type=int, nargs="+", default=[32, 128])
+    parser.add_argument("--cache-dir", default=os.path.join(tempfile.gettempdir(), "bench_embeddings"))
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'size':>8} {'index':<14} {'build_s':>8} {'p50_ms':>8} {'p99_ms':>8} {'recall@1':>9}")
+    for size in args.sizes:
+        if args.vectors == "random":
+            vectors, queries, answers = synthetic_vectors(size, args.dim, args.queries, rng)
+        else:
+            vectors, queries, answers = model_vectors(size, args.queries, rng, args.cache_dir)
+
+        exact = build_index(vectors, "exact")
+        truth = [answers[exact.search(q, 1)[0][0]] for q in queries]
+
+        configs = [("exact", {})]
+        configs += [("ivf", {"nprobe": n or None}) for n in args.nprobe]
+        if hnswlib is not None:
+            configs += [("hnsw", {"ef": ef}) for ef in args.ef]
+
+        for index_type, params in configs:
+            start = time.perf_counter()
+            index = build_index(vectors, index_type, **params)
+            build_s = time.perf_counter() - start
+            p50, p99, recall = run(index, queries, truth, answers)
+            label = index_type + "".join(f" {k}={getattr(index, k, v)}" for k, v in params.items())
+            print(f"{size:>8} {label:<14} {build_s:>8.2f} {p50:>8.3f} {p99:>8.3f} {recall:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
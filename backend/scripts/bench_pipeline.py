@@ -0,0 +1,269 @@
+# bench_pipeline.py - Micro-benchmarks of the three tiers
+# Times each tier's entry point on its own:
+# - IntentMatcher.find_match over synthetic datasets from generate_dataset.py
+# - RAGEngine.ingest_documents (cold and up to date) and RAGEngine.retrieve,
+#   over a knowledge base built from the answers of a synthetic dataset
+# - SLMHandler.generate_response (the mock SLM unless --slm-model is given)
+# Query embeddings are computed up front, so each row is the tier's own cost.
+# --encoder hashing swaps MiniLM for a hashed bag of words, so the suite runs
+# offline on any CPU box. Compare only runs that use the same encoder.
+# Runs can be saved as a baseline and later runs checked against it. The
+# baseline format is shared with load_test.py.
+#
+#   python bench_pipeline.py --encoder hashing --save-baseline baseline.json
+#   python bench_pipeline.py --encoder hashing --baseline baseline.json
+#   python bench_pipeline.py --sizes 1000 10000 100000 --store compact
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from generate_dataset import generate_dataset
+
+DEFAULT_MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "models", "minilm")
+HASHING_MODEL = "hashing-384"
+ENCODERS = ("hashing", "torch", "onnx", "numpy")
+
+# p95 targets from docs/architecture.md
+TARGETS_MS = {"find_match": 50, "retrieve": 200, "generate_response": 2000}
+
+SYSTEM_PROMPT = "You are a helpful BFSI assistant. Use the following context to answer the user's question. If you don't know, say so."
+
+
+class HashingEncoder:
+    """
+    Offline stand-in for MiniLM: word unigrams and bigrams hashed into `dim`
+    buckets. Deterministic, and close enough to real vectors in size and
+    cost of search, but it only captures word overlap.
+    """
+    tokenizer = None
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, normalize_embeddings=False, **kwargs):
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = text.lower().split()
+            for term in words + [a + " " + b for a, b in zip(words, words[1:])]:
+                out[row, zlib.crc32(term.encode("utf-8")) % self.dim] += 1.0
+        if normalize_embeddings:
+            out /= np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+        return out[0] if single else out
+
+
+def make_embedder(encoder, **kwargs):
+    from embedder import EmbeddingService
+    if encoder == "hashing":
+        return EmbeddingService(model=HashingEncoder(), model_name=HASHING_MODEL, **kwargs)
+    return EmbeddingService(backend=encoder, model_dir=DEFAULT_MODEL_DIR, **kwargs)
+
+
+def summarize(latencies_ms, seconds=None):
+    latencies = np.asarray(latencies_ms)
+    result = {
+        "n": int(len(latencies)),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+    }
+    if seconds:
+        result["qps"] = round(len(latencies) / seconds, 1)
+    return result
+
+
+def timed(fn, items):
+    latencies = []
+    start = time.perf_counter()
+    for item in items:
+        t = time.perf_counter()
+        fn(*item)
+        latencies.append((time.perf_counter() - t) * 1000)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def paraphrase(instruction):
+    # Reworded so the exact-match fast path misses and the search runs
+    return "could you tell me " + instruction.lower().rstrip("?.").replace("what is", "")
+
+
+def print_results(results):
+    print(f"{'benchmark':<34} {'n':>6} {'p50_ms':>9} {'p95_ms':>9} {'p99_ms':>9} {'qps':>8} {'target':>7}")
+    for name, r in results.items():
+        target = r.get("target_ms")
+        qps = f"{r['qps']:>8.1f}" if "qps" in r else f"{'':>8}"
+        flag = "" if target is None else (f"{target:>6}" + ("!" if r["p95_ms"] > target else " "))
+        print(f"{name:<34} {r['n']:>6} {r['p50_ms']:>9.3f} {r['p95_ms']:>9.3f} {r['p99_ms']:>9.3f} {qps} {flag:>7}")
+
+
+def environment(encoder):
+    return {
+        "encoder": encoder,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def save_baseline(path, results, meta):
+    with open(path, "w") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=4)
+    print(f"Baseline written to {path}")
+
+
+def compare(path, results, meta, tolerance):
+    """
+    Print each benchmark against the baseline in `path` and return the names
+    that regressed: p95 up, or throughput down, by more than `tolerance`.
+    """
+    with open(path, "r") as f:
+        baseline = json.load(f)
+    if baseline["meta"].get("encoder") != meta["encoder"]:
+        print(f"Warning: baseline used encoder '{baseline['meta'].get('encoder')}', this run '{meta['encoder']}'.")
+    regressions = []
+    print(f"\n{'benchmark':<34} {'base_p95':>9} {'p95':>9} {'change':>8} {'base_qps':>9} {'qps':>8}  status")
+    for name, r in results.items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<34} {'-':>9} {r['p95_ms']:>9.3f} {'':>8} {'':>9} {'':>8}  new")
+            continue
+        change = r["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+        slower = change > tolerance
+        fewer = "qps" in r and "qps" in base and r["qps"] < base["qps"] * (1 - tolerance)
+        status = "REGRESSED" if slower or fewer else "ok"
+        if slower or fewer:
+            regressions.append(name)
+        print(f"{name:<34} {base['p95_ms']:>9.3f} {r['p95_ms']:>9.3f} {change:>+8.1%} "
+              f"{base.get('qps', float('nan')):>9.1f} {r.get('qps', float('nan')):>8.1f}  {status}")
+    return regressions
+
+
+def bench_matcher(embedder, sizes, n_queries, index_type, workdir, rng):
+    from matcher import IntentMatcher
+
+    results = {}
+    for size in sizes:
+        path = os.path.join(workdir, f"dataset_{size}.json")
+        data = generate_dataset(size=size, output_path=path)
+        start = time.perf_counter()
+        matcher = IntentMatcher(dataset_path=path, embedder=embedder, cache_dir=os.path.join(workdir, "cache"),
+                                index_type=index_type)
+        load_s = time.perf_counter() - start
+        rows = rng.choice(len(data), min(n_queries, len(data)), replace=False)
+        texts = [paraphrase(data[r]["instruction"]) for r in rows]
+        embeddings = embedder.encode(texts)
+        result = timed(matcher.find_match, zip(texts, embeddings))
+        result.update(load_s=round(load_s, 3), target_ms=TARGETS_MS["find_match"])
+        results[f"find_match n={size}"] = result
+    return results
+
+
+def bench_rag(embedder, kb_size, n_queries, store, workdir, rng):
+    from bench_retrieval import labelled_set
+    from rag import RAGEngine, chromadb
+
+    if store == "chroma" and chromadb is None:
+        print("chromadb is not installed; skipping RAG (try --store compact).")
+        return {}
+    kb_dir = os.path.join(workdir, "knowledge_base")
+    os.makedirs(kb_dir, exist_ok=True)
+    dataset_path = os.path.join(workdir, "kb.json")
+    generate_dataset(size=kb_size, output_path=dataset_path)
+    queries, n_docs = labelled_set(dataset_path, kb_dir)
+
+    start = time.perf_counter()
+    rag = RAGEngine(kb_path=kb_dir, embedder=embedder, db_path=os.path.join(workdir, "chroma_db"),
+                    store=store, cache_dir=os.path.join(workdir, "cache"))
+    cold_s = time.perf_counter() - start
+
+    results = {}
+    result = summarize([cold_s * 1000], cold_s)
+    result["chunks"] = rag.last_ingest["chunks"] if rag.last_ingest else 0
+    results[f"ingest cold docs={n_docs}"] = result
+    results[f"ingest unchanged docs={n_docs}"] = timed(rag.ingest_documents, [()] * 3)
+
+    rows = rng.choice(len(queries), min(n_queries, len(queries)), replace=False)
+    texts = [queries[r][0] for r in rows]
+    embeddings = embedder.encode(texts)
+    result = timed(lambda text, emb: rag.retrieve(text, n_results=5, query_embedding=emb), zip(texts, embeddings))
+    result["target_ms"] = TARGETS_MS["retrieve"]
+    results[f"retrieve {store} docs={n_docs}"] = result
+    return results
+
+
+def bench_slm(model_path, n_queries, max_tokens, workdir):
+    from slm import SLMHandler
+
+    slm = SLMHandler(model_path=model_path or os.path.join(workdir, "missing.gguf"), prompt_cache=None)
+    texts = [f"What are the charges on loan number {i}?" for i in range(n_queries)]
+    result = timed(lambda text: slm.generate_response(SYSTEM_PROMPT, text, max_tokens=max_tokens), [(t,) for t in texts])
+    result["target_ms"] = TARGETS_MS["generate_response"]
+    return {"generate_response " + ("model" if slm.llm else "mock"): result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of the matcher, RAG engine and SLM handler.")
+    parser.add_argument("--encoder", choices=ENCODERS, default="hashing",
+                        help="Query/chunk encoder: hashing runs offline, the rest use MiniLM via EMBED_BACKEND")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="Dataset sizes for find_match")
+    parser.add_argument("--index", default="exact", help="Matcher index type")
+    parser.add_argument("--kb-size", type=int, default=2000, help="Dataset size whose answers become the knowledge base")
+    parser.add_argument("--store", choices=["chroma", "compact"], default="chroma")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--slm-model", help="GGUF model to time (default: mock SLM)")
+    parser.add_argument("--slm-queries", type=int, default=50)
+    parser.add_argument("--max-tokens", type=int, default=64)
+    parser.add_argument("--skip", nargs="+", choices=["matcher", "rag", "slm"], default=[])
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--baseline", metavar="PATH", help="Compare with a saved baseline; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative p95/throughput regression")
+    parser.add_argument("--json", metavar="PATH", help="Also write this run's results here")
+    args = parser.parse_args()
+
+    random.seed(0)
+    rng = np.random.default_rng(0)
+    workdir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    try:
+        embedder = make_embedder(args.encoder)
+
+        results = {}
+        if "matcher" not in args.skip:
+            results.update(bench_matcher(embedder, args.sizes, args.queries, args.index, workdir, rng))
+        if "rag" not in args.skip:
+            results.update(bench_rag(embedder, args.kb_size, args.queries, args.store, workdir, rng))
+        if "slm" not in args.skip:
+            results.update(bench_slm(args.slm_model, args.slm_queries, args.max_tokens, workdir))
+
+        print()
+        print_results(results)
+        meta = environment(args.encoder)
+        if args.json:
+            save_baseline(args.json, results, meta)
+        if args.save_baseline:
+            save_baseline(args.save_baseline, results, meta)
+        if args.baseline and compare(args.baseline, results, meta, args.tolerance):
+            sys.exit(1)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
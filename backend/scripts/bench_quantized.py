@@ -0,0 +1,77 @@
+# bench_quantized.py - Memory, latency and recall@k of quantised vector stores
+# Compares the float32 brute-force path with fp16, int8 and product
+# quantisation, each with and without the exact float re-rank.
+# Memory is what the index keeps resident per process; the re-rank reads
+# the float32 rows from the memory-mapped cache and is not counted.
+# Recall@k is the share of the exact top-k answers that are also found
+# (see bench_index.py).
+#
+#   python bench_quantized.py                      # MiniLM embeddings, 10k/100k
+#   python bench_quantized.py --vectors random     # offline, no model download
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from bench_index import synthetic_vectors, model_vectors
+from index import build_index
+
+
+def run(index, queries, truth, answers, k):
+    latencies = []
+    found = 0
+    total = 0
+    for q, expected in zip(queries, truth):
+        start = time.perf_counter()
+        rows, _ = index.search(q, k=k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found += len(set(answers[rows].tolist()) & expected)
+        total += len(expected)
+    latencies = np.array(latencies)
+    return np.percentile(latencies, 50), np.percentile(latencies, 99), found / total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark quantised vector indexes against float32.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--vectors", choices=["model", "random"], default="model")
+    parser.add_argument("--dim", type=int, default=384, help="Dimension for --vectors random")
+    parser.add_argument("--rerank", type=int, nargs="+", default=[0, 4], help="Re-rank multipliers (0 = none)")
+    parser.add_argument("--cache-dir", default=os.path.join(tempfile.gettempdir(), "bench_embeddings"))
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'size':>8} {'index':<12} {'memory_mb':>10} {'build_s':>8} {'p50_ms':>8} {'p99_ms':>8} {f'recall@{args.k}':>10}")
+    for size in args.sizes:
+        if args.vectors == "random":
+            vectors, queries, answers = synthetic_vectors(size, args.dim, args.queries, rng)
+        else:
+            vectors, queries, answers = model_vectors(size, args.queries, rng, args.cache_dir)
+        vectors = np.asarray(vectors, dtype=np.float32)
+
+        exact = build_index(vectors, "exact")
+        truth = [set(answers[exact.search(q, args.k)[0]].tolist()) for q in queries]
+        p50, p99, recall = run(exact, queries, truth, answers, args.k)
+        print(f"{size:>8} {'float32':<12} {vectors.nbytes / 1e6:>10.1f} {0.0:>8.2f} {p50:>8.3f} {p99:>8.3f} {recall:>10.3f}")
+
+        for index_type in ("fp16", "int8", "pq"):
+            start = time.perf_counter()
+            index = build_index(vectors, index_type)
+            build_s = time.perf_counter() - start
+            for rerank in args.rerank:
+                index.rerank = rerank
+                p50, p99, recall = run(index, queries, truth, answers, args.k)
+                label = index_type + (f" rr={rerank}" if rerank else "")
+                print(f"{size:>8} {label:<12} {index.nbytes / 1e6:>10.1f} {build_s:>8.2f} {p50:>8.3f} {p99:>8.3f} {recall:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# bench_retrieval.py - Latency and hit rate of dense, BM25 and hybrid retrieval
+# Builds a labelled set from dataset.json: every distinct answer becomes one
+# knowledge-base document and every instruction is a query whose correct
+# document is the one holding its answer. The set is ingested into a
+# throwaway RAGEngine (Chroma + BM25), then each retrieval mode is timed.
+#
+#   python bench_retrieval.py
+#   python bench_retrieval.py --dataset path.json --k 3 --skip 0.6 0.8
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from embedder import EmbeddingService
+from rag import RAGEngine
+
+DEFAULT_DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "dataset.json")
+
+
+def labelled_set(dataset_path, kb_dir):
+    with open(dataset_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    documents = {}
+    queries = []
+    for item in data:
+        output = item["output"]
+        if output not in documents:
+            documents[output] = f"doc_{len(documents):05d}.txt"
+            with open(os.path.join(kb_dir, documents[output]), "w", encoding="utf-8") as f:
+                f.write(output + "\n")
+        queries.append((item["instruction"], documents[output]))
+    return queries, len(documents)
+
+
+def run(rag, queries, embeddings, k):
+    latencies = []
+    top1 = topk = 0
+    for (query, expected), embedding in zip(queries, embeddings):
+        start = time.perf_counter()
+        chunks = rag.retrieve_scored(query, n_results=k, query_embedding=embedding)
+        latencies.append((time.perf_counter() - start) * 1000)
+        sources = [chunk["source"] for chunk in chunks]
+        top1 += int(sources[:1] == [expected])
+        topk += int(expected in sources)
+    latencies = np.array(latencies)
+    n = len(queries)
+    return np.percentile(latencies, 50), np.percentile(latencies, 99), top1 / n, topk / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark RAG retrieval modes on a labelled set from dataset.json.")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--k", type=int, default=3, help="Chunks retrieved per query")
+    parser.add_argument("--weight", type=float, nargs="+", default=[0.3, 0.5], help="Hybrid lexical weights")
+    parser.add_argument("--skip", type=float, nargs="+", default=[0.8], help="Lexical shortcut thresholds")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_retrieval_")
+    kb_dir = os.path.join(workdir, "knowledge_base")
+    os.makedirs(kb_dir)
+    queries, n_docs = labelled_set(args.dataset, kb_dir)
+
+    embedder = EmbeddingService()
+    rag = RAGEngine(kb_path=kb_dir, embedder=embedder, db_path=os.path.join(workdir, "chroma_db"))
+    start = time.perf_counter()
+    embeddings = embedder.encode([query for query, _ in queries])
+    embed_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    print(f"{len(queries)} queries over {n_docs} documents; query embedding {embed_ms:.2f} ms/query (not included below)")
+
+    configs = [("dense", {"retrieval": "dense"}), ("lexical", {"retrieval": "lexical"})]
+    for weight in args.weight:
+        configs.append((f"hybrid w={weight}", {"retrieval": "hybrid", "lexical_weight": weight}))
+        for skip in args.skip:
+            configs.append((f"hybrid w={weight} skip={skip}", {"retrieval": "hybrid", "lexical_weight": weight, "lexical_skip": skip}))
+
+    print(f"{'mode':<26} {'p50_ms':>8} {'p99_ms':>8} {'hit@1':>7} {f'hit@{args.k}':>7} {'shortcut':>9}")
+    for name, settings in configs:
+        rag.retrieval = settings["retrieval"]
+        rag.lexical_weight = settings.get("lexical_weight", 0.3)
+        rag.lexical_skip = settings.get("lexical_skip", 0.0)
+        rag.stats = {"dense": 0, "lexical_only": 0}
+        p50, p99, hit1, hitk = run(rag, queries, embeddings, args.k)
+        shortcut = rag.stats["lexical_only"] / len(queries) if settings["retrieval"] == "hybrid" else 0.0
+        print(f"{name:<26} {p50:>8.3f} {p99:>8.3f} {hit1:>7.3f} {hitk:>7.3f} {shortcut:>9.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# calibrate_thresholds.py - Tune the matcher's per-category thresholds
+# Leave-one-out over dataset.json: each instruction is matched against the
+# rest of the dataset. It should be answered when another instruction has
+# the same intent (category and loan type, or the same answer) and fall
+# through otherwise. Extra labelled
+# queries can be added with --queries, a JSON list of
+# {"query": ..., "output": <expected answer or null for out-of-scope>}.
+#
+# For every intent category the threshold with the best utility is kept:
+# +1 per correct answer, -wrong_cost per wrong one, 0 for a fall-through.
+#
+#   python calibrate_thresholds.py                 # writes ../data/thresholds.json
+#   python calibrate_thresholds.py --dry-run --wrong-cost 3
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from intents import GENERAL, CATEGORIES
+from matcher import IntentMatcher
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+
+
+def labelled_cases(matcher, queries_path):
+    """(query, embedding, expected intent or None, excluded rows) tuples."""
+    snapshot = matcher.snapshot
+    copies = {}
+    members = {}
+    for row, item in enumerate(snapshot.data):
+        copies.setdefault(item['instruction'], []).append(row)
+        members.setdefault(snapshot.intents[row], set()).add(item['instruction'])
+    cases = []
+    for instruction, rows in copies.items():
+        # Hold out every copy of the instruction, not just this row
+        intent = snapshot.intents[rows[0]]
+        expected = intent if len(members[intent]) > 1 else None
+        cases.append((instruction, snapshot.embeddings[rows[0]], expected, tuple(rows)))
+    if queries_path:
+        with open(queries_path, 'r') as f:
+            extra = json.load(f)
+        by_output = {item['output']: snapshot.intents[row] for row, item in enumerate(snapshot.data)}
+        vectors = matcher.embedder.encode([case["query"] for case in extra])
+        for case, vector in zip(extra, vectors):
+            cases.append((case["query"], vector, by_output.get(case.get("output")), ()))
+    return cases
+
+
+def evaluate(matcher, ranked, thresholds, wrong_cost):
+    """Per-category (utility, answered, correct, total) for one thresholds dict."""
+    snapshot = matcher.snapshot
+    results = {}
+    for candidates, expected in ranked:
+        if not candidates:
+            continue
+        name = snapshot.categories[candidates[0][0]]
+        utility, answered, correct, total = results.get(name, (0.0, 0, 0, 0))
+        total += 1
+        if matcher.accept(candidates, thresholds=thresholds):
+            answered += 1
+            if snapshot.intents[candidates[0][0]] == expected:
+                correct += 1
+                utility += 1
+            else:
+                utility -= wrong_cost
+        results[name] = (utility, answered, correct, total)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate IntentMatcher thresholds per intent category.")
+    parser.add_argument("--dataset", default=os.path.join(DATA_DIR, "dataset.json"))
+    parser.add_argument("--queries", help="Extra labelled queries (JSON list of {query, output})")
+    parser.add_argument("--output", default=os.path.join(DATA_DIR, "thresholds.json"))
+    parser.add_argument("--cache-dir", default=os.path.join(tempfile.gettempdir(), "bench_embeddings"))
+    parser.add_argument("--wrong-cost", type=float, default=2.0, help="Penalty of a wrong answer relative to a correct one")
+    parser.add_argument("--margin", type=float, default=0.08)
+    parser.add_argument("--margin-window", type=float, default=0.1)
+    parser.add_argument("--dry-run", action="store_true", help="Print the result without writing it")
+    args = parser.parse_args()
+
+    matcher = IntentMatcher(dataset_path=args.dataset, cache_dir=args.cache_dir)
+    ranked = [
+        (matcher.candidates(query, vector, exclude=rows), expected)
+        for query, vector, expected, rows in labelled_cases(matcher, args.queries)
+    ]
+
+    grid = np.round(np.arange(0.50, 0.96, 0.01), 2)
+    base = {"margin": args.margin, "margin_window": args.margin_window}
+    names = [name for name, _ in CATEGORIES] + [GENERAL]
+
+    # Single global threshold first; it is the fallback for uncalibrated categories
+    best_default, best_utility = matcher.threshold, None
+    for value in grid:
+        results = evaluate(matcher, ranked, dict(base, default=float(value)), args.wrong_cost)
+        utility = sum(r[0] for r in results.values())
+        # Ties go to the higher, safer threshold
+        if best_utility is None or utility >= best_utility:
+            best_default, best_utility = float(value), utility
+
+    thresholds = dict(base, default=best_default, categories={})
+    print(f"{'category':<12} {'queries':>8} {'threshold':>10} {'answered':>9} {'precision':>10}")
+    for name in names:
+        best = None
+        for value in grid:
+            trial = dict(base, default=best_default, categories={name: float(value)})
+            utility, answered, correct, total = evaluate(matcher, ranked, trial, args.wrong_cost).get(name, (0, 0, 0, 0))
+            if total and (best is None or utility >= best[0]):
+                best = (utility, float(value), answered, correct, total)
+        if best is None:
+            continue
+        _, value, answered, correct, total = best
+        thresholds["categories"][name] = value
+        precision = correct / answered if answered else 1.0
+        print(f"{name:<12} {total:>8} {value:>10.2f} {answered / total:>9.1%} {precision:>10.1%}")
+    print(f"default threshold: {best_default:.2f}")
+
+    if args.dry_run:
+        print(json.dumps(thresholds, indent=4))
+        return
+    with open(args.output, "w") as f:
+        json.dump(thresholds, f, indent=4)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
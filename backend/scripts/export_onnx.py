@@ -0,0 +1,113 @@
+# export_onnx.py - Export MiniLM for the torch-free embedding backends
+# Writes, into backend/models/minilm by default:
+#   tokenizer.json   fast (Rust) tokenizer
+#   config.json      architecture and sequence length
+#   model.onnx       for EMBED_BACKEND=onnx
+#   weights/*.npy    for EMBED_BACKEND=numpy (memory-mapped at load)
+# then checks both backends against sentence-transformers on sample text.
+# This is the only step that needs torch.
+#
+#   python export_onnx.py
+#   python export_onnx.py --model all-MiniLM-L6-v2 --output ../models/minilm --tolerance 1e-4
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from embedder import MODEL_NAME
+from lite_encoder import BACKENDS
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "models", "minilm")
+
+SAMPLES = [
+    "What is the eligibility for a Home Loan?",
+    "Do I need ITR for Business Loan?",
+    "RTGS is available from 7:00 AM to 6:00 PM for transactions above ₹2 Lakhs.",
+    "hi",
+    "A penalty of 2% per month on the overdue amount is applicable. " * 20,
+]
+
+
+def export(model_name, output):
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer = model[0]
+    bert = transformer.auto_model.eval()
+    tokenizer = transformer.tokenizer
+    os.makedirs(os.path.join(output, "weights"), exist_ok=True)
+
+    tokenizer.backend_tokenizer.save(os.path.join(output, "tokenizer.json"))
+    with open(os.path.join(output, "config.json"), "w") as f:
+        json.dump({
+            "model_name": model_name,
+            "hidden_size": bert.config.hidden_size,
+            "num_attention_heads": bert.config.num_attention_heads,
+            "num_hidden_layers": bert.config.num_hidden_layers,
+            "layer_norm_eps": bert.config.layer_norm_eps,
+            "max_seq_length": model.max_seq_length,
+            "pad_token_id": tokenizer.pad_token_id,
+        }, f, indent=4)
+
+    for name, tensor in bert.state_dict().items():
+        if name.startswith("pooler.") or not tensor.is_floating_point():
+            continue
+        np.save(os.path.join(output, "weights", f"{name}.npy"), tensor.float().numpy())
+
+    class LastHiddenState(torch.nn.Module):
+        def __init__(self, bert):
+            super().__init__()
+            self.bert = bert
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.bert(input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids)[0]
+
+    dummy = tokenizer(["export"], return_tensors="pt")
+    axes = {0: "batch", 1: "sequence"}
+    torch.onnx.export(
+        LastHiddenState(bert),
+        (dummy["input_ids"], dummy["attention_mask"], dummy["token_type_ids"]),
+        os.path.join(output, "model.onnx"),
+        input_names=["input_ids", "attention_mask", "token_type_ids"],
+        output_names=["last_hidden_state"],
+        dynamic_axes={"input_ids": axes, "attention_mask": axes, "token_type_ids": axes, "last_hidden_state": axes},
+        opset_version=17,
+        dynamo=False,
+    )
+    return model
+
+
+def verify(model, output, tolerance):
+    reference = model.encode(SAMPLES, normalize_embeddings=True, convert_to_numpy=True)
+    ok = True
+    for backend, encoder_class in BACKENDS.items():
+        vectors = encoder_class(output).encode(SAMPLES, normalize_embeddings=True)
+        diff = float(np.abs(vectors - reference).max())
+        cosine = float((vectors * reference).sum(axis=1).min())
+        passed = diff <= tolerance
+        ok = ok and passed
+        print(f"{backend:<6} max |diff| {diff:.2e}  min cosine {cosine:.6f}  {'ok' if passed else 'FAILED'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export MiniLM for the ONNX and NumPy embedding backends.")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--tolerance", type=float, default=1e-4, help="Max element-wise difference of normalised vectors")
+    args = parser.parse_args()
+
+    model = export(args.model, args.output)
+    print(f"Exported {args.model} to {args.output}")
+    if not verify(model, args.output, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
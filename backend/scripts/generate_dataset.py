@@ -1,8 +1,72 @@
 
+import argparse
+import itertools
 import json
 import random
+import string
 
-def generate_dataset():
+# Paraphrases per synthetic intent; every paraphrase of an intent uses the
+# same slots, so they share the answer in SCALE_ANSWERS
+SCALE_TEMPLATES = {
+    "rate": [
+        "As a {profile}, what interest rate would I get on a {loan} of {amount} for {tenure}?",
+        "I am a {profile} and need a {loan} of {amount} for {tenure}. What is the interest rate?",
+        "What rate of interest applies to a {amount} {loan} over {tenure} for a {profile}?",
+        "Interest rate for a {profile} taking a {tenure} {loan} of {amount}?",
+    ],
+    "emi": [
+        "What EMI will I pay on a {loan} of {amount} over {tenure}?",
+        "Calculate the monthly instalment for a {amount} {loan} with a {tenure} tenure.",
+        "How much would the EMI be if I borrow {amount} as a {loan} for {tenure}?",
+    ],
+    "eligibility": [
+        "Am I eligible for a {loan} of {amount} in {city} as a {profile}?",
+        "Can a {profile} in {city} get a {amount} {loan}?",
+        "I'm a {profile} living in {city}. Do I qualify for a {loan} of {amount}?",
+        "What are the eligibility rules for a {profile} applying for a {amount} {loan} in {city}?",
+    ],
+    "documents": [
+        "Which documents does a {profile} need for a {amount} {loan} in {city}?",
+        "What paperwork should a {profile} submit for a {loan} of {amount} at the {city} branch?",
+        "List the documents for a {amount} {loan} application in {city} by a {profile}.",
+    ],
+    "prepayment": [
+        "Can I prepay a {loan} of {amount} taken for {tenure}?",
+        "Is there a foreclosure penalty on a {tenure} {loan} of {amount}?",
+        "What charges apply if I close my {amount} {loan} before the {tenure} term ends?",
+    ],
+    "processing": [
+        "What are the processing charges on a {amount} {loan} in {city}?",
+        "How much is the processing fee for a {loan} of {amount} in {city}?",
+        "What upfront fees apply to a {amount} {loan} from a {city} branch?",
+    ],
+    "approval": [
+        "How long does approval take for a {loan} of {amount} in {city}?",
+        "When will my {amount} {loan} be disbursed in {city}?",
+        "How many days does it take to sanction a {loan} of {amount} in {city}?",
+    ],
+}
+SCALE_ANSWERS = {
+    "rate": "For a {profile} taking a {loan} of {amount} over {tenure}, rates are {rate}. Please contact your nearest branch for an exact quote.",
+    "emi": "The EMI on a {loan} of {amount} over {tenure} depends on the final rate ({rate}). Use our online EMI calculator for the exact instalment.",
+    "eligibility": "For a {profile} applying for a {amount} {loan} in {city}: {eligibility}. The sanctioned amount depends on your income and credit score.",
+    "documents": "A {profile} applying for a {amount} {loan} in {city} should submit: {documents}.",
+    "prepayment": "You can prepay a {loan} of {amount} taken for {tenure} after a lock-in of 6-12 months. Foreclosure charges are usually 2-4% of the outstanding principal (nil on floating rates for individuals).",
+    "processing": "Processing charges on a {amount} {loan} in {city} are up to 1% of the loan amount plus GST, collected at disbursal.",
+    "approval": "A {loan} of {amount} in {city} is usually approved within 3-7 working days once all documents are verified.",
+}
+SCALE_SLOTS = {
+    "amount": ["₹1 Lakh", "₹2 Lakhs", "₹3 Lakhs", "₹5 Lakhs", "₹7.5 Lakhs", "₹10 Lakhs",
+               "₹15 Lakhs", "₹25 Lakhs", "₹50 Lakhs", "₹75 Lakhs", "₹1 Crore", "₹2 Crores"],
+    "tenure": ["6 months", "12 months", "24 months", "36 months", "5 years", "10 years", "15 years", "20 years"],
+    "city": ["Mumbai", "Delhi", "Bengaluru", "Chennai", "Kolkata", "Hyderabad", "Pune", "Ahmedabad", "Jaipur", "Lucknow",
+             "Surat", "Kochi", "Indore", "Bhopal", "Nagpur", "Patna", "Chandigarh", "Coimbatore", "Visakhapatnam", "Vadodara",
+             "Guwahati", "Bhubaneswar", "Mysuru", "Nashik", "Thiruvananthapuram", "Dehradun", "Ranchi", "Raipur", "Madurai", "Amritsar"],
+    "profile": ["salaried employee", "self-employed professional", "first-time borrower", "pensioner",
+                "NRI", "business owner", "woman borrower", "existing customer"],
+}
+
+def generate_dataset(size=160, output_path="../data/dataset.json"):
     loan_types = ["Personal Loan", "Home Loan", "Car Loan", "Education Loan", "Business Loan", "Gold Loan"]
     amounts = ["₹5 Lakhs", "₹10 Lakhs", "₹50 Lakhs", "₹1 Crore", "₹2 Lakhs"]
     tenures = ["12 months", "36 months", "5 years", "10 years", "20 years"]
@@ -154,9 +218,51 @@ def generate_dataset():
                 "output": f"Required documents for {loan}: {documents_required[loan]}."
             })
 
-    with open("../data/dataset.json", "w") as f:
+    if size > len(dataset):
+        dataset.extend(scale_dataset(size - len(dataset), loan_types, interest_rates, eligibility_criteria, documents_required))
+
+    with open(output_path, "w") as f:
         json.dump(dataset, f, indent=4)
         print(f"Dataset generated with {len(dataset)} items.")
+    return dataset
+
+def scale_dataset(count, loan_types, interest_rates, eligibility_criteria, documents_required):
+    """
+    Synthetic intents for load and index benchmarks (size > 160).
+
+    About 156k distinct questions; paraphrases of one intent with the same
+    slot values share their answer, so benchmarks can score a match by
+    answer rather than by row.
+    """
+    combos = []
+    for intent, templates in SCALE_TEMPLATES.items():
+        names = [name for _, name, _, _ in string.Formatter().parse(templates[0]) if name and name != "loan"]
+        for loan in loan_types:
+            for values in itertools.product(*(SCALE_SLOTS[name] for name in names)):
+                slots = dict(zip(names, values), loan=loan)
+                answer = SCALE_ANSWERS[intent].format(
+                    rate=interest_rates[loan],
+                    eligibility=eligibility_criteria[loan],
+                    documents=documents_required[loan],
+                    **slots
+                )
+                combos.extend((template.format(**slots), answer) for template in templates)
+    random.shuffle(combos)
+    items = []
+    for i in range(count):
+        instruction, answer = combos[i % len(combos)]
+        if i >= len(combos):
+            # Every combination used once; keep instructions unique
+            instruction = f"{instruction} (ref {i // len(combos)})"
+        items.append({"instruction": instruction, "input": "", "output": answer})
+    return items
 
 if __name__ == "__main__":
-    generate_dataset()
+    parser = argparse.ArgumentParser(description="Generate the BFSI Q&A dataset.")
+    parser.add_argument("--size", type=int, default=160, help="Number of items (extra items are synthetic variations)")
+    parser.add_argument("--output", default="../data/dataset.json")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+    generate_dataset(size=args.size, output_path=args.output)
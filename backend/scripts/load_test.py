@@ -0,0 +1,248 @@
+# load_test.py - In-process load test of POST /query
+# Serves the FastAPI app through httpx's ASGI transport (no network, no
+# uvicorn) from a throwaway copy of backend/data, and keeps --concurrency
+# requests in flight for --duration seconds (or --requests in total).
+# Queries are drawn from a Tier 1 / RAG / SLM mix:
+#   tier1  dataset instructions, verbatim or reworded
+#   rag    questions about knowledge-base passages
+#   slm    banking questions neither the dataset nor the knowledge base covers
+# Reports throughput and p50/p95/p99 overall, per query kind and per
+# answering path, and compares them with a baseline saved by this script
+# (same format as bench_pipeline.py). The SLM is the mock unless
+# backend/models/tiny_model.gguf exists. --encoder hashing runs offline.
+# --url drives a running server over HTTP instead, e.g. serve.py with
+# several workers (the queries are then drawn from backend/data).
+#
+#   python load_test.py --encoder hashing --concurrency 16 --duration 20 --save-baseline load.json
+#   python load_test.py --encoder hashing --concurrency 16 --duration 20 --baseline load.json
+#   python load_test.py --mix tier1=0.8,rag=0.15,slm=0.05 --dataset-size 10000
+#   python load_test.py --url http://localhost:8000 --concurrency 64
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+sys.path.append(SRC_DIR)
+
+from bench_pipeline import ENCODERS, make_embedder, summarize, print_results, environment, save_baseline, compare, paraphrase
+from generate_dataset import generate_dataset
+
+# Tier 1 paths are held to the 50 ms target in docs/architecture.md
+TIER1_TARGET_MS = 50
+TIER1_PATHS = ("exact", "semantic", "margin", "smalltalk")
+
+SLM_QUERIES = [
+    "How do I choose between a savings account and a fixed deposit?",
+    "What should I check before signing a loan agreement?",
+    "Is it better to pay off debt or invest in mutual funds?",
+    "How can I improve my credit score quickly?",
+    "What happens if the bank merges with another bank?",
+    "Should I take a joint loan with my spouse?",
+    "How do I dispute a wrong charge on my statement?",
+    "What is a good emergency fund size for a family of four?",
+]
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in ("tier1", "rag", "slm"):
+            raise argparse.ArgumentTypeError(f"Unknown query kind '{kind}' (use tier1, rag, slm).")
+        mix[kind] = float(weight)
+    return mix
+
+
+def query_pool(dataset_path, kb_dir):
+    with open(dataset_path, "r", encoding="utf-8") as f:
+        instructions = [item["instruction"] for item in json.load(f)]
+    tier1 = instructions + [paraphrase(text) for text in instructions]
+
+    rag = []
+    for name in sorted(os.listdir(kb_dir)):
+        with open(os.path.join(kb_dir, name), "r", encoding="utf-8") as f:
+            for line in f:
+                # "3. Prepayment: No prepayment penalty ..." -> "Tell me about prepayment"
+                line = re.sub(r"^[\s\-\d.*]+", "", line).strip().strip("*")
+                topic = line.split(":")[0].strip()
+                if 2 <= len(topic.split()) <= 8:
+                    rag.append(f"Tell me about {topic.lower()}")
+                elif ":" not in line and len(line.split()) >= 5:
+                    rag.append(f"What does the policy say: {line.lower()}")
+    return {"tier1": tier1, "rag": rag or ["What is the late payment penalty?"], "slm": SLM_QUERIES}
+
+
+def prepare_data_dir(workdir, dataset_size):
+    data_dir = os.path.join(workdir, "data")
+    shutil.copytree(os.path.join(DATA_DIR, "knowledge_base"), os.path.join(data_dir, "knowledge_base"))
+    if dataset_size:
+        generate_dataset(size=dataset_size, output_path=os.path.join(data_dir, "dataset.json"))
+    else:
+        shutil.copy(os.path.join(DATA_DIR, "dataset.json"), os.path.join(data_dir, "dataset.json"))
+    if os.path.exists(os.path.join(DATA_DIR, "thresholds.json")):
+        shutil.copy(os.path.join(DATA_DIR, "thresholds.json"), os.path.join(data_dir, "thresholds.json"))
+    return data_dir
+
+
+def sampler(pool, mix, rng):
+    kinds = [kind for kind in mix if pool.get(kind)]
+    weights = [mix[kind] for kind in kinds]
+
+    def sample():
+        kind = rng.choices(kinds, weights)[0]
+        return kind, rng.choice(pool[kind])
+    return sample
+
+
+async def drive(client, sample, concurrency, duration, limit, records):
+    issued = 0
+    deadline = time.perf_counter() + duration if duration else None
+
+    async def worker():
+        nonlocal issued
+        while (limit is None or issued < limit) and (deadline is None or time.perf_counter() < deadline):
+            issued += 1
+            kind, text = sample()
+            start = time.perf_counter()
+            response = await client.post("/query", json={"query": text})
+            elapsed = (time.perf_counter() - start) * 1000
+            path = None
+            if response.status_code == 200:
+                body = response.json()
+                path = body.get("path") or body.get("source")
+            records.append((kind, path, response.status_code, elapsed))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start
+
+
+def report(records, seconds):
+    ok = [r for r in records if r[2] == 200]
+    results = {"all": summarize([r[3] for r in ok], seconds)}
+    results["all"]["errors"] = len(records) - len(ok)
+    for kind in sorted({r[0] for r in ok}):
+        results[f"kind={kind}"] = summarize([r[3] for r in ok if r[0] == kind], seconds)
+    for path in sorted({r[1] for r in ok}):
+        result = summarize([r[3] for r in ok if r[1] == path], seconds)
+        if path in TIER1_PATHS:
+            result["target_ms"] = TIER1_TARGET_MS
+        results[f"path={path}"] = result
+    return results
+
+
+async def measure(client, sample, args):
+    await drive(client, sample, args.concurrency, None, args.warmup, [])
+    records = []
+    seconds = await drive(client, sample, args.concurrency, args.duration, args.requests, records)
+    return records, seconds
+
+
+async def run(args, app_module, pool):
+    import httpx
+
+    sample = sampler(pool, args.mix, random.Random(args.seed))
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=None,
+                                     limits=httpx.Limits(max_connections=args.concurrency)) as client:
+            return await measure(client, sample, args)
+
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with app_module.lifespan(app_module.app):
+        if not await asyncio.to_thread(app_module.registry.wait, args.startup_timeout):
+            print("Warning: not every component finished loading; results include degraded answers.")
+        failed = [name for name, info in app_module.registry.status().items() if info["state"] == "failed"]
+        if failed:
+            print(f"Warning: components failed to load: {', '.join(failed)}")
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+            return await measure(client, sample, args)
+
+
+def finish(args, records, seconds, meta):
+    if not records:
+        print("No requests completed.")
+        sys.exit(1)
+
+    results = report(records, seconds)
+    print(f"\n{len(records)} requests in {seconds:.1f}s at concurrency {args.concurrency}, "
+          f"{results['all']['errors']} errors")
+    print_results(results)
+    meta.update(concurrency=args.concurrency, mix=args.mix, dataset_size=args.dataset_size, url=args.url)
+    if args.json:
+        save_baseline(args.json, results, meta)
+    if args.save_baseline:
+        save_baseline(args.save_baseline, results, meta)
+    if args.baseline and compare(args.baseline, results, meta, args.tolerance):
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-process load test of POST /query with a Tier 1/RAG/SLM mix.")
+    parser.add_argument("--encoder", choices=ENCODERS, default="hashing",
+                        help="hashing runs offline; torch/onnx/numpy use MiniLM (EMBED_BACKEND)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds to run (0: until --requests are done)")
+    parser.add_argument("--requests", type=int, default=None, help="Total requests (default: as many as fit the duration)")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("tier1=0.7,rag=0.2,slm=0.1"))
+    parser.add_argument("--dataset-size", type=int, default=0, help="Serve a synthetic dataset of this size instead of dataset.json")
+    parser.add_argument("--response-cache", action="store_true", help="Keep the semantic response cache on")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--baseline", metavar="PATH", help="Compare with a saved baseline; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative p95/throughput regression")
+    parser.add_argument("--json", metavar="PATH", help="Also write this run's results here")
+    parser.add_argument("--url", help="Load a running server at this URL instead of the in-process app")
+    args = parser.parse_args()
+    if not args.duration and not args.requests:
+        parser.error("--duration 0 needs --requests")
+
+    random.seed(args.seed)
+    if args.url:
+        pool = query_pool(os.path.join(DATA_DIR, "dataset.json"), os.path.join(DATA_DIR, "knowledge_base"))
+        records, seconds = asyncio.run(run(args, None, pool))
+        finish(args, records, seconds, environment("server"))
+        return
+
+    workdir = tempfile.mkdtemp(prefix="load_test_")
+    try:
+        data_dir = prepare_data_dir(workdir, args.dataset_size)
+        # The app reads its configuration at import time
+        os.environ["DATA_DIR"] = data_dir
+        os.environ["WATCH_FILES"] = "0"
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        if not args.response_cache:
+            os.environ["RESPONSE_CACHE"] = "0"
+        if args.encoder != "hashing":
+            os.environ["EMBED_BACKEND"] = args.encoder
+        import app as app_module
+
+        if args.encoder == "hashing":
+            app_module.registry.register("embedder", lambda: make_embedder(
+                "hashing",
+                max_batch_size=app_module.EMBED_BATCH_SIZE,
+                max_wait_ms=app_module.EMBED_BATCH_WAIT_MS,
+                max_queue=app_module.EMBED_QUEUE,
+                on_batch=app_module.observe_embed_batch
+            ))
+
+        pool = query_pool(os.path.join(data_dir, "dataset.json"), os.path.join(data_dir, "knowledge_base"))
+        records, seconds = asyncio.run(run(args, app_module, pool))
+        finish(args, records, seconds, environment(args.encoder))
+    finally:
+        # The Chroma store and dataset copy are only needed for this run
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
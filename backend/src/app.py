@@ -5,27 +5,364 @@ import os
 # Add src to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from fastapi import FastAPI, HTTPException
+import asyncio
+import json
+import queue
+import time
+from contextlib import asynccontextmanager
+from typing import List, Literal, Optional
+from fastapi import FastAPI, HTTPException, Header, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
 import uvicorn
 import logging
+from logging.handlers import QueueHandler, QueueListener
 
 try:
-    from matcher import IntentMatcher
+    from matcher import IntentMatcher, normalize_text
     from slm import SLMHandler
     from rag import RAGEngine
+    from executor import WorkerPool, PoolSaturated
+    from embedder import EmbeddingService
+    from registry import ComponentRegistry
+    from reloader import Reloader, FileWatcher
+    from response_cache import SemanticCache, RedisCacheStore
+    from scheduler import InferenceScheduler, DeadlineExceeded
+    from context import ContextBuilder
+    from router import TierRouter, FALLBACK_REPLY
+    from metrics import MetricsRegistry, Trace, SamplingProfiler, TOKEN_BUCKETS, RATE_BUCKETS
+    from serve import RELOAD_SIGNALS
 except ImportError:
     # Fallback for relative imports if run as module
-    from .matcher import IntentMatcher
+    from .matcher import IntentMatcher, normalize_text
     from .slm import SLMHandler
     from .rag import RAGEngine
+    from .executor import WorkerPool, PoolSaturated
+    from .embedder import EmbeddingService
+    from .registry import ComponentRegistry
+    from .reloader import Reloader, FileWatcher
+    from .response_cache import SemanticCache, RedisCacheStore
+    from .scheduler import InferenceScheduler, DeadlineExceeded
+    from .context import ContextBuilder
+    from .router import TierRouter, FALLBACK_REPLY
+    from .metrics import MetricsRegistry, Trace, SamplingProfiler, TOKEN_BUCKETS, RATE_BUCKETS
+    from .serve import RELOAD_SIGNALS
 
-# Initialize Logging
-logging.basicConfig(level=logging.INFO)
+# Initialize Logging. Records are handed to a background thread, so a
+# slow stderr never blocks a request; per-query lines are DEBUG.
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+
+# Set by serve.py, which forks this many server processes (0: a plain
+# single-process server). Workers only read shared state (embedding caches,
+# Chroma): the supervisor is its single writer and signals them to reload.
+# Each worker gets an equal share of the cores.
+WORKERS = int(os.environ.get("SERVE_WORKERS", "0"))
+CPU_SHARE = max(1, (os.cpu_count() or 1) // max(1, WORKERS))
+
+log_queue = queue.SimpleQueue()
+logging.basicConfig(level=LOG_LEVEL, handlers=[QueueHandler(log_queue)])
+log_handler = logging.StreamHandler()
+if WORKERS:
+    log_handler.setFormatter(logging.Formatter("[%(process)d] %(message)s"))
+log_listener = QueueListener(log_queue, log_handler)
+log_listener.start()
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="BFSI AI Assistant")
+# Per-stage latency, generation and cache metrics, served on /metrics.
+# Set TRACE_HEADERS=1 (or send "X-Trace: 1") for a Server-Timing header
+# on each answer, and PROFILER=1 to allow POST /admin/profile.
+TRACE_HEADERS = os.environ.get("TRACE_HEADERS", "0") == "1"
+PROFILER = os.environ.get("PROFILER", "0") == "1"
+
+metrics = MetricsRegistry(prefix="bfsi_")
+request_seconds = metrics.histogram("request_seconds", "Time to answer a query, by the path that answered it.", labels=("path",))
+stage_seconds = metrics.histogram("stage_seconds", "Time spent in each stage of answering a query.", labels=("stage",))
+embed_batch_seconds = metrics.histogram("embed_batch_seconds", "Encode time of each embedding micro-batch.")
+embed_batch_size = metrics.histogram("embed_batch_size", "Queries per embedding micro-batch.", buckets=(1, 2, 4, 8, 16, 32, 64))
+prompt_tokens_histogram = metrics.histogram("prompt_tokens", "SLM prompt size in tokens.", buckets=TOKEN_BUCKETS, labels=("source",))
+generation_rate = metrics.histogram("generation_tokens_per_second", "Decoding speed of each generation.", buckets=RATE_BUCKETS)
+generated_tokens = metrics.counter("generated_tokens_total", "Tokens generated by the SLM.")
+generations = metrics.counter("generations_total", "Generations by outcome.", labels=("outcome",))
+
+profiler = SamplingProfiler(interval=float(os.environ.get("PROFILER_INTERVAL_MS", "5")) / 1000) if PROFILER else None
+
+# Blocking model calls run off the event loop so a long SLM generation
+# never stalls Tier 1 lookups: matcher/RAG work in a bounded pool, and
+# generation in the inference scheduler's slots.
+EMBED_WORKERS = int(os.environ.get("EMBED_WORKERS", "2"))
+EMBED_QUEUE = int(os.environ.get("EMBED_QUEUE", "32"))
+SLM_WORKERS = int(os.environ.get("SLM_WORKERS", "1"))
+SLM_QUEUE = int(os.environ.get("SLM_QUEUE", "4"))
+SLM_DEADLINE = float(os.environ.get("SLM_DEADLINE", "30"))
+
+embed_pool = WorkerPool("embed", max_workers=EMBED_WORKERS, max_queue=EMBED_QUEUE)
+
+# Initialize Components
+# Use absolute paths or reliable relative paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATA_DIR = os.environ.get("DATA_DIR", os.path.join(BASE_DIR, "backend", "data"))
+MODELS_DIR = os.path.join(BASE_DIR, "backend", "models")
+
+# "exact" for small datasets; "ivf" or "hnsw" for 100k+ intents; "fp16",
+# "int8" or "pq" keep only quantised vectors in memory
+MATCHER_INDEX = os.environ.get("MATCHER_INDEX", "exact")
+# Buckets the ivf index scans per query (0: a quarter of them)
+MATCHER_NPROBE = int(os.environ.get("MATCHER_NPROBE", "0"))
+# Also ignore stopwords in the exact-match fast path
+MATCHER_STRIP_STOPWORDS = os.environ.get("MATCHER_STRIP_STOPWORDS", "0") == "1"
+# Used for categories data/thresholds.json does not calibrate
+MATCHER_THRESHOLD = float(os.environ.get("MATCHER_THRESHOLD", "0.75"))
+
+EMBED_BATCH_SIZE = int(os.environ.get("EMBED_BATCH_SIZE", "32"))
+EMBED_BATCH_WAIT_MS = float(os.environ.get("EMBED_BATCH_WAIT_MS", "5"))
+# "torch" (sentence-transformers), or "onnx"/"numpy" to keep torch out of
+# the worker; both read models/minilm written by scripts/export_onnx.py
+EMBED_BACKEND = os.environ.get("EMBED_BACKEND", "torch")
+EMBED_THREADS = int(os.environ.get("EMBED_THREADS", "0")) or (CPU_SHARE if WORKERS else None)
+
+def observe_embed_batch(size, seconds):
+    embed_batch_size.observe(size)
+    embed_batch_seconds.observe(seconds)
+
+def observe_generation(request, outcome):
+    timings = request.timings
+    generations.inc(outcome=outcome)
+    if outcome == "error":
+        return
+    generated_tokens.inc(timings["tokens"])
+    for stage in ("queue_wait", "prompt_eval", "generate"):
+        stage_seconds.observe(timings[stage], stage=stage)
+    if timings["tokens"] > 1 and timings["generate"] > 0:
+        generation_rate.observe((timings["tokens"] - 1) / timings["generate"])
+
+# Every model is loaded exactly once through the registry. The embedding
+# service (MiniLM) is shared by the matcher and the RAG engine; the SLM has
+# no dependencies and loads in parallel with them.
+registry = ComponentRegistry()
+registry.register("embedder", lambda: EmbeddingService(
+    max_batch_size=EMBED_BATCH_SIZE,
+    max_wait_ms=EMBED_BATCH_WAIT_MS,
+    max_queue=EMBED_QUEUE,
+    backend=EMBED_BACKEND,
+    model_dir=os.path.join(MODELS_DIR, "minilm"),
+    threads=EMBED_THREADS,
+    on_batch=observe_embed_batch
+))
+
+def create_matcher(embedder):
+    return IntentMatcher(
+        dataset_path=os.path.join(DATA_DIR, "dataset.json"),
+        embedder=embedder,
+        cache_dir=os.path.join(DATA_DIR, "embedding_cache"),
+        index_type=MATCHER_INDEX,
+        index_params={"nprobe": MATCHER_NPROBE} if MATCHER_INDEX == "ivf" and MATCHER_NPROBE else None,
+        strip_stopwords=MATCHER_STRIP_STOPWORDS,
+        threshold=MATCHER_THRESHOLD,
+        thresholds_path=os.path.join(DATA_DIR, "thresholds.json")
+    )
+
+def create_rag(embedder, read_only=False):
+    return RAGEngine(
+        kb_path=os.path.join(DATA_DIR, "knowledge_base"),
+        embedder=embedder,
+        db_path=os.path.join(DATA_DIR, "chroma_db"),
+        retrieval=os.environ.get("RAG_RETRIEVAL", "hybrid"),
+        lexical_weight=float(os.environ.get("RAG_LEXICAL_WEIGHT", "0.3")),
+        lexical_skip=float(os.environ.get("RAG_LEXICAL_SKIP", "0.0")),
+        store=os.environ.get("RAG_STORE", "chroma"),
+        cache_dir=os.path.join(DATA_DIR, "embedding_cache"),
+        index_type=os.environ.get("RAG_INDEX", "int8"),
+        read_only=read_only
+    )
+
+registry.register("matcher", create_matcher, depends=["embedder"])
+registry.register("rag", lambda embedder: create_rag(embedder, read_only=bool(WORKERS)), depends=["embedder"])
+# Static prefix of every generation prompt; its KV state is cached once
+SYSTEM_PROMPT = "You are a helpful BFSI assistant. Use the following context to answer the user's question. If you don't know, say so."
+
+SLM_MAX_TOKENS = int(os.environ.get("SLM_MAX_TOKENS", "256"))
+
+# Retrieve a few candidates and pack the best into a token budget
+RAG_CANDIDATES = int(os.environ.get("RAG_CANDIDATES", "5"))
+RAG_CONTEXT_TOKENS = int(os.environ.get("RAG_CONTEXT_TOKENS", "768"))
+RAG_MIN_SCORE = float(os.environ.get("RAG_MIN_SCORE", "0.0"))
+
+# "ram", "disk" (persisted under models/prompt_cache) or "off"
+SLM_PROMPT_CACHE = os.environ.get("SLM_PROMPT_CACHE", "ram")
+SLM_PROMPT_CACHE_MB = int(os.environ.get("SLM_PROMPT_CACHE_MB", "512"))
+
+def create_slm():
+    slm = SLMHandler(
+        model_path=os.path.join(MODELS_DIR, "tiny_model.gguf"),
+        n_threads=max(1, CPU_SHARE // SLM_WORKERS) if WORKERS else None,
+        prompt_cache=None if SLM_PROMPT_CACHE == "off" else SLM_PROMPT_CACHE,
+        prompt_cache_bytes=SLM_PROMPT_CACHE_MB * 1024 * 1024,
+        prompt_cache_dir=os.path.join(MODELS_DIR, "prompt_cache")
+    )
+    slm.warm_prefix(SYSTEM_PROMPT)
+    return slm
+
+registry.register("slm", create_slm)
+# One decoding slot per SLM worker, each with its own context
+registry.register("scheduler", lambda slm: InferenceScheduler(
+    slm,
+    n_slots=SLM_WORKERS,
+    max_queue=SLM_QUEUE,
+    deadline=SLM_DEADLINE,
+    on_finish=observe_generation,
+    cpus=CPU_SHARE
+), depends=["slm"])
+
+# Dataset and knowledge base can be updated without a restart, either via
+# POST /admin/reload or by the file watcher. The admin endpoints are only
+# served when ADMIN_TOKEN is set.
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+WATCH_FILES = os.environ.get("WATCH_FILES", "1") == "1"
+WATCH_INTERVAL = float(os.environ.get("WATCH_INTERVAL", "2"))
+
+reloader = Reloader(registry)
+watcher = FileWatcher(
+    reloader,
+    dataset_path=os.path.join(DATA_DIR, "dataset.json"),
+    kb_path=os.path.join(DATA_DIR, "knowledge_base"),
+    interval=WATCH_INTERVAL,
+    thresholds_path=os.path.join(DATA_DIR, "thresholds.json")
+)
+
+def preload():
+    """
+    Load the embedding model before serve.py forks, so the workers share
+    its weights copy-on-write. Nothing here may leave a thread pool behind:
+    threads do not survive fork(), and a child that inherits an OpenMP pool
+    without its threads hangs on first use. Torch therefore loads
+    single-threaded (init_worker gives each worker its share back), and
+    the ONNX session, which starts its pool as it loads, is left to the
+    workers. The GGUF model is memory-mapped, so workers that load it
+    share its pages anyway.
+    """
+    if EMBED_BACKEND == "onnx":
+        return None
+    if EMBED_BACKEND == "torch":
+        import torch
+        torch.set_num_threads(1)
+    return registry.load("embedder")
+
+def init_worker():
+    """Per-process setup in a child forked by serve.py."""
+    log_listener.start()
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(EMBED_THREADS)
+
+def sync_shared_state(targets=("matcher", "rag")):
+    """
+    Bring the embedding caches and the Chroma collection in line with the
+    data files. serve.py runs this in a short-lived child, the only process
+    that writes them; workers then reload read-only.
+    """
+    embedder = registry.load("embedder")
+    if embedder is None:
+        raise RuntimeError(registry.status()["embedder"]["error"])
+    results = {}
+    if "matcher" in targets:
+        results["matcher"] = {"rows": len(create_matcher(embedder).data)}
+    if "rag" in targets:
+        results["rag"] = create_rag(embedder).last_ingest
+    return results
+
+# Semantic cache for generated (RAG/SLM) answers. Set REDIS_URL to share it
+# between workers.
+RESPONSE_CACHE = os.environ.get("RESPONSE_CACHE", "1") == "1"
+RESPONSE_CACHE_THRESHOLD = float(os.environ.get("RESPONSE_CACHE_THRESHOLD", "0.95"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+RESPONSE_CACHE_MAX_MB = float(os.environ.get("RESPONSE_CACHE_MAX_MB", "64"))
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "3600"))
+REDIS_URL = os.environ.get("REDIS_URL")
+
+response_cache = None
+if RESPONSE_CACHE:
+    response_cache = SemanticCache(
+        threshold=RESPONSE_CACHE_THRESHOLD,
+        max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+        max_bytes=int(RESPONSE_CACHE_MAX_MB * 1024 * 1024),
+        ttl=RESPONSE_CACHE_TTL,
+        shared=RedisCacheStore(
+            REDIS_URL, max_entries=RESPONSE_CACHE_MAX_ENTRIES, ttl=RESPONSE_CACHE_TTL
+        ) if REDIS_URL else None
+    )
+    # Cached answers may quote knowledge-base text that no longer exists
+    reloader.on_kb_change.append(response_cache.clear)
+
+context_builder = ContextBuilder(min_score=RAG_MIN_SCORE)
+
+# Tier 1 misses go to RAG only when the query looks like it needs the
+# knowledge base; clearly off-topic queries get a canned answer.
+router = TierRouter(
+    rag_threshold=float(os.environ.get("ROUTER_RAG_THRESHOLD", "0.45")),
+    fallback_threshold=float(os.environ.get("ROUTER_FALLBACK_THRESHOLD", "0.25")),
+    lexical_coverage=float(os.environ.get("ROUTER_LEXICAL_COVERAGE", "0.5"))
+)
+
+def component_stats(name, method=None):
+    # Scrape-time view of a component's own counters; None until it is loaded
+    def read():
+        component = registry.get(name)
+        if component is None:
+            return None
+        return getattr(component, method)() if method else component.stats
+    return read
+
+def pick(read, key):
+    def value():
+        stats = read()
+        return stats[key] if stats else None
+    return value
+
+def labelled(read, keys):
+    def values():
+        stats = read()
+        return {(label,): stats[key] for key, label in keys.items()} if stats else None
+    return values
+
+embedder_stats = component_stats("embedder", "stats")
+scheduler_stats = component_stats("scheduler", "stats")
+metrics.gauge("embed_queue_depth", "Queries waiting for the embedding micro-batcher.", pick(embedder_stats, "queued"))
+metrics.gauge("embed_pool_pending", "Matcher/RAG calls running or queued.", lambda: embed_pool.stats()["pending"])
+metrics.gauge("embed_pool_rejected_total", "Matcher/RAG calls rejected as the pool was full.",
+              lambda: embed_pool.stats()["rejected"], kind="counter")
+metrics.gauge("batch_pool_pending", "/query/batch chunks and cache writes running or queued.", lambda: batch_pool.stats()["pending"])
+metrics.gauge("slm_queue_depth", "Generations waiting for a decoding slot.", pick(scheduler_stats, "queued"))
+metrics.gauge("slm_active_slots", "Decoding slots currently generating.", pick(scheduler_stats, "active"))
+metrics.gauge("slm_rejected_total", "Generations rejected as the queue was full.", pick(scheduler_stats, "rejected"), kind="counter")
+metrics.gauge("tier1_lookups_total", "Tier 1 lookups by result.", labelled(component_stats("matcher"), {
+    "exact_hits": "exact", "semantic_hits": "semantic", "margin_hits": "margin", "misses": "miss"
+}), labels=("result",), kind="counter")
+metrics.gauge("rag_retrievals_total", "RAG retrievals by search path.", labelled(component_stats("rag"), {
+    "dense": "dense", "lexical_only": "lexical_only"
+}), labels=("mode",), kind="counter")
+metrics.gauge("response_cache_hit_ratio", "Share of response cache lookups that hit.",
+              lambda: response_cache.stats()["hit_ratio"] if response_cache else None)
+metrics.gauge("response_cache_entries", "Answers in the response cache.",
+              lambda: response_cache.stats()["entries"] if response_cache else None)
+
+@asynccontextmanager
+async def lifespan(app):
+    # Components load in the background so the server starts accepting
+    # requests immediately; each tier is used as soon as it is ready.
+    registry.start()
+    # Under serve.py the supervisor watches the files
+    if WATCH_FILES and not WORKERS:
+        watcher.start()
+    yield
+    watcher.stop()
+    embed_pool.shutdown()
+    batch_pool.shutdown()
+    scheduler = registry.get("scheduler")
+    if scheduler:
+        scheduler.shutdown()
+    log_listener.stop()
+
+app = FastAPI(title="BFSI AI Assistant", lifespan=lifespan)
 
 # CORS Middleware
 app.add_middleware(
@@ -36,22 +373,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize Components
-# Use absolute paths or reliable relative paths
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-DATA_DIR = os.path.join(BASE_DIR, "backend", "data")
-MODELS_DIR = os.path.join(BASE_DIR, "backend", "models")
-
-try:
-    matcher = IntentMatcher(dataset_path=os.path.join(DATA_DIR, "dataset.json"))
-    slm = SLMHandler(model_path=os.path.join(MODELS_DIR, "tiny_model.gguf"))
-    rag = RAGEngine(kb_path=os.path.join(DATA_DIR, "knowledge_base"))
-except Exception as e:
-    logger.error(f"Failed to initialize components: {e}")
-    matcher = None
-    slm = None
-    rag = None
-
 class QueryRequest(BaseModel):
     query: str
 
@@ -59,71 +380,637 @@ class QueryResponse(BaseModel):
     response: str
     source: str
     confidence: float
+    # Which path served the answer: exact, semantic, margin, smalltalk,
+    # fallback, cache, rag or slm
+    path: Optional[str] = None
+    # Size of the SLM prompt, when one was generated
+    prompt_tokens: Optional[int] = None
 
-@app.post("/query", response_model=QueryResponse)
-async def handle_query(request: QueryRequest):
-    query = request.query
-    logger.info(f"Received query: {query}")
-    
-    # 1. Tier 1: Dataset Match
+BUSY_MESSAGE = "I am currently experiencing high load. Please try again later."
+
+class GenerationPlan:
+    """Everything needed to generate an answer once the cheap tiers missed."""
+    def __init__(self, scheduler, system_prompt, source, query_embedding, prompt_tokens=None):
+        self.scheduler = scheduler
+        self.system_prompt = system_prompt
+        self.source = source
+        self.query_embedding = query_embedding
+        self.prompt_tokens = prompt_tokens
+
+async def resolve_query(query, trace):
+    """
+    Run every tier that does not need generation. Returns a final
+    QueryResponse, or a GenerationPlan when the SLM has to answer.
+    Stage timings are recorded on `trace`.
+    """
+    embedder = registry.get("embedder")
+    matcher = registry.get("matcher")
+    rag = registry.get("rag")
+    scheduler = registry.get("scheduler")
+
+    # 0. Exact / normalized-text match: no model call at all
     if matcher:
-        match_result = matcher.find_match(query)
-        if match_result and match_result["match_found"]:
-            logger.info("Dataset match found.")
+        exact = matcher.find_exact(query)
+        if exact:
             return QueryResponse(
-                response=match_result["response"],
+                response=exact["response"],
                 source="dataset",
-                confidence=match_result["score"]
+                confidence=exact["score"],
+                path="exact"
             )
+    
+    # Greetings and thanks need neither the embedder nor the SLM
+    small_talk = router.small_talk_reply(query)
+    if small_talk:
+        return QueryResponse(
+            response=small_talk,
+            source="smalltalk",
+            confidence=1.0,
+            path="smalltalk"
+        )
 
-    # 2. Tier 3: RAG Retrieval (Check if knowledge is needed)
-    context = ""
-    if rag:
-        retrieved_docs = rag.retrieve(query)
-        if retrieved_docs:
-            context = "\n".join(retrieved_docs)
-            logger.info(f"Retrieved {len(retrieved_docs)} chunks.")
+    # Embed the query once; the vector is reused by both Tier 1 and RAG
+    query_embedding = None
+    if embedder:
+        try:
+            with trace.stage("embed"):
+                query_embedding = await embedder.aembed(query)
+        except PoolSaturated:
+            raise HTTPException(status_code=503, detail="Server is busy. Please retry shortly.")
 
-    # 3. Tier 2: SLM Response
-    if slm:
-        system_prompt = "You are a helpful BFSI assistant. Use the following context to answer the user's question. If you don't know, say so."
-        if context:
-            system_prompt += f"\nContext:\n{context}"
-            source = "rag"
-        else:
-            source = "slm"
-            
+    # 1. Tier 1: Dataset Match, and where to go if it misses
+    try:
+        with trace.stage("match"):
+            match_result, route = await embed_pool.run(match_and_route, matcher, rag, query, query_embedding)
+    except PoolSaturated:
+        raise HTTPException(status_code=503, detail="Server is busy. Please retry shortly.")
+    if match_result and match_result["match_found"]:
+        logger.debug("Dataset match found.")
+        return QueryResponse(
+            response=match_result["response"],
+            source="dataset",
+            confidence=match_result["score"],
+            path=match_result.get("match_type", "semantic")
+        )
+    logger.debug("Routing to %s (tier 1 score %s).", route, match_result["score"] if match_result else None)
+
+    if route == "fallback":
+        return QueryResponse(
+            response=FALLBACK_REPLY,
+            source="fallback",
+            confidence=0.0,
+            path="fallback"
+        )
+
+    # Previously generated answer for a near-identical question
+    if response_cache and query_embedding is not None:
         try:
-            response_text = slm.generate_response(system_prompt, query)
-            return QueryResponse(
-                response=response_text,
-                source=source,
-                confidence=0.5
-            )
+            with trace.stage("cache"):
+                cached = await embed_pool.run(response_cache.lookup, query_embedding)
+        except PoolSaturated:
+            cached = None
         except Exception as e:
-            logger.error(f"SLM failed: {e}")
+            logger.error("Response cache lookup failed: %s", e)
+            cached = None
+        if cached:
             return QueryResponse(
-                response="I am currently experiencing high load. Please try again later.",
-                source="error",
-                confidence=0.0
+                response=cached["response"],
+                source=cached["source"],
+                confidence=0.5,
+                path="cache"
             )
 
+    if not scheduler:
+        return QueryResponse(
+            response="Please ensure backend components are initialized.",
+            source="system_error",
+            confidence=0.0
+        )
+
+    # 2. Tier 3: RAG Retrieval when the router says knowledge is needed,
+    # packed into whatever room the SLM window leaves
+    try:
+        system_prompt, source, prompt_tokens = await embed_pool.run(
+            prepare_prompt, rag if route == "rag" else None, query, query_embedding, trace
+        )
+    except PoolSaturated:
+        raise HTTPException(status_code=503, detail="Server is busy. Please retry shortly.")
+
+    # 3. Tier 2: SLM Response
+    prompt_tokens_histogram.observe(prompt_tokens, source=source)
+    return GenerationPlan(scheduler, system_prompt, source, query_embedding, prompt_tokens)
+
+def match_and_route(matcher, rag, query, query_embedding):
+    match_result = matcher.find_match(query, query_embedding) if matcher else None
+    if match_result and match_result["match_found"]:
+        return match_result, "dataset"
+    score = match_result["score"] if match_result else None
+    return match_result, router.route(query, score, rag)
+
+def prepare_prompt(rag, query, query_embedding, trace):
+    chunks = None
+    if rag:
+        with trace.stage("retrieve"):
+            chunks = rag.retrieve_scored(query, n_results=RAG_CANDIDATES, query_embedding=query_embedding)
+    return build_prompt(query, chunks, trace)
+
+def build_prompt(query, chunks, trace=None):
+    """System prompt with `chunks` (None: no retrieval) packed in, its source and its size."""
+    slm = registry.get("slm")
+    context = ""
+    if chunks is not None:
+        start = time.perf_counter()
+        budget = min(RAG_CONTEXT_TOKENS, slm.context_budget(SYSTEM_PROMPT, query, SLM_MAX_TOKENS))
+        context, info = context_builder.build(query, chunks, budget, count_tokens=slm.count_tokens)
+        if trace is not None:
+            trace.record("pack", time.perf_counter() - start)
+        logger.debug("Packed %d/%d chunks into %d/%d tokens.", info["used"], info["candidates"], info["tokens"], budget)
+
+    system_prompt = SYSTEM_PROMPT
+    if context:
+        system_prompt += f"\nContext:\n{context}"
+        source = "rag"
+    else:
+        source = "slm"
+    prompt_tokens = slm.count_tokens(slm.build_prompt(system_prompt, query))
+    return system_prompt, source, prompt_tokens
+
+def remember(plan, response_text, pool=embed_pool):
+    if response_cache and plan.query_embedding is not None:
+        try:
+            # Fire and forget: the answer is ready, don't wait on the store
+            pool.submit(response_cache.put, plan.query_embedding, response_text, plan.source)
+        except PoolSaturated:
+            pass
+
+def record_request(path, start, trace=None):
+    elapsed = time.perf_counter() - start
+    router.record(path, elapsed)
+    request_seconds.observe(elapsed, path=path)
+    if trace is not None:
+        trace.record("total", elapsed, observe=False)
+
+def wants_trace(x_trace):
+    return TRACE_HEADERS or x_trace == "1"
+
+@app.post("/query", response_model=QueryResponse)
+async def handle_query(request: QueryRequest, response: Response, x_trace: Optional[str] = Header(None)):
+    query = request.query
+    logger.debug("Received query: %s", query)
+    start = time.perf_counter()
+    trace = Trace(stage_seconds)
+    answer = await answer_query(query, trace)
+    record_request(answer.path or answer.source, start, trace)
+    if wants_trace(x_trace):
+        response.headers["Server-Timing"] = trace.server_timing()
+    return answer
+
+async def answer_query(query, trace):
+    result = await resolve_query(query, trace)
+    if isinstance(result, QueryResponse):
+        return result
+
+    try:
+        generation = result.scheduler.submit(
+            result.system_prompt, query, tier=result.source, max_tokens=SLM_MAX_TOKENS
+        )
+        try:
+            response_text = await asyncio.wrap_future(generation.future)
+        except asyncio.CancelledError:
+            generation.cancel()
+            raise
+        # Already observed by the scheduler hook; only added to this trace
+        for stage in ("queue_wait", "prompt_eval", "generate"):
+            trace.record(stage, generation.timings[stage], observe=False)
+        remember(result, response_text)
+        return QueryResponse(
+            response=response_text,
+            source=result.source,
+            confidence=0.5,
+            path=result.source,
+            prompt_tokens=result.prompt_tokens
+        )
+    except (PoolSaturated, DeadlineExceeded) as e:
+        # Generation backlog is full or too slow: degrade instead of waiting
+        logger.warning("SLM unavailable (%s), returning degraded response.", e)
+        return QueryResponse(
+            response=BUSY_MESSAGE,
+            source="busy",
+            confidence=0.0
+        )
+    except Exception as e:
+        logger.error("SLM failed: %s", e)
+        return QueryResponse(
+            response=BUSY_MESSAGE,
+            source="error",
+            confidence=0.0
+        )
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def stream_events(query, result, start):
+    # Dataset and cached answers arrive as a single chunk on the same channel
+    if isinstance(result, QueryResponse):
+        yield sse("meta", {"source": result.source, "confidence": result.confidence, "path": result.path})
+        yield sse("token", {"text": result.response})
+        yield sse("done", {"response": result.response})
+        record_request(result.path or result.source, start)
+        return
+
+    loop = asyncio.get_running_loop()
+    pieces = asyncio.Queue()
+
+    def on_token(piece):
+        loop.call_soon_threadsafe(pieces.put_nowait, ("token", piece))
+
+    def on_done(future):
+        error = future.exception() if not future.cancelled() else None
+        loop.call_soon_threadsafe(pieces.put_nowait, ("error", str(error)) if error else ("end", None))
+
+    try:
+        generation = result.scheduler.submit(
+            result.system_prompt, query, tier=result.source, max_tokens=SLM_MAX_TOKENS, on_token=on_token
+        )
+    except PoolSaturated:
+        logger.warning("SLM queue saturated, returning degraded response.")
+        yield sse("meta", {"source": "busy", "confidence": 0.0, "path": None})
+        yield sse("token", {"text": BUSY_MESSAGE})
+        yield sse("done", {"response": BUSY_MESSAGE})
+        record_request("busy", start)
+        return
+    generation.future.add_done_callback(on_done)
+
+    yield sse("meta", {
+        "source": result.source,
+        "confidence": 0.5,
+        "path": result.source,
+        "prompt_tokens": result.prompt_tokens
+    })
+    text = []
+    failed = False
+    try:
+        while True:
+            kind, value = await pieces.get()
+            if kind == "token":
+                text.append(value)
+                yield sse("token", {"text": value})
+            elif kind == "error":
+                logger.error("SLM failed: %s", value)
+                failed = True
+                yield sse("error", {"detail": BUSY_MESSAGE})
+                break
+            else:
+                break
+    finally:
+        # No-op when finished; stops decoding if the client went away
+        generation.cancel()
+
+    response_text = "".join(text).strip()
+    if not failed:
+        remember(result, response_text)
+    record_request("error" if failed else result.source, start)
+    yield sse("done", {"response": response_text})
+
+@app.post("/query/stream")
+async def handle_query_stream(request: QueryRequest, x_trace: Optional[str] = Header(None)):
+    """Server-Sent Events: a 'meta' event, then 'token' events, then 'done'."""
+    query = request.query
+    logger.debug("Received streaming query: %s", query)
+    start = time.perf_counter()
+    trace = Trace(stage_seconds)
+    result = await resolve_query(query, trace)
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    if wants_trace(x_trace):
+        # Headers go out before generation, so only the stages up to here
+        headers["Server-Timing"] = trace.server_timing()
+    return StreamingResponse(
+        stream_events(query, result, start),
+        media_type="text/event-stream",
+        headers=headers
+    )
+
+
+# Bulk answering (e.g. call-centre transcripts): queries are resolved in
+# chunks of BATCH_CHUNK, with one embedding pass and one Tier 1 search per
+# chunk, and at most BATCH_SLOTS batch generations use the SLM at a time
+# (at the lowest scheduler priority, behind interactive traffic).
+# Resolution and the cache writes of batch answers run in their own pool of
+# BATCH_WORKERS threads, so bulk jobs never fill or hold embed_pool, and
+# small chunks keep each encode short enough for Tier 1 to get in between.
+BATCH_CHUNK = int(os.environ.get("BATCH_CHUNK", "32"))
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", "1"))
+BATCH_SLOTS = int(os.environ.get("BATCH_SLOTS", str(SLM_WORKERS)))
+
+batch_pool = WorkerPool("batch", max_workers=BATCH_WORKERS, max_queue=64)
+
+batch_queries = metrics.counter("batch_queries_total", "Queries answered through /query/batch, by path.", labels=("path",))
+
+class BatchItem:
+    """One input line: the query, an optional caller id, or why it could not be read."""
+    def __init__(self, query=None, id=None, error=None):
+        self.query = query
+        self.id = id
+        self.error = error
+
+def parse_batch_item(value):
+    if isinstance(value, bytes):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return BatchItem(error="Line is not valid JSON.")
+    if isinstance(value, str):
+        return BatchItem(query=value)
+    if isinstance(value, dict) and isinstance(value.get("query"), str):
+        return BatchItem(query=value["query"], id=value.get("id"))
+    return BatchItem(error='Expected a string or an object with a "query" string.')
+
+async def ndjson_items(body):
+    for line in body.split(b"\n"):
+        if line.strip():
+            yield parse_batch_item(line)
+
+async def list_items(values):
+    for value in values:
+        yield parse_batch_item(value)
+
+async def chunks_of(items, size):
+    chunk = []
+    async for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def resolve_batch(queries):
+    """
+    `resolve_query` for a chunk of queries in one pass: exact and small-talk
+    answers first, then a single embedding pass and Tier 1 search over the
+    rest, one retrieval call for everything routed to RAG, and one
+    generation plan per distinct question. Returns a QueryResponse or a
+    (possibly shared) GenerationPlan per query.
+    """
+    embedder = registry.get("embedder")
+    matcher = registry.get("matcher")
+    rag = registry.get("rag")
+    scheduler = registry.get("scheduler")
+
+    # Transcripts repeat themselves; answer each distinct question once
+    distinct = {}
+    for query in queries:
+        distinct.setdefault(normalize_text(query), query)
+    resolved = {}
+    pending = []
+    for key, query in distinct.items():
+        exact = matcher.find_exact(query) if matcher else None
+        small_talk = None if exact else router.small_talk_reply(query)
+        if exact:
+            resolved[key] = QueryResponse(response=exact["response"], source="dataset", confidence=exact["score"], path="exact")
+        elif small_talk:
+            resolved[key] = QueryResponse(response=small_talk, source="smalltalk", confidence=1.0, path="smalltalk")
+        else:
+            pending.append(key)
+
+    texts = [distinct[key] for key in pending]
+    embeddings = embedder.encode(texts) if embedder and texts else [None] * len(texts)
+    matches = matcher.match_batch(texts, embeddings) if matcher and embedder and texts else [None] * len(texts)
+
+    misses = []
+    for key, query, embedding, match in zip(pending, texts, embeddings, matches):
+        if match and match["match_found"]:
+            resolved[key] = QueryResponse(
+                response=match["response"], source="dataset", confidence=match["score"],
+                path=match.get("match_type", "semantic")
+            )
+            continue
+        route = router.route(query, match["score"] if match else None, rag)
+        if route == "fallback":
+            resolved[key] = QueryResponse(response=FALLBACK_REPLY, source="fallback", confidence=0.0, path="fallback")
+            continue
+        cached = response_cache.lookup(embedding) if response_cache and embedding is not None else None
+        if cached:
+            resolved[key] = QueryResponse(response=cached["response"], source=cached["source"], confidence=0.5, path="cache")
+            continue
+        if not scheduler:
+            resolved[key] = QueryResponse(
+                response="Please ensure backend components are initialized.", source="system_error", confidence=0.0
+            )
+            continue
+        misses.append((key, query, embedding, route))
+
+    for_rag = [(key, query, embedding) for key, query, embedding, route in misses if route == "rag" and rag]
+    retrieved = {}
+    if for_rag:
+        chunks = rag.retrieve_batch(
+            [query for _, query, _ in for_rag], n_results=RAG_CANDIDATES,
+            query_embeddings=[embedding for _, _, embedding in for_rag] if embedder else None
+        )
+        retrieved = {key: query_chunks for (key, _, _), query_chunks in zip(for_rag, chunks)}
+    for key, query, embedding, route in misses:
+        system_prompt, source, prompt_tokens = build_prompt(query, retrieved.get(key))
+        prompt_tokens_histogram.observe(prompt_tokens, source=source)
+        resolved[key] = GenerationPlan(scheduler, system_prompt, source, embedding, prompt_tokens)
+
+    return [resolved[normalize_text(query)] for query in queries]
+
+async def run_patiently(fn, *args):
+    # Bulk work waits for room in its pool instead of failing with 503
+    while True:
+        try:
+            return await batch_pool.run(fn, *args)
+        except PoolSaturated:
+            await asyncio.sleep(0.05)
+
+async def generate_batch_answer(query, plan, slots):
+    async with slots:
+        deadline = time.monotonic() + SLM_DEADLINE
+        while True:
+            try:
+                generation = plan.scheduler.submit(plan.system_prompt, query, tier="batch", max_tokens=SLM_MAX_TOKENS)
+                break
+            except PoolSaturated:
+                # Interactive requests hold the queue; wait for them
+                if time.monotonic() > deadline:
+                    return QueryResponse(response=BUSY_MESSAGE, source="busy", confidence=0.0)
+                await asyncio.sleep(0.05)
+        try:
+            response_text = await asyncio.wrap_future(generation.future)
+        except asyncio.CancelledError:
+            generation.cancel()
+            raise
+        except Exception as e:
+            logger.warning("Batch generation failed: %s", e)
+            return QueryResponse(response=BUSY_MESSAGE, source="error", confidence=0.0)
+    remember(plan, response_text, pool=batch_pool)
     return QueryResponse(
-        response="Please ensure backend components are initialized.",
-        source="system_error",
-        confidence=0.0
+        response=response_text, source=plan.source, confidence=0.5, path=plan.source, prompt_tokens=plan.prompt_tokens
     )
 
+async def batch_lines(items):
+    """
+    NDJSON answers in input order. Each line is emitted as soon as it and
+    every line before it are ready; the next chunk is resolved while the
+    generations of the previous ones run.
+    """
+    ready = asyncio.Queue(maxsize=BATCH_CHUNK * 4)
+    slots = asyncio.Semaphore(max(1, BATCH_SLOTS))
+    tasks = set()
+
+    async def produce():
+        try:
+            async for chunk in chunks_of(items, BATCH_CHUNK):
+                queries = [item.query for item in chunk if item.error is None]
+                start = time.perf_counter()
+                results = iter(await run_patiently(resolve_batch, queries) if queries else [])
+                stage_seconds.observe(time.perf_counter() - start, stage="batch_resolve")
+                generations = {}
+                for item in chunk:
+                    result = None if item.error is not None else next(results)
+                    if isinstance(result, GenerationPlan):
+                        if id(result) not in generations:
+                            task = asyncio.ensure_future(generate_batch_answer(item.query, result, slots))
+                            generations[id(result)] = task
+                            tasks.add(task)
+                        result = generations[id(result)]
+                    await ready.put((item, result))
+        finally:
+            await ready.put(None)
+
+    producer = asyncio.ensure_future(produce())
+    index = 0
+    try:
+        while True:
+            entry = await ready.get()
+            if entry is None:
+                break
+            item, result = entry
+            line = {"index": index}
+            if item.id is not None:
+                line["id"] = item.id
+            if item.error is not None:
+                line["error"] = item.error
+            else:
+                if isinstance(result, asyncio.Future):
+                    result = await result
+                batch_queries.inc(path=result.path or result.source)
+                line.update(result.model_dump())
+            index += 1
+            yield json.dumps(line) + "\n"
+        await asyncio.wait([producer])
+        if not producer.cancelled() and producer.exception() is not None:
+            logger.error("Batch failed after %d queries: %s", index, producer.exception())
+            yield json.dumps({"index": index, "error": "Batch aborted: " + str(producer.exception())}) + "\n"
+    finally:
+        # The client went away: stop reading, resolving and generating
+        producer.cancel()
+        for task in tasks:
+            task.cancel()
+
+@app.post("/query/batch")
+async def handle_query_batch(request: Request):
+    """
+    Answer many queries in one request. The body is either JSON
+    ({"queries": [...]} or a bare list) or NDJSON (Content-Type
+    application/x-ndjson), one query per line. Each item is a string or
+    {"query": ..., "id": ...}. Answers stream back as NDJSON in input order:
+    {"index", "id", "response", "source", "confidence", "path", ...}.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        # Read up front: once the response starts, Starlette consumes the
+        # request channel to watch for disconnects
+        items = ndjson_items(await request.body())
+    else:
+        try:
+            body = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be JSON or NDJSON.")
+        queries = body.get("queries") if isinstance(body, dict) else body
+        if not isinstance(queries, list):
+            raise HTTPException(status_code=422, detail='Expected {"queries": [...]} or a JSON list.')
+        items = list_items(queries)
+    return StreamingResponse(batch_lines(items), media_type="application/x-ndjson")
+
+
+def check_admin_token(token):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled. Set ADMIN_TOKEN to enable them.")
+    if token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
+
+
+class ReloadRequest(BaseModel):
+    targets: List[Literal["matcher", "rag"]] = ["matcher", "rag"]
+
+@app.post("/admin/reload")
+async def admin_reload(request: Optional[ReloadRequest] = None, x_admin_token: Optional[str] = Header(None)):
+    check_admin_token(x_admin_token)
+    targets = request.targets if request else ["matcher", "rag"]
+    if WORKERS:
+        # The supervisor re-syncs shared state, then tells every worker to
+        # reload; it takes one signal per target
+        for target in set(targets):
+            os.kill(os.getppid(), RELOAD_SIGNALS[target])
+        return {"status": "scheduled", "results": None}
+    # Queries keep being served from the current snapshot while this runs
+    results = await asyncio.to_thread(reloader.reload, targets)
+    return {"status": "ok", "results": results}
+
+
+@app.post("/admin/profile")
+async def admin_profile(seconds: float = 10.0, x_admin_token: Optional[str] = Header(None)):
+    """Sample every thread's stack for `seconds` and return collapsed stacks for a flame graph."""
+    check_admin_token(x_admin_token)
+    if profiler is None:
+        raise HTTPException(status_code=404, detail="Profiling is disabled. Set PROFILER=1 to enable it.")
+    try:
+        profiler.start()
+    except RuntimeError:
+        raise HTTPException(status_code=409, detail="A profile is already being taken.")
+    try:
+        await asyncio.sleep(min(max(seconds, 0.1), 300.0))
+    finally:
+        profiler.stop()
+    return PlainTextResponse(profiler.collapsed())
+
+
+@app.get("/metrics")
+def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 
 @app.get("/health")
 def health_check():
+    components = registry.status()
+    states = {info["state"] for info in components.values()}
+    if "failed" in states:
+        status = "degraded"
+    elif states == {"ready"}:
+        status = "ok"
+    else:
+        status = "starting"
+
+    embedder = registry.get("embedder")
+    matcher = registry.get("matcher")
+    rag = registry.get("rag")
+    scheduler = registry.get("scheduler")
     return {
-        "status": "ok", 
-        "components": {
-            "matcher": matcher is not None,
-            "slm": slm is not None,
-            "rag": rag is not None
-        }
+        "status": status,
+        "pid": os.getpid(),
+        "components": components,
+        "embedder": embedder.stats() if embedder else None,
+        "matcher": matcher.stats if matcher else None,
+        "rag": rag.stats if rag else None,
+        "routes": router.stats(),
+        "response_cache": response_cache.stats() if response_cache else None,
+        "pools": {
+            "embed": embed_pool.stats(),
+            "batch": batch_pool.stats()
+        },
+        "scheduler": scheduler.stats() if scheduler else None
     }
 
 if __name__ == "__main__":
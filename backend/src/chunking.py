@@ -0,0 +1,97 @@
+import re
+
+# Sentence ends at ., ! or ? followed by whitespace (but not list numbers
+# such as "1. "); a line break always ends one
+_SENTENCE_END = re.compile(r"(?<=[^0-9\s][.!?])\s+|\n+")
+
+
+def approx_token_count(text):
+    # WordPiece averages ~1.3 tokens per whitespace word on English text
+    return int(len(text.split()) * 1.3) + 1
+
+
+def iter_paragraphs(file_path, max_chars=20000, stats=None):
+    """
+    Stream blank-line separated paragraphs from a text file without loading
+    it whole. Very long paragraphs are cut at `max_chars` (on a line
+    boundary where possible) so memory stays bounded.
+    """
+    lines = []
+    size = 0
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if stats is not None:
+                stats["bytes"] += len(line.encode("utf-8"))
+            if not line.strip():
+                if lines:
+                    yield "".join(lines).strip()
+                    lines, size = [], 0
+                continue
+            lines.append(line)
+            size += len(line)
+            if size >= max_chars:
+                yield "".join(lines).strip()
+                lines, size = [], 0
+    if lines:
+        yield "".join(lines).strip()
+
+
+def split_sentences(paragraph):
+    return [s.strip() for s in _SENTENCE_END.split(paragraph) if s.strip()]
+
+
+class TextChunker:
+    """
+    Packs sentences into chunks of at most `max_tokens`, carrying roughly
+    `overlap_tokens` of trailing sentences into the next chunk. Sentences
+    never get split unless a single one exceeds the budget. Short
+    paragraphs are merged with their neighbours instead of being dropped.
+    """
+
+    def __init__(self, count_tokens=approx_token_count, max_tokens=160, overlap_tokens=32):
+        self.count_tokens = count_tokens
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+
+    def _pieces(self, sentence):
+        tokens = self.count_tokens(sentence)
+        if tokens <= self.max_tokens:
+            yield sentence, tokens
+            return
+        # Oversized sentence: fall back to word windows
+        words = sentence.split()
+        step = max(1, int(len(words) * self.max_tokens / tokens))
+        for start in range(0, len(words), step):
+            piece = " ".join(words[start:start + step])
+            yield piece, self.count_tokens(piece)
+
+    def chunk(self, paragraphs):
+        current = []
+        current_tokens = 0
+        # Sentences added since the last emitted chunk; a chunk made only of
+        # overlap carried from the previous one is never emitted on its own.
+        fresh = False
+        for paragraph in paragraphs:
+            for sentence in split_sentences(paragraph):
+                for piece, tokens in self._pieces(sentence):
+                    if current and current_tokens + tokens > self.max_tokens:
+                        yield " ".join(s for s, _ in current)
+                        current, current_tokens = self._overlap(current, self.max_tokens - tokens)
+                        fresh = False
+                    current.append((piece, tokens))
+                    current_tokens += tokens
+                    fresh = True
+        if current and fresh:
+            yield " ".join(s for s, _ in current)
+
+    def _overlap(self, sentences, room):
+        # Trailing sentences up to the overlap budget, leaving room for the next one
+        budget = min(self.overlap_tokens, room)
+        carried = []
+        total = 0
+        for sentence, tokens in reversed(sentences):
+            if total + tokens > budget:
+                break
+            carried.insert(0, (sentence, tokens))
+            total += tokens
+        return carried, total
@@ -0,0 +1,91 @@
+import threading
+
+import numpy as np
+
+try:
+    from embedding_cache import EmbeddingCache
+    from index import build_index
+except ImportError:
+    from .embedding_cache import EmbeddingCache
+    from .index import build_index
+
+
+class _Contents:
+    """Chunks, their vectors and search index, swapped in as one unit."""
+    def __init__(self, ids, texts, sources, vectors, index):
+        self.ids = ids
+        self.texts = texts
+        self.sources = sources
+        self.vectors = vectors
+        self.index = index
+        self.rows = {chunk_id: row for row, chunk_id in enumerate(ids)}
+
+
+class CompactRetriever:
+    """
+    In-process alternative to the Chroma collection for RAGEngine.
+
+    Chunk vectors live in a memory-mapped EmbeddingCache (shared by every
+    worker through the page cache, and only new chunks are encoded on a
+    re-sync). Search runs on a quantised copy (`index_type` "int8", "fp16"
+    or "pq", see index.QuantizedIndex) with an exact float re-rank, so the
+    per-process cost is the codes plus the chunk texts.
+    """
+
+    def __init__(self, cache_dir, embedder, index_type="int8", index_params=None):
+        self.embedder = embedder
+        self.index_type = index_type
+        self.index_params = index_params or {}
+        self.cache = EmbeddingCache(cache_dir, embedder.model_name, name="knowledge_base")
+        self.contents = _Contents([], [], [], None, None)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.contents.ids)
+
+    def ids(self):
+        return list(self.contents.ids)
+
+    def sync(self, chunks):
+        """Replace the contents with `chunks`, a list of (id, text, metadata)."""
+        texts = [text for _, text, _ in chunks]
+        with self._lock:
+            vectors = self.cache.load(texts, self.embedder.encode) if texts else None
+            index = build_index(vectors, self.index_type, **self.index_params) if texts else None
+            self.contents = _Contents(
+                [chunk_id for chunk_id, _, _ in chunks],
+                texts,
+                [(metadata or {}).get("source") for _, _, metadata in chunks],
+                vectors,
+                index
+            )
+        return self.cache.encoded
+
+    def query(self, query_embedding, n_results):
+        """Nearest chunks as {id: chunk dict with cosine score}."""
+        contents = self.contents
+        if contents.index is None:
+            return {}
+        rows, scores = contents.index.search(query_embedding, n_results)
+        return {contents.ids[row]: self._chunk(contents, row, score) for row, score in zip(rows, scores)}
+
+    def get(self, ids, query_embedding=None):
+        contents = self.contents
+        found = {}
+        for chunk_id in ids:
+            row = contents.rows.get(chunk_id)
+            if row is None:
+                continue
+            score = 0.0
+            if query_embedding is not None:
+                score = float(np.dot(np.asarray(contents.vectors[row], dtype=np.float32), query_embedding))
+            found[chunk_id] = self._chunk(contents, row, score)
+        return found
+
+    def _chunk(self, contents, row, score):
+        return {
+            "id": contents.ids[row],
+            "text": contents.texts[row],
+            "source": contents.sources[row],
+            "score": float(score)
+        }
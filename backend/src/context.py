@@ -0,0 +1,89 @@
+import re
+
+try:
+    from chunking import split_sentences, approx_token_count
+except ImportError:
+    from .chunking import split_sentences, approx_token_count
+
+_WORD = re.compile(r"\w+")
+
+
+def _words(text):
+    return set(_WORD.findall(text.lower()))
+
+
+class ContextBuilder:
+    """
+    Assembles retrieved chunks into a context block that fits the SLM window.
+
+    Chunks are ranked by retrieval score, sentences already included (for
+    example from chunk overlap) are dropped, and chunks that add little new
+    text are skipped. The rest is packed greedily into `budget` tokens. A
+    chunk that does not fit can optionally contribute just its sentences
+    that share the most words with the query.
+    """
+
+    def __init__(self, count_tokens=approx_token_count, min_score=0.0, min_new_ratio=0.5, extract_sentences=True):
+        self.count_tokens = count_tokens
+        self.min_score = min_score
+        self.min_new_ratio = min_new_ratio
+        self.extract_sentences = extract_sentences
+
+    def build(self, query, chunks, budget, count_tokens=None):
+        """
+        Return (context_text, info) where info describes what was packed.
+        `count_tokens` overrides the builder's counter, e.g. with the SLM's tokenizer.
+        """
+        count_tokens = count_tokens or self.count_tokens
+        info = {"candidates": len(chunks), "used": 0, "duplicates": 0, "truncated": 0, "tokens": 0}
+        seen = set()
+        parts = []
+        remaining = budget
+        query_words = _words(query)
+
+        for chunk in sorted(chunks, key=lambda c: c["score"], reverse=True):
+            if chunk["score"] < self.min_score or remaining <= 0:
+                continue
+            sentences = split_sentences(chunk["text"])
+            new = [s for s in sentences if s not in seen]
+            if not new or len(new) < self.min_new_ratio * len(sentences):
+                info["duplicates"] += 1
+                continue
+
+            text = " ".join(new)
+            tokens = count_tokens(text)
+            if tokens > remaining:
+                if not self.extract_sentences:
+                    continue
+                new = self._relevant(new, query_words, remaining, count_tokens)
+                if not new:
+                    continue
+                text = " ".join(new)
+                tokens = count_tokens(text)
+                info["truncated"] += 1
+
+            parts.append(text)
+            seen.update(new)
+            remaining -= tokens
+            info["tokens"] += tokens
+            info["used"] += 1
+
+        return "\n".join(parts), info
+
+    def _relevant(self, sentences, query_words, budget, count_tokens):
+        # Highest word overlap first, then restore document order
+        ranked = sorted(
+            range(len(sentences)),
+            key=lambda i: len(_words(sentences[i]) & query_words),
+            reverse=True
+        )
+        chosen = []
+        used = 0
+        for i in ranked:
+            if not _words(sentences[i]) & query_words:
+                break
+            tokens = count_tokens(sentences[i])
+            if used + tokens <= budget:
+                chosen.append(i)
+                used += tokens
+        return [sentences[i] for i in sorted(chosen)]
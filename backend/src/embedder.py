@@ -0,0 +1,150 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+try:
+    from executor import PoolSaturated
+except ImportError:
+    from .executor import PoolSaturated
+
+# Use a small, fast model.
+# 'all-MiniLM-L6-v2' is standard and very fast.
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+
+# "torch" runs sentence-transformers; "onnx" and "numpy" run the same
+# weights without importing torch (export them with scripts/export_onnx.py)
+EMBED_BACKENDS = ("torch", "onnx", "numpy")
+
+
+def load_model(model_name=MODEL_NAME, backend="torch", model_dir=None, threads=None):
+    if backend not in EMBED_BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}'. Choose from {', '.join(EMBED_BACKENDS)}.")
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name)
+    try:
+        from lite_encoder import BACKENDS
+    except ImportError:
+        from .lite_encoder import BACKENDS
+    if not model_dir or not os.path.exists(os.path.join(model_dir, "config.json")):
+        raise FileNotFoundError(f"No exported model in {model_dir}; run scripts/export_onnx.py first.")
+    return BACKENDS[backend](model_dir, threads=threads)
+
+
+class EmbeddingService:
+    """
+    In-process micro-batching front end for a SentenceTransformer (or one
+    of the torch-free encoders in lite_encoder.py, see `backend`).
+
+    Concurrent callers of `submit`/`embed` are collected for up to
+    `max_wait_ms` (or until `max_batch_size` queries are waiting), encoded
+    in a single forward pass and the rows are handed back to each caller.
+    Vectors are float32 and L2-normalised, so cosine similarity is a dot product.
+    """
+
+    def __init__(self, model=None, model_name=MODEL_NAME, max_batch_size=32, max_wait_ms=5, max_queue=256,
+                 backend="torch", model_dir=None, threads=None, on_batch=None):
+        self.model = model if model is not None else load_model(model_name, backend, model_dir, threads)
+        # Every backend produces the same vectors, so they share cache keys
+        self.model_name = model_name
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.queries = 0
+        self.encode_seconds = 0.0
+        # Called with (batch size, encode seconds) after every micro-batch
+        self.on_batch = on_batch
+
+    def encode(self, texts, batch_size=64):
+        """Encode a list of texts synchronously, bypassing the micro-batcher."""
+        return self.model.encode(
+            texts,
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        ).astype('float32', copy=False)
+
+    def count_tokens(self, text):
+        """Number of model tokens in `text` (without special tokens)."""
+        tokenizer = getattr(self.model, "tokenizer", None)
+        if tokenizer is None:
+            return int(len(text.split()) * 1.3) + 1
+        return len(tokenizer.tokenize(text))
+
+    def submit(self, text):
+        """Queue one text for the next batch and return a Future of its vector."""
+        self._ensure_started()
+        future = Future()
+        try:
+            self._queue.put_nowait((text, future))
+        except queue.Full:
+            raise PoolSaturated("embedding queue is full")
+        return future
+
+    def embed(self, text):
+        return self.submit(text).result()
+
+    async def aembed(self, text):
+        return await asyncio.wrap_future(self.submit(text))
+
+    def stats(self):
+        return {
+            "backend": self.backend,
+            "queued": self._queue.qsize(),
+            "batches": self.batches,
+            "queries": self.queries,
+            "avg_batch_size": (self.queries / self.batches) if self.batches else 0.0,
+            "encode_seconds": self.encode_seconds,
+        }
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        # Block for the first item, then linger briefly to let a batch form
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            start = time.perf_counter()
+            try:
+                vectors = self.encode([text for text, _ in batch], batch_size=len(batch))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            elapsed = time.perf_counter() - start
+            self.batches += 1
+            self.queries += len(batch)
+            self.encode_seconds += elapsed
+            if self.on_batch is not None:
+                self.on_batch(len(batch), elapsed)
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
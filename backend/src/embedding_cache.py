@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows; writers simply don't coordinate there
+    fcntl = None
+
+
+def text_key(model_name, text):
+    return hashlib.sha1(f"{model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent, memory-mapped store of text embeddings.
+
+    Rows live in a single `.npy` file next to a JSON manifest listing the
+    key of every row, where a key is a hash of the model name and the text.
+    `load()` returns the matrix for a list of texts, re-encoding only texts
+    whose key is not already on disk. When nothing changed, the existing
+    file is mapped read-only, so every worker shares one copy through the
+    page cache.
+    """
+
+    def __init__(self, cache_dir, model_name, name="embeddings", dtype="float32"):
+        self.cache_dir = cache_dir
+        self.model_name = model_name
+        self.name = name
+        self.dtype = np.dtype(dtype)
+        self.manifest_path = os.path.join(cache_dir, f"{name}.manifest.json")
+        self.lock_path = os.path.join(cache_dir, f"{name}.lock")
+        self.encoded = 0
+
+    def load(self, texts, encode_fn):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        keys = [text_key(self.model_name, t) for t in texts]
+
+        manifest, matrix = self._read()
+        if manifest is not None and manifest["keys"] == keys:
+            self.encoded = 0
+            return matrix
+
+        with self._lock():
+            # Another worker may have written the file while we waited
+            manifest, matrix = self._read()
+            if manifest is not None and manifest["keys"] == keys:
+                self.encoded = 0
+                return matrix
+            self._write(texts, keys, manifest, matrix, encode_fn)
+
+        return self._read()[1]
+
+    def _read(self):
+        if not os.path.exists(self.manifest_path):
+            return None, None
+        try:
+            with open(self.manifest_path, "r") as f:
+                manifest = json.load(f)
+            if manifest.get("model") != self.model_name or manifest.get("dtype") != self.dtype.name:
+                return None, None
+            matrix = np.load(os.path.join(self.cache_dir, manifest["file"]), mmap_mode="r")
+        except (OSError, ValueError, KeyError):
+            return None, None
+        if matrix.shape[0] != len(manifest["keys"]):
+            return None, None
+        return manifest, matrix
+
+    def _write(self, texts, keys, manifest, matrix, encode_fn):
+        existing = {}
+        if manifest is not None:
+            existing = {key: row for row, key in enumerate(manifest["keys"])}
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in existing and key not in missing:
+                missing[key] = text
+
+        new_rows = {}
+        if missing:
+            print(f"Encoding {len(missing)} new or changed rows...")
+            vectors = np.asarray(encode_fn(list(missing.values())), dtype=self.dtype)
+            new_rows = dict(zip(missing.keys(), vectors))
+        self.encoded = len(missing)
+
+        if new_rows:
+            dim = next(iter(new_rows.values())).shape[0]
+        elif matrix is not None:
+            dim = matrix.shape[1]
+        else:
+            dim = 0
+        out = np.empty((len(keys), dim), dtype=self.dtype)
+        for i, key in enumerate(keys):
+            out[i] = new_rows[key] if key in new_rows else matrix[existing[key]]
+
+        # Content-addressed file name: the manifest swap is the commit point,
+        # and readers that still map the old file keep a valid view of it.
+        digest = hashlib.sha1("".join(keys).encode("utf-8")).hexdigest()[:16]
+        file_name = f"{self.name}-{digest}.npy"
+        tmp_path = os.path.join(self.cache_dir, file_name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, out)
+        os.replace(tmp_path, os.path.join(self.cache_dir, file_name))
+
+        tmp_manifest = self.manifest_path + ".tmp"
+        with open(tmp_manifest, "w") as f:
+            json.dump({
+                "model": self.model_name,
+                "dtype": self.dtype.name,
+                "dim": dim,
+                "file": file_name,
+                "keys": keys,
+            }, f)
+        os.replace(tmp_manifest, self.manifest_path)
+
+        if manifest is not None and manifest["file"] != file_name:
+            try:
+                os.remove(os.path.join(self.cache_dir, manifest["file"]))
+            except OSError:
+                pass
+
+    def _lock(self):
+        return _FileLock(self.lock_path)
+
+
+class _FileLock:
+    def __init__(self, path):
+        self.path = path
+        self.handle = None
+
+    def __enter__(self):
+        self.handle = open(self.path, "a")
+        if fcntl:
+            fcntl.flock(self.handle, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl:
+            fcntl.flock(self.handle, fcntl.LOCK_UN)
+        self.handle.close()
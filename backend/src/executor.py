@@ -0,0 +1,70 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PoolSaturated(Exception):
+    """Raised when a pool already holds as much work as it is allowed to queue."""
+    pass
+
+
+class WorkerPool:
+    """
+    Bounded thread pool for blocking model calls.
+
+    At most `max_workers` calls run at once and at most `max_queue` more may
+    wait for a thread. Anything beyond that is rejected immediately with
+    PoolSaturated so overload turns into a fast error instead of a backlog.
+    """
+
+    def __init__(self, name, max_workers=1, max_queue=8):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _acquire(self):
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                return False
+            self._pending += 1
+            return True
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+
+    def submit(self, fn, *args, **kwargs):
+        if not self._acquire():
+            raise PoolSaturated(f"{self.name} pool is saturated")
+        try:
+            future = self.executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._release()
+            raise
+        # Release on completion of the work itself, not of the awaiting
+        # coroutine, so a cancelled request still counts until its thread is free.
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, fn, *args, **kwargs):
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "pending": self._pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self, wait=False):
+        self.executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,247 @@
+import numpy as np
+
+try:
+    from quantize import build_quantizer
+except ImportError:
+    from .quantize import build_quantizer
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+
+# Query rows x dataset rows scored per matrix product in a batch search
+BATCH_SCORES = 1 << 22
+
+
+def top_k(scores, k):
+    """Indices of the k highest scores, best first."""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k == scores.shape[0]:
+        idx = np.arange(k)
+    else:
+        idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx])]
+
+
+class BruteForceIndex:
+    """Exact search: one matrix-vector product over pre-normalised vectors."""
+
+    name = "exact"
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    def search(self, query, k=1):
+        scores = self.vectors @ query
+        idx = top_k(scores, k)
+        return idx, scores[idx]
+
+    def search_batch(self, queries, k=1):
+        """`search` for every row of `queries` with one matrix product per block of queries."""
+        n = self.vectors.shape[0]
+        k = min(k, n)
+        rows, scores = [], []
+        step = max(1, BATCH_SCORES // max(1, n))
+        for start in range(0, len(queries), step):
+            block = np.asarray(queries[start:start + step], dtype=np.float32) @ self.vectors.T
+            if k <= 0:
+                idx = np.empty((block.shape[0], 0), dtype=np.int64)
+            elif k < n:
+                idx = np.argpartition(-block, k - 1, axis=1)[:, :k]
+            else:
+                idx = np.broadcast_to(np.arange(n), block.shape)
+            top = np.take_along_axis(block, idx, axis=1)
+            order = np.argsort(-top, axis=1)
+            rows.extend(np.take_along_axis(idx, order, axis=1))
+            scores.extend(np.take_along_axis(top, order, axis=1))
+        return rows, scores
+
+
+class IVFIndex:
+    """
+    Inverted-file index: vectors are bucketed by their nearest k-means
+    centroid and a query only scans the `nprobe` closest buckets. Raising
+    `nprobe` trades latency for recall; nprobe == nlist is exact search.
+    By default it probes a quarter of the buckets (see MATCHER_NPROBE in
+    the README for the recall this gives).
+    """
+
+    name = "ivf"
+
+    def __init__(self, vectors, nlist=None, nprobe=None, train_size=20000, iterations=10, seed=0):
+        n = vectors.shape[0]
+        self.nlist = max(1, min(nlist or int(4 * np.sqrt(n)), n))
+        self.nprobe = nprobe or max(1, self.nlist // 4)
+        rng = np.random.default_rng(seed)
+
+        sample = vectors
+        if n > train_size:
+            sample = vectors[rng.choice(n, train_size, replace=False)]
+        self.centroids = self._kmeans(np.asarray(sample, dtype=np.float32), rng, iterations)
+
+        # The only copy of the vectors, permuted into list order so a probe is
+        # one dense mat-vec; ids maps a position back to its dataset row
+        assignments = self._assign(vectors)
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=self.nlist)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+        self.ids = order
+        self.list_vectors = np.ascontiguousarray(vectors[order], dtype=np.float32)
+
+    def __len__(self):
+        return self.ids.shape[0]
+
+    def _assign(self, vectors, chunk=8192):
+        out = np.empty(vectors.shape[0], dtype=np.int64)
+        for start in range(0, vectors.shape[0], chunk):
+            out[start:start + chunk] = np.argmax(vectors[start:start + chunk] @ self.centroids.T, axis=1)
+        return out
+
+    def _kmeans(self, sample, rng, iterations):
+        # Spherical k-means: centroids are re-normalised, similarity is a dot product
+        centroids = sample[rng.choice(sample.shape[0], self.nlist, replace=False)].copy()
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            sums[empty] = centroids[empty]
+            norms[empty] = 1.0
+            centroids = sums / norms
+        return centroids.astype(np.float32)
+
+    def search(self, query, k=1):
+        probes = top_k(self.centroids @ query, self.nprobe)
+        ids = []
+        scores = []
+        for probe in probes:
+            start, end = self.offsets[probe], self.offsets[probe + 1]
+            if start == end:
+                continue
+            scores.append(self.list_vectors[start:end] @ query)
+            ids.append(self.ids[start:end])
+        if not ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        ids = np.concatenate(ids)
+        scores = np.concatenate(scores)
+        best = top_k(scores, k)
+        return ids[best], scores[best]
+
+
+class HNSWIndex:
+    """Graph-based ANN index backed by hnswlib; `ef` trades latency for recall."""
+
+    name = "hnsw"
+
+    def __init__(self, vectors, ef=64, M=16, ef_construction=200):
+        if hnswlib is None:
+            raise ImportError("hnswlib is not installed; use the 'exact' or 'ivf' index instead.")
+        n, dim = vectors.shape
+        self.index = hnswlib.Index(space="ip", dim=dim)
+        self.index.init_index(max_elements=max(1, n), M=M, ef_construction=ef_construction)
+        if n:
+            self.index.add_items(np.asarray(vectors, dtype=np.float32), np.arange(n))
+        self.index.set_ef(ef)
+        self.size = n
+
+    def __len__(self):
+        return self.size
+
+    def search(self, query, k=1):
+        k = min(k, self.size)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        labels, distances = self.index.knn_query(query, k=k)
+        # hnswlib's "ip" distance is 1 - dot product
+        return labels[0].astype(np.int64), (1.0 - distances[0]).astype(np.float32)
+
+    def search_batch(self, queries, k=1):
+        k = min(k, self.size)
+        if k <= 0:
+            empty = np.empty(0, dtype=np.int64)
+            return [empty] * len(queries), [empty.astype(np.float32)] * len(queries)
+        labels, distances = self.index.knn_query(np.asarray(queries, dtype=np.float32), k=k)
+        return list(labels.astype(np.int64)), list((1.0 - distances).astype(np.float32))
+
+
+class QuantizedIndex:
+    """
+    Brute-force search over quantised vectors (see quantize.py), followed by
+    an exact float32 re-rank of the best `k * rerank` candidates. Only the
+    codes are held in memory; the float32 matrix is usually the memory-mapped
+    embedding cache, so the re-rank touches a handful of its pages.
+    `rerank=0` returns the approximate scores as they are.
+    """
+
+    quantizer = "int8"
+
+    def __init__(self, vectors, rerank=4, **params):
+        self.vectors = vectors
+        self.rerank = rerank
+        self.codes = build_quantizer(vectors, self.quantizer, **params)
+        self.name = self.quantizer
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes
+
+    def search(self, query, k=1):
+        scores = self.codes.scores(query)
+        if not self.rerank:
+            idx = top_k(scores, k)
+            return idx, scores[idx]
+        shortlist = np.sort(top_k(scores, k * self.rerank))
+        exact = np.asarray(self.vectors[shortlist], dtype=np.float32) @ query
+        best = top_k(exact, k)
+        return shortlist[best], exact[best]
+
+
+class Float16Index(QuantizedIndex):
+    quantizer = "fp16"
+
+
+class Int8Index(QuantizedIndex):
+    quantizer = "int8"
+
+
+class PQIndex(QuantizedIndex):
+    quantizer = "pq"
+
+
+INDEX_TYPES = {
+    "exact": BruteForceIndex,
+    "ivf": IVFIndex,
+    "hnsw": HNSWIndex,
+    "fp16": Float16Index,
+    "int8": Int8Index,
+    "pq": PQIndex,
+}
+
+
+def search_batch(index, queries, k=1):
+    """
+    Search many query vectors at once: a list of row arrays and a list of
+    score arrays, one per query. Indexes without a batched search are
+    queried one vector at a time.
+    """
+    if hasattr(index, "search_batch"):
+        return index.search_batch(queries, k)
+    results = [index.search(query, k) for query in queries]
+    return [rows for rows, _ in results], [scores for _, scores in results]
+
+
+def build_index(vectors, index_type="exact", **params):
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}'. Choose from {sorted(INDEX_TYPES)}.")
+    return INDEX_TYPES[index_type](vectors, **params)
@@ -0,0 +1,35 @@
+import re
+
+# Loan products and the words customers use for them
+LOAN_TYPES = {
+    "personal loan": re.compile(r"\bpersonal\b"),
+    "home loan": re.compile(r"\b(home|housing|house|mortgage)\b"),
+    "car loan": re.compile(r"\b(car|auto|vehicle)\b"),
+    "education loan": re.compile(r"\b(education|student|study|studies)\b"),
+    "business loan": re.compile(r"\b(business|msme|sme)\b"),
+    "gold loan": re.compile(r"\bgold\b"),
+}
+
+# Intent categories, checked in order; thresholds are calibrated per category
+CATEGORIES = [
+    ("repayment", re.compile(r"\b(prepay\w*|foreclos\w*|tenure|emi|repay\w*|penalty)\b")),
+    ("documents", re.compile(r"\b(documents?|paperwork|papers?|itr|kyc)\b")),
+    ("interest", re.compile(r"\b(interest|rates?|roi)\b")),
+    ("eligibility", re.compile(r"\b(eligib\w*|qualify|criteria|attributes|who can apply|can i get)\b")),
+]
+GENERAL = "general"
+
+
+def loan_type(text):
+    """Canonical loan product mentioned in `text`, or None (also when several are)."""
+    text = text.lower()
+    found = [name for name, pattern in LOAN_TYPES.items() if pattern.search(text)]
+    return found[0] if len(found) == 1 else None
+
+
+def category(text):
+    text = text.lower()
+    for name, pattern in CATEGORIES:
+        if pattern.search(text):
+            return name
+    return GENERAL
@@ -0,0 +1,114 @@
+import math
+import re
+
+import numpy as np
+
+# Words, plus amounts with their grouping commas removed so "₹5,00,000" and
+# "500000" match. Short domain codes (RTGS, ITR, GST) survive as-is.
+_TOKEN = re.compile(r"\d[\d,]*(?:\.\d+)?|[a-z][a-z0-9]*")
+
+# Low-information words ignored when scoring and when measuring coverage
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "am", "i", "my", "me", "do", "does", "of",
+    "to", "for", "in", "on", "and", "or", "what", "how", "can", "could", "you",
+    "your", "please", "it", "be", "with", "by", "at", "from", "this", "that",
+}
+
+
+def tokenize(text):
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token[0].isdigit():
+            token = token.replace(",", "")
+        elif token in STOPWORDS:
+            continue
+        tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """
+    In-process Okapi BM25 inverted index.
+
+    Documents are added one at a time and the postings are frozen into
+    NumPy arrays by `finalize()`, after which searches only touch the
+    postings of the query terms. Built fresh on every ingestion and
+    swapped in as a whole, so readers never see a half-built index.
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids = []
+        self._lengths = []
+        self._postings = {}
+        self._idf = {}
+        self._norm = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, doc_id, text):
+        doc = len(self.ids)
+        self.ids.append(doc_id)
+        counts = {}
+        for token in tokenize(text):
+            counts[token] = counts.get(token, 0) + 1
+        self._lengths.append(sum(counts.values()))
+        for token, tf in counts.items():
+            self._postings.setdefault(token, []).append((doc, tf))
+
+    def finalize(self):
+        n = len(self.ids)
+        lengths = np.asarray(self._lengths, dtype=np.float32)
+        avg = float(lengths.mean()) if n else 0.0
+        # Per-document length normalisation term of the BM25 denominator
+        self._norm = self.k1 * (1 - self.b + self.b * lengths / avg) if avg else np.full(n, self.k1, dtype=np.float32)
+        for token, postings in self._postings.items():
+            docs = np.fromiter((d for d, _ in postings), dtype=np.int32, count=len(postings))
+            tfs = np.fromiter((tf for _, tf in postings), dtype=np.float32, count=len(postings))
+            self._postings[token] = (docs, tfs)
+            self._idf[token] = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+        return self
+
+    def search(self, query, k=5):
+        """
+        Top `k` documents as (doc_id, score, coverage), best first.
+        `coverage` is the share of the query's IDF weight the document
+        matched (terms unknown to the corpus count at the maximum IDF).
+        """
+        terms = set(tokenize(query))
+        if not terms or not self.ids:
+            return []
+        max_idf = math.log(1 + (len(self.ids) + 0.5) / 0.5)
+        total_idf = sum(self._idf.get(term, max_idf) for term in terms)
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        matched = np.zeros(len(self.ids), dtype=np.float32)
+        for term in terms:
+            if term not in self._postings:
+                continue
+            docs, tfs = self._postings[term]
+            idf = self._idf[term]
+            scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + self._norm[docs])
+            matched[docs] += idf
+        k = min(k, int(np.count_nonzero(scores)))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[i], float(scores[i]), float(matched[i] / total_idf)) for i in top]
+
+
+def fuse(dense, lexical, lexical_weight=0.3):
+    """
+    Combine dense and lexical hits ({id: score} each) into one ranking.
+    Dense scores are cosine similarities and are kept as they are; BM25
+    scores are divided by the best one so both lie in [0, 1]. A document
+    missing from one list contributes 0 for that part.
+    """
+    best = max(lexical.values(), default=0.0)
+    fused = {}
+    for doc_id in set(dense) | set(lexical):
+        lexical_score = lexical.get(doc_id, 0.0) / best if best else 0.0
+        fused[doc_id] = (1 - lexical_weight) * dense.get(doc_id, 0.0) + lexical_weight * lexical_score
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
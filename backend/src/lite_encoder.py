@@ -0,0 +1,201 @@
+import json
+import math
+import os
+
+import numpy as np
+
+try:
+    from tokenizers import Tokenizer
+except ImportError:
+    Tokenizer = None
+
+try:
+    import onnxruntime
+except ImportError:
+    onnxruntime = None
+
+try:
+    from threadpoolctl import ThreadpoolController
+except ImportError:
+    ThreadpoolController = None
+
+# Below this many tokens per batch, extra BLAS threads cost more than they save
+PARALLEL_MIN_TOKENS = 256
+
+
+class _FastTokenizer:
+    """`tokenize(text)` over a Rust `tokenizers` tokenizer, like the HF one SentenceTransformer exposes."""
+    def __init__(self, path):
+        self._tokenizer = Tokenizer.from_file(path)
+        self._tokenizer.no_truncation()
+        self._tokenizer.no_padding()
+
+    def tokenize(self, text):
+        return self._tokenizer.encode(text, add_special_tokens=False).tokens
+
+
+class LiteEncoder:
+    """
+    Base for the torch-free MiniLM encoders.
+
+    Reads the artifacts written by scripts/export_onnx.py from `model_dir`
+    (tokenizer.json, config.json and the model weights). Exposes the subset of the
+    SentenceTransformer API that EmbeddingService uses: `encode()` with
+    mean pooling and optional L2 normalisation, and `.tokenizer`.
+
+    Inputs are sorted by length and padded per batch, so a batch of short
+    queries never pays for one long document.
+    """
+
+    def __init__(self, model_dir, threads=None):
+        if Tokenizer is None:
+            raise ImportError("tokenizers is not installed; the lite embedding backends are unavailable.")
+        with open(os.path.join(model_dir, "config.json"), "r") as f:
+            self.config = json.load(f)
+        self.max_seq_length = self.config["max_seq_length"]
+        self.threads = threads or max(1, (os.cpu_count() or 1) // 2)
+        self._tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self._tokenizer.enable_truncation(self.max_seq_length)
+        self._tokenizer.enable_padding(pad_id=self.config.get("pad_token_id", 0))
+        self.tokenizer = _FastTokenizer(os.path.join(model_dir, "tokenizer.json"))
+
+    def get_sentence_embedding_dimension(self):
+        return self.config["hidden_size"]
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, normalize_embeddings=False, **kwargs):
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+        out = np.empty((len(texts), self.config["hidden_size"]), dtype=np.float32)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        for start in range(0, len(texts), batch_size):
+            rows = order[start:start + batch_size]
+            encodings = self._tokenizer.encode_batch([texts[i] for i in rows])
+            ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+            types = np.array([e.type_ids for e in encodings], dtype=np.int64)
+            hidden = self._forward(ids, mask, types)
+            # Mean pooling over real tokens, as in the SentenceTransformer pipeline
+            weights = mask[:, :, None].astype(np.float32)
+            out[rows] = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        if normalize_embeddings:
+            out /= np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+        return out[0] if single else out
+
+    def _forward(self, ids, mask, types):
+        raise NotImplementedError
+
+
+class OnnxEncoder(LiteEncoder):
+    """MiniLM through onnxruntime (model.onnx), with intra-op threads capped at `threads`."""
+
+    def __init__(self, model_dir, threads=None):
+        if onnxruntime is None:
+            raise ImportError("onnxruntime is not installed; use EMBED_BACKEND=numpy or torch.")
+        super().__init__(model_dir, threads)
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = self.threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, "model.onnx"), options, providers=["CPUExecutionProvider"]
+        )
+        self._inputs = {i.name for i in self.session.get_inputs()}
+
+    def _forward(self, ids, mask, types):
+        feed = {"input_ids": ids, "attention_mask": mask, "token_type_ids": types}
+        return self.session.run(None, {k: v for k, v in feed.items() if k in self._inputs})[0]
+
+
+def _erf(x):
+    # Abramowitz & Stegun 7.1.26, max error 1.5e-7
+    sign = np.sign(x)
+    x = np.abs(x)
+    t = 1.0 / (1.0 + 0.3275911 * x)
+    y = 1.0 - (((((1.061405429 * t - 1.453152027) * t) + 1.421413741) * t - 0.284496736) * t + 0.254829592) * t * np.exp(-x * x)
+    return sign * y
+
+
+def _gelu(x):
+    return 0.5 * x * (1.0 + _erf(x * (1.0 / math.sqrt(2.0))))
+
+
+def _layer_norm(x, weight, bias, eps):
+    mean = x.mean(axis=-1, keepdims=True)
+    var = ((x - mean) ** 2).mean(axis=-1, keepdims=True)
+    return (x - mean) / np.sqrt(var + eps) * weight + bias
+
+
+class NumpyEncoder(LiteEncoder):
+    """
+    MiniLM's BERT encoder written out in NumPy over the exported weights
+    (one .npy per tensor). No native dependency beyond NumPy's BLAS. With
+    threadpoolctl installed, BLAS uses `threads` threads for large batches
+    and a single thread for small ones.
+    """
+
+    def __init__(self, model_dir, threads=None):
+        super().__init__(model_dir, threads)
+        # Memory-mapped: workers share the weights through the page cache
+        weights_dir = os.path.join(model_dir, "weights")
+        self.w = {
+            name[:-len(".npy")]: np.load(os.path.join(weights_dir, name), mmap_mode="r")
+            for name in os.listdir(weights_dir) if name.endswith(".npy")
+        }
+        self.heads = self.config["num_attention_heads"]
+        self.eps = self.config.get("layer_norm_eps", 1e-12)
+        self._controller = ThreadpoolController() if ThreadpoolController is not None else None
+
+    def _forward(self, ids, mask, types):
+        if self._controller is None:
+            return self._bert(ids, mask, types)
+        threads = self.threads if ids.size >= PARALLEL_MIN_TOKENS else 1
+        with self._controller.limit(limits=threads, user_api="blas"):
+            return self._bert(ids, mask, types)
+
+    def _bert(self, ids, mask, types):
+        w = self.w
+        batch, length = ids.shape
+        x = (
+            w["embeddings.word_embeddings.weight"][ids]
+            + w["embeddings.position_embeddings.weight"][np.arange(length)][None]
+            + w["embeddings.token_type_embeddings.weight"][types]
+        )
+        x = _layer_norm(x, w["embeddings.LayerNorm.weight"], w["embeddings.LayerNorm.bias"], self.eps)
+        # Padding positions get a large negative attention logit
+        bias = ((1.0 - mask[:, None, None, :]) * -1e9).astype(np.float32)
+        head_dim = x.shape[-1] // self.heads
+
+        for layer in range(self.config["num_hidden_layers"]):
+            p = f"encoder.layer.{layer}."
+
+            def linear(t, name):
+                return t @ w[p + name + ".weight"].T + w[p + name + ".bias"]
+
+            def split(t):
+                return t.reshape(batch, length, self.heads, head_dim).transpose(0, 2, 1, 3)
+
+            q = split(linear(x, "attention.self.query"))
+            k = split(linear(x, "attention.self.key"))
+            v = split(linear(x, "attention.self.value"))
+            scores = q @ k.transpose(0, 1, 3, 2) * (1.0 / math.sqrt(head_dim)) + bias
+            scores = np.exp(scores - scores.max(axis=-1, keepdims=True))
+            scores /= scores.sum(axis=-1, keepdims=True)
+            context = (scores @ v).transpose(0, 2, 1, 3).reshape(batch, length, -1)
+
+            x = _layer_norm(
+                x + linear(context, "attention.output.dense"),
+                w[p + "attention.output.LayerNorm.weight"], w[p + "attention.output.LayerNorm.bias"], self.eps
+            )
+            hidden = _gelu(linear(x, "intermediate.dense"))
+            x = _layer_norm(
+                x + linear(hidden, "output.dense"),
+                w[p + "output.LayerNorm.weight"], w[p + "output.LayerNorm.bias"], self.eps
+            )
+        return x
+
+
+BACKENDS = {
+    "onnx": OnnxEncoder,
+    "numpy": NumpyEncoder,
+}
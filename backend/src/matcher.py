@@ -1,59 +1,300 @@
-
 import json
 import os
-from sentence_transformers import SentenceTransformer, util
+import re
 import sys
+import threading
+import numpy as np
+
+try:
+    from embedder import EmbeddingService
+    from embedding_cache import EmbeddingCache
+    from index import build_index, search_batch
+    from intents import loan_type, category
+except ImportError:
+    from .embedder import EmbeddingService
+    from .embedding_cache import EmbeddingCache
+    from .index import build_index, search_batch
+    from .intents import loan_type, category
+
+# Dropped by the exact-match fast path when strip_stopwords is enabled
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "am", "i", "my", "me", "do", "does",
+    "for", "of", "to", "you", "your", "please", "can", "could", "what", "how"
+}
+
+_PUNCTUATION = re.compile(r"[^\w\s₹%]")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_text(text, strip_stopwords=False):
+    """Lowercase, drop punctuation and fold whitespace (optionally stopwords)."""
+    text = _PUNCTUATION.sub(" ", text.lower())
+    words = _WHITESPACE.split(text.strip())
+    if strip_stopwords:
+        words = [w for w in words if w not in STOPWORDS] or words
+    return " ".join(words)
 
-# Initialize global model
-# Use a small, fast model. 
-# 'all-MiniLM-L6-v2' is standard and very fast.
-MODEL_NAME = 'all-MiniLM-L6-v2'
+class MatcherSnapshot:
+    """Dataset rows, their embeddings and search index, swapped in as one unit on reload."""
+    def __init__(self, data, embeddings, index=None, exact=None, thresholds=None):
+        self.data = data
+        self.embeddings = embeddings
+        self.index = index
+        # normalized instruction -> row, for the exact-match fast path
+        self.exact = exact or {}
+        # Per-row intent category and loan product, for thresholds and re-ranking
+        self.categories = [category(item['instruction']) for item in data]
+        self.loan_types = [loan_type(item['instruction']) for item in data]
+        # Rows with the same intent are paraphrases of each other, even when
+        # their answers are worded differently
+        self.intents = [
+            (name, loan) if loan else item['output']
+            for name, loan, item in zip(self.categories, self.loan_types, data)
+        ]
+        self.thresholds = thresholds or {}
 
 class IntentMatcher:
-    def __init__(self, dataset_path="backend/data/dataset.json", threshold=0.75):
+    """
+    Tier 1: answers a query from the curated dataset when it is close enough
+    to one of its instructions.
+
+    The top `top_k` rows are re-ranked: a row about a different loan product
+    than the query names loses `entity_penalty`. The best row is accepted if
+    it clears its category's threshold, or if it is within `margin_window`
+    of it and beats the best row with a different intent by `margin`.
+    Thresholds come from `thresholds_path` (see calibrate_thresholds.py),
+    falling back to `threshold`.
+    """
+    def __init__(self, dataset_path="backend/data/dataset.json", threshold=0.75, embedder=None, cache_dir=None,
+                 index_type="exact", index_params=None, strip_stopwords=False, thresholds_path=None,
+                 top_k=10, margin=0.08, margin_window=0.1, entity_penalty=0.1):
         self.dataset_path = dataset_path
         self.threshold = threshold
-        self.model = SentenceTransformer(MODEL_NAME)
-        self.data = []
-        self.embeddings = None
+        self.thresholds_path = thresholds_path
+        self.top_k = top_k
+        self.margin = margin
+        self.margin_window = margin_window
+        self.entity_penalty = entity_penalty
+        self.strip_stopwords = strip_stopwords
+        # "exact" scans every row; "ivf"/"hnsw" are approximate for large datasets
+        self.index_type = index_type
+        self.index_params = index_params or {}
+        # Share the embedding service with the RAG engine when one is given
+        self.embedder = embedder if embedder is not None else EmbeddingService()
+        # Optional on-disk cache so only new or changed instructions get encoded
+        self.cache = None
+        if cache_dir:
+            self.cache = EmbeddingCache(cache_dir, self.embedder.model_name, name="dataset")
+        self.snapshot = MatcherSnapshot([], None)
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "margin_hits": 0, "misses": 0}
+        self._stats_lock = threading.Lock()
         self.load_data()
 
+    @property
+    def data(self):
+        return self.snapshot.data
+
+    @property
+    def embeddings(self):
+        return self.snapshot.embeddings
+
     def load_data(self):
+        """
+        (Re)load dataset.json. Only new or changed instructions are encoded,
+        and the result replaces the live snapshot in a single assignment, so
+        queries in flight keep using the previous one.
+        """
         if not os.path.exists(self.dataset_path):
             print(f"Warning: Dataset not found at {self.dataset_path}")
-            return
+            return None
             
         with open(self.dataset_path, 'r') as f:
-            self.data = json.load(f)
+            data = json.load(f)
         
-        # Pre-compute embeddings for instructions
-        instructions = [item['instruction'] for item in self.data]
-        print("Encoding dataset instructions...")
-        self.embeddings = self.model.encode(instructions, convert_to_tensor=True)
-        print("Dataset encoded.")
-
-    def find_match(self, query):
-        if not self.data or self.embeddings is None:
+        # Pre-compute embeddings for instructions (normalised, float32)
+        instructions = [item['instruction'] for item in data]
+        if self.cache is not None:
+            embeddings = self.cache.load(instructions, self.embedder.encode)
+            encoded = self.cache.encoded
+            print(f"Dataset embeddings loaded ({encoded} rows encoded).")
+        else:
+            embeddings, encoded = self._encode_changed(instructions)
+            print(f"Dataset encoded ({encoded} rows encoded).")
+
+        index = None
+        if embeddings is not None and len(data):
+            index = build_index(embeddings, self.index_type, **self.index_params)
+        exact = {}
+        for row, text in enumerate(instructions):
+            exact.setdefault(normalize_text(text, self.strip_stopwords), row)
+        self.snapshot = MatcherSnapshot(data, embeddings, index, exact, self._load_thresholds())
+        return {"rows": len(data), "encoded": encoded}
+
+    def _load_thresholds(self):
+        if not self.thresholds_path or not os.path.exists(self.thresholds_path):
+            return {}
+        with open(self.thresholds_path, 'r') as f:
+            return json.load(f)
+
+    def _encode_changed(self, instructions):
+        # Reuse vectors from the current snapshot for unchanged instructions
+        previous = self.snapshot
+        known = {}
+        if previous.embeddings is not None:
+            known = {item['instruction']: row for row, item in enumerate(previous.data)}
+
+        missing = sorted({text for text in instructions if text not in known})
+        fresh = {}
+        if missing:
+            fresh = dict(zip(missing, self.embedder.encode(missing)))
+
+        rows = [fresh[text] if text in fresh else previous.embeddings[known[text]] for text in instructions]
+        return (np.stack(rows) if rows else None), len(missing)
+
+    def search(self, query, k=5, query_embedding=None):
+        """Top-k dataset rows by cosine similarity, best first."""
+        snapshot = self.snapshot
+        if not snapshot.data or snapshot.index is None:
+            return []
+
+        if query_embedding is None:
+            query_embedding = self.embedder.embed(query)
+
+        rows, scores = snapshot.index.search(query_embedding, k)
+        return [
+            {
+                "score": float(score),
+                "response": snapshot.data[row]['output'],
+                "original_instruction": snapshot.data[row]['instruction']
+            }
+            for row, score in zip(rows, scores)
+        ]
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def find_exact(self, query):
+        """
+        Fast path: a literal or near-literal copy of a dataset instruction
+        is answered from a hash lookup without running the model.
+        """
+        snapshot = self.snapshot
+        row = snapshot.exact.get(normalize_text(query, self.strip_stopwords))
+        if row is None:
+            return None
+        self._count("exact_hits")
+        match = snapshot.data[row]
+        return {
+            "match_found": True,
+            "score": 1.0,
+            "response": match['output'],
+            "original_instruction": match['instruction'],
+            "match_type": "exact"
+        }
+
+    def candidates(self, query, query_embedding, k=None, snapshot=None, exclude=()):
+        """Top rows as (row, score) after loan-type re-ranking, best first."""
+        snapshot = snapshot or self.snapshot
+        k = k or self.top_k
+        rows, scores = snapshot.index.search(query_embedding, k + len(exclude))
+        return self._rerank(query, rows, scores, k, snapshot, exclude)
+
+    def _rerank(self, query, rows, scores, k, snapshot, exclude=()):
+        wanted = loan_type(query)
+        ranked = []
+        for row, score in zip(rows, scores):
+            row = int(row)
+            if row in exclude:
+                continue
+            score = float(score)
+            found = snapshot.loan_types[row]
+            if wanted and found and found != wanted:
+                score -= self.entity_penalty
+            ranked.append((row, score))
+        ranked.sort(key=lambda item: item[1], reverse=True)
+        return ranked[:k]
+
+    def accept(self, candidates, snapshot=None, thresholds=None):
+        """
+        Decide whether the best candidate answers the query. Returns
+        "threshold", "margin" or None. `thresholds` overrides the
+        snapshot's calibrated values (used by calibration).
+        """
+        if not candidates:
+            return None
+        snapshot = snapshot or self.snapshot
+        thresholds = thresholds if thresholds is not None else snapshot.thresholds
+        best_row, best = candidates[0]
+        threshold = thresholds.get("categories", {}).get(
+            snapshot.categories[best_row], thresholds.get("default", self.threshold)
+        )
+        if best >= threshold:
+            return "threshold"
+
+        # Just below threshold but clearly ahead of any competing intent
+        window = thresholds.get("margin_window", self.margin_window)
+        margin = thresholds.get("margin", self.margin)
+        intent = snapshot.intents[best_row]
+        runner_up = next((score for row, score in candidates[1:] if snapshot.intents[row] != intent), 0.0)
+        if best >= threshold - window and best - runner_up >= margin:
+            return "margin"
+        return None
+
+    def find_match(self, query, query_embedding=None):
+        snapshot = self.snapshot
+        if not snapshot.data or snapshot.index is None:
             return None
+
+        exact = self.find_exact(query)
+        if exact:
+            return exact
             
-        query_embedding = self.model.encode(query, convert_to_tensor=True)
-        
-        # Compute cosine similarity
-        cos_scores = util.cos_sim(query_embedding, self.embeddings)[0]
+        if query_embedding is None:
+            query_embedding = self.embedder.embed(query)
         
-        # Find best match
-        best_score_idx = int(cos_scores.argmax())
-        best_score = float(cos_scores[best_score_idx])
-        
-        if best_score >= self.threshold:
-            match = self.data[best_score_idx]
+        # Cosine similarity: both sides are L2-normalised
+        candidates = self.candidates(query, query_embedding, snapshot=snapshot)
+        return self._decide(candidates, snapshot)
+
+    def match_batch(self, queries, query_embeddings):
+        """
+        `find_match` without the exact-text lookup for many queries whose
+        embeddings are already computed. All of them are searched at once
+        (a single matrix product with the exact index).
+        """
+        snapshot = self.snapshot
+        if not snapshot.data or snapshot.index is None:
+            return [None] * len(queries)
+        rows, scores = search_batch(snapshot.index, query_embeddings, self.top_k)
+        return [
+            self._decide(self._rerank(query, query_rows, query_scores, self.top_k, snapshot), snapshot)
+            for query, query_rows, query_scores in zip(queries, rows, scores)
+        ]
+
+    def _decide(self, candidates, snapshot):
+        if not candidates:
+            self._count("misses")
+            return {"match_found": False, "score": 0.0, "response": None}
+
+        accepted = self.accept(candidates, snapshot)
+        best_row, best_score = candidates[0]
+        if accepted:
+            match = snapshot.data[best_row]
+            self._count("semantic_hits" if accepted == "threshold" else "margin_hits")
             return {
                 "match_found": True,
                 "score": best_score,
                 "response": match['output'],
-                "original_instruction": match['instruction']
+                "original_instruction": match['instruction'],
+                "category": snapshot.categories[best_row],
+                # Answers let through by the margin rule are reported apart,
+                # since they scored below the threshold
+                "match_type": "semantic" if accepted == "threshold" else "margin",
+                "accepted_by": accepted
             }
         
+        self._count("misses")
+        # The best score still tells the router how in-domain the query is
         return {"match_found": False, "score": best_score, "response": None}
 
 if __name__ == "__main__":
@@ -1,85 +1,450 @@
 
 import os
 import glob
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+try:
+    from chunking import TextChunker, iter_paragraphs, approx_token_count
+    from lexical import BM25Index, fuse
+    from compact_store import CompactRetriever
+except ImportError:
+    from .chunking import TextChunker, iter_paragraphs, approx_token_count
+    from .lexical import BM25Index, fuse
+    from .compact_store import CompactRetriever
 try:
     import chromadb
     from chromadb.utils import embedding_functions
 except ImportError:
     chromadb = None
 
+# Dense only, BM25 only, or both fused
+RETRIEVAL_MODES = ("dense", "lexical", "hybrid")
+
+# Each ingestion that changes the knowledge base writes a new collection
+# (COLLECTION_NAME_<n>); the file CURRENT_FILE in the Chroma directory names
+# the committed one
+COLLECTION_NAME = "bfsi_knowledge"
+CURRENT_FILE = "current_collection"
+
+
+class Generation:
+    """A Chroma collection and the BM25 index of the same chunks, swapped as one."""
+
+    def __init__(self, collection, lexical):
+        self.collection = collection
+        self.lexical = lexical
+
 class RAGEngine:
-    def __init__(self, kb_path="backend/data/knowledge_base"):
+    def __init__(self, kb_path="backend/data/knowledge_base", embedder=None, db_path="backend/data/chroma_db",
+                 chunk_tokens=160, overlap_tokens=32, batch_size=256,
+                 retrieval="hybrid", lexical_weight=0.3, lexical_skip=0.0, lexical_margin=1.5,
+                 store="chroma", cache_dir=None, index_type="int8", read_only=False):
+        if retrieval not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode '{retrieval}'. Choose from {', '.join(RETRIEVAL_MODES)}.")
         self.kb_path = kb_path
+        self.embedder = embedder
+        self.chunker = TextChunker(
+            count_tokens=embedder.count_tokens if embedder is not None else approx_token_count,
+            max_tokens=chunk_tokens,
+            overlap_tokens=overlap_tokens
+        )
+        self.batch_size = batch_size
+        self.last_ingest = None
+        self.retrieval = retrieval
+        self.lexical_weight = lexical_weight
+        # Skip the dense search when the best BM25 hit covers at least this
+        # share of the query's IDF weight and beats the runner-up by
+        # `lexical_margin`; 0 always runs it
+        self.lexical_skip = lexical_skip
+        self.lexical_margin = lexical_margin
+        # Rebuilt from every chunk on each ingestion, next to the collection
+        self.generation = Generation(None, BM25Index().finalize())
+        self.stats = {"dense": 0, "lexical_only": 0}
+        self._stats_lock = threading.Lock()
+        # Never write the Chroma collection: another process (serve.py's
+        # supervisor) ingests, and ingest_documents() only re-opens it
+        self.read_only = read_only
+        self.db_path = db_path
         self.client = None
-        self.collection = None
-        
-        if chromadb:
+        self.compact = None
+
+        if store == "compact":
+            # Quantised in-process store instead of Chroma; needs the shared embedder
+            if self.embedder is None:
+                raise ValueError("The compact store needs an embedding service.")
+            self.compact = CompactRetriever(
+                cache_dir or os.path.join(os.path.dirname(db_path), "embedding_cache"),
+                self.embedder,
+                index_type=index_type
+            )
+            self.ingest_documents()
+        elif chromadb:
             # Persistent client in 'data/chroma_db'
-            self.client = chromadb.PersistentClient(path="backend/data/chroma_db")
-            
-            # Use a lightweight embedding model
-            self.ef = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="all-MiniLM-L6-v2")
+            self.client = chromadb.PersistentClient(path=db_path)
             
-            self.collection = self.client.get_or_create_collection(
-                name="bfsi_knowledge",
-                embedding_function=self.ef
-            )
+            if self.embedder is not None:
+                # Vectors come from the shared embedding service, so Chroma
+                # never loads its own copy of the model.
+                self.ef = None
+            else:
+                # Use a lightweight embedding model
+                self.ef = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="all-MiniLM-L6-v2")
+            self.generation = Generation(self._open_committed(), self.lexical)
             self.ingest_documents()
         else:
             print("ChromaDB not installed, RAG will not function.")
 
-    def ingest_documents(self):
-        if not self.collection:
-            return
-
-        # Check if already populated (naive check)
-        if self.collection.count() > 0:
-            print("Knowledge base already populated.")
-            return
-
-        documents = []
-        ids = []
-        metadatas = []
-        
-        files = glob.glob(os.path.join(self.kb_path, "*.txt"))
+    @property
+    def collection(self):
+        return self.generation.collection
+
+    @property
+    def lexical(self):
+        return self.generation.lexical
+
+    def _committed_name(self):
+        try:
+            with open(os.path.join(self.db_path, CURRENT_FILE)) as f:
+                return f.read().strip() or COLLECTION_NAME
+        except FileNotFoundError:
+            return COLLECTION_NAME
+
+    def _open_committed(self):
+        name = self._committed_name()
+        if self.read_only:
+            return self.client.get_collection(name=name)
+        if self.ef is not None:
+            return self.client.get_or_create_collection(name=name, embedding_function=self.ef)
+        return self.client.get_or_create_collection(name=name)
+
+    def iter_chunks(self, stats=None):
+        """
+        Stream (id, text, metadata) for every chunk in the knowledge base.
+        Files are read incrementally and ids are content-addressed, so an
+        edit only changes the ids of the chunks it touched.
+        """
+        files = sorted(glob.glob(os.path.join(self.kb_path, "*.txt")))
         print(f"Found {len(files)} documents in {self.kb_path}")
-        
+
         for file_path in files:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Simple chunking by paragraph or fixed size
-            chunks = content.split('\n\n')
-            for i, chunk in enumerate(chunks):
-                if len(chunk.strip()) > 50:
-                    documents.append(chunk.strip())
-                    ids.append(f"{os.path.basename(file_path)}_{i}")
-                    metadatas.append({"source": os.path.basename(file_path)})
-
-        if documents:
-            print(f"Ingesting {len(documents)} chunks...")
-            self.collection.add(
-                documents=documents,
-                ids=ids,
-                metadatas=metadatas
-            )
-            print("Ingestion complete.")
+            source = os.path.basename(file_path)
+            if stats is not None:
+                stats["files"] += 1
+            paragraphs = iter_paragraphs(file_path, stats=stats)
+            for chunk in self.chunker.chunk(paragraphs):
+                chunk_id = hashlib.sha1(f"{source}\x00{chunk}".encode('utf-8')).hexdigest()
+                yield chunk_id, chunk, {"source": source}
+
+    def ingest_documents(self):
+        """
+        Bring the collection in line with the knowledge-base files.
 
-    def retrieve(self, query, n_results=2):
+        Chunks are streamed and only ids not already indexed are embedded,
+        in batches of `batch_size`. The next batch is embedded while the
+        previous one is written. Nothing is written to the live collection:
+        if any chunk was added or removed, the new version is built in a
+        staging collection (unchanged vectors are copied, not re-embedded),
+        committed, and swapped in together with the rebuilt BM25 index. A
+        query sees either the old or the new knowledge base, never a mix.
+        The previous collection is kept until the next change, for queries
+        still running on it in this or another process.
+        """
+        if self.compact is not None:
+            return self._ingest_compact()
         if not self.collection:
-            return []
-            
-        results = self.collection.query(
-            query_texts=[query],
-            n_results=n_results
+            return None
+        if self.read_only:
+            return self._refresh()
+
+        start = time.perf_counter()
+        stats = {"files": 0, "bytes": 0, "chunks": 0, "added": 0, "removed": 0}
+        current = self.collection
+        indexed = set(current.get(include=[])['ids'])
+        seen = set()
+        lexical = BM25Index()
+        staging = None
+
+        writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rag-ingest")
+        pending = None
+        batch = []
+        try:
+            for chunk_id, text, metadata in self.iter_chunks(stats):
+                if chunk_id in seen:
+                    continue
+                seen.add(chunk_id)
+                lexical.add(chunk_id, text)
+                stats["chunks"] += 1
+                if chunk_id in indexed:
+                    continue
+                batch.append((chunk_id, text, metadata))
+                if len(batch) >= self.batch_size:
+                    staging = staging or self._create_staging(current)
+                    pending = self._flush(staging, batch, writer, pending, stats, start)
+                    batch = []
+            if batch:
+                staging = staging or self._create_staging(current)
+                pending = self._flush(staging, batch, writer, pending, stats, start)
+            if pending is not None:
+                pending.result()
+        finally:
+            writer.shutdown(wait=True)
+
+        stats["removed"] = len(indexed - seen)
+        if stats["removed"] and staging is None:
+            staging = self._create_staging(current)
+        if staging is not None:
+            self._copy(current, staging, [chunk_id for chunk_id in indexed if chunk_id in seen])
+            self._commit(staging, keep=(current.name, staging.name))
+        self.generation = Generation(staging or current, lexical.finalize())
+        return self._finish(stats, start)
+
+    def _create_staging(self, current):
+        _, _, suffix = current.name.rpartition("_")
+        name = f"{COLLECTION_NAME}_{int(suffix) + 1 if suffix.isdigit() else 1}"
+        # Left over from an ingestion that did not finish
+        if name in self._collection_names():
+            self.client.delete_collection(name=name)
+        if self.ef is not None:
+            return self.client.create_collection(name=name, embedding_function=self.ef)
+        return self.client.create_collection(name=name)
+
+    def _copy(self, source, target, ids):
+        # Unchanged chunks keep their stored vectors
+        for i in range(0, len(ids), self.batch_size):
+            rows = source.get(ids=ids[i:i + self.batch_size], include=["embeddings", "documents", "metadatas"])
+            target.add(ids=rows["ids"], embeddings=rows["embeddings"],
+                       documents=rows["documents"], metadatas=rows["metadatas"])
+
+    def _commit(self, collection, keep):
+        path = os.path.join(self.db_path, CURRENT_FILE)
+        with open(path + ".tmp", "w") as f:
+            f.write(collection.name)
+        os.replace(path + ".tmp", path)
+        # Older generations are no longer read by anyone
+        for name in self._collection_names():
+            if name.startswith(COLLECTION_NAME) and name not in keep:
+                self.client.delete_collection(name=name)
+
+    def _collection_names(self):
+        return [getattr(collection, "name", collection) for collection in self.client.list_collections()]
+
+    def _ingest_compact(self):
+        # Vectors come from the embedding cache, so only new chunk texts
+        # are encoded; the rest is rebuilt from the stream
+        start = time.perf_counter()
+        stats = {"files": 0, "bytes": 0, "chunks": 0, "added": 0, "removed": 0}
+        previous = set(self.compact.ids())
+        lexical = BM25Index()
+        chunks = []
+        seen = set()
+        for chunk_id, text, metadata in self.iter_chunks(stats):
+            if chunk_id in seen:
+                continue
+            seen.add(chunk_id)
+            lexical.add(chunk_id, text)
+            chunks.append((chunk_id, text, metadata))
+        self.compact.sync(chunks)
+        stats["chunks"] = len(chunks)
+        stats["added"] = len(seen - previous)
+        stats["removed"] = len(previous - seen)
+        self.generation = Generation(None, lexical.finalize())
+        return self._finish(stats, start)
+
+    def _refresh(self):
+        # Read-only: the vectors were written by another process. A Chroma
+        # client keeps serving the index it loaded first, so open a new one
+        # on the committed collection (queries in flight finish on the old
+        # one) and rebuild BM25.
+        start = time.perf_counter()
+        stats = {"files": 0, "bytes": 0, "chunks": 0, "added": 0, "removed": 0}
+        previous = set(self.lexical.ids)
+        lexical = BM25Index()
+        seen = set()
+        for chunk_id, text, _ in self.iter_chunks(stats):
+            if chunk_id not in seen:
+                seen.add(chunk_id)
+                lexical.add(chunk_id, text)
+        stats["chunks"] = len(seen)
+        collection = self.collection
+        if self.last_ingest is not None:
+            self.client.clear_system_cache()
+            self.client = chromadb.PersistentClient(path=self.db_path)
+            collection = self._open_committed()
+            stats["added"] = len(seen - previous)
+            stats["removed"] = len(previous - seen)
+        self.generation = Generation(collection, lexical.finalize())
+        return self._finish(stats, start)
+
+    def _finish(self, stats, start):
+        elapsed = time.perf_counter() - start
+        stats["seconds"] = round(elapsed, 3)
+        stats["chunks_per_second"] = round(stats["added"] / elapsed, 1) if elapsed else 0.0
+        stats["mb_per_second"] = round(stats["bytes"] / (1024 * 1024) / elapsed, 3) if elapsed else 0.0
+        if not stats["added"] and not stats["removed"]:
+            print("Knowledge base already up to date.")
+        else:
+            print(f"Ingestion complete: {stats}")
+        self.last_ingest = stats
+        return stats
+
+    def _flush(self, collection, batch, writer, pending, stats, start):
+        documents = [text for _, text, _ in batch]
+        embeddings = None
+        if self.embedder is not None:
+            embeddings = self.embedder.encode(documents).tolist()
+        # Keep at most one write in flight so memory stays bounded
+        if pending is not None:
+            pending.result()
+        stats["added"] += len(batch)
+        elapsed = time.perf_counter() - start
+        print(f"Ingesting... {stats['added']} chunks ({stats['added'] / elapsed:.1f} chunks/s)")
+        return writer.submit(
+            collection.upsert,
+            documents=documents,
+            embeddings=embeddings,
+            ids=[chunk_id for chunk_id, _, _ in batch],
+            metadatas=[metadata for _, _, metadata in batch]
         )
-        
+
+    def retrieve_scored(self, query, n_results=2, query_embedding=None):
+        """
+        Top chunks as dicts with id, text, source and score, best first.
+        In hybrid mode the score fuses cosine similarity with normalised
+        BM25 (see lexical.fuse); otherwise it is the cosine similarity.
+        """
+        if query_embedding is None and self.embedder is not None and (self.collection or self.compact is not None):
+            query_embedding = self.embedder.embed(query)
+        return self.retrieve_batch([query], n_results, [query_embedding])[0]
+
+    def retrieve_batch(self, queries, n_results=2, query_embeddings=None):
+        """
+        `retrieve_scored` for many queries. BM25 runs per query; the dense
+        searches of every query that needs one go to the store in a single
+        call.
+        """
+        # One generation for the whole call, even if a reload swaps it meanwhile
+        generation = self.generation
+        if not generation.collection and self.compact is None:
+            return [[] for _ in queries]
+
+        if query_embeddings is None:
+            query_embeddings = self.embedder.encode(list(queries)) if self.embedder is not None else [None] * len(queries)
+
+        hits = [[] if self.retrieval == "dense" else generation.lexical.search(query, k=n_results) for query in queries]
+        needs_dense = [
+            i for i, query_hits in enumerate(hits)
+            if self.retrieval != "lexical" and not self._lexical_confident(query_hits)
+        ]
+        dense = dict(zip(needs_dense, self._dense(
+            generation.collection, [queries[i] for i in needs_dense], n_results, [query_embeddings[i] for i in needs_dense]
+        )))
+
+        results = []
+        for i, (query_hits, query_embedding) in enumerate(zip(hits, query_embeddings)):
+            if i not in dense:
+                # Exact terms settled it; score the BM25 hits without a vector search
+                self._count("lexical_only")
+                chunks = self._fetch(generation.collection, [doc_id for doc_id, _, _ in query_hits], query_embedding)
+            else:
+                self._count("dense")
+                chunks = dense[i]
+                if not query_hits:
+                    results.append(sorted(chunks.values(), key=lambda chunk: chunk["score"], reverse=True))
+                    continue
+                missing = [doc_id for doc_id, _, _ in query_hits if doc_id not in chunks]
+                chunks.update(self._fetch(generation.collection, missing, query_embedding))
+            results.append(self._rank(query_hits, chunks, n_results))
+        return results
+
+    def _rank(self, hits, chunks, n_results):
+        lexical = {doc_id: score for doc_id, score, _ in hits}
+        if self.retrieval == "lexical":
+            ranked = fuse({}, lexical, lexical_weight=1.0)
+        else:
+            dense = {doc_id: chunk["score"] for doc_id, chunk in chunks.items()}
+            ranked = fuse(dense, lexical, self.lexical_weight)
+        retrieved = []
+        for doc_id, score in ranked[:n_results]:
+            if doc_id in chunks:
+                retrieved.append(dict(chunks[doc_id], score=score))
+        return retrieved
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _lexical_confident(self, hits):
+        if not self.lexical_skip or not hits or hits[0][2] < self.lexical_skip:
+            return False
+        return len(hits) == 1 or hits[0][1] >= self.lexical_margin * hits[1][1]
+
+    def _dense(self, collection, queries, n_results, query_embeddings):
+        # One {id: chunk} dict per query
+        if not queries:
+            return []
+        if self.compact is not None:
+            return [self.compact.query(query_embedding, n_results) for query_embedding in query_embeddings]
+        if all(query_embedding is not None for query_embedding in query_embeddings):
+            # Reuse the vectors already computed for the matcher
+            results = collection.query(
+                query_embeddings=[np.asarray(query_embedding).tolist() for query_embedding in query_embeddings],
+                n_results=n_results
+            )
+        else:
+            results = collection.query(
+                query_texts=list(queries),
+                n_results=n_results
+            )
+
         # Unpack results
-        retrieved_docs = []
-        if results['documents']:
-             retrieved_docs = results['documents'][0]
-             
-        return retrieved_docs
+        retrieved = []
+        for row in range(len(queries)):
+            chunks = {}
+            if results['documents'] and results['documents'][row]:
+                for chunk_id, text, metadata, distance in zip(
+                    results['ids'][row], results['documents'][row], results['metadatas'][row], results['distances'][row]
+                ):
+                    chunks[chunk_id] = {
+                        "id": chunk_id,
+                        "text": text,
+                        "source": (metadata or {}).get("source"),
+                        # Chroma's default space is squared L2; on unit vectors that is 2 - 2cos
+                        "score": 1.0 - distance / 2.0
+                    }
+            retrieved.append(chunks)
+        return retrieved
+
+    def _fetch(self, collection, ids, query_embedding):
+        # Load lexical-only hits by id and score them against the query vector
+        if not ids:
+            return {}
+        if self.compact is not None:
+            return self.compact.get(ids, query_embedding)
+        include = ["documents", "metadatas"]
+        if query_embedding is not None:
+            include.append("embeddings")
+        results = collection.get(ids=ids, include=include)
+        embeddings = results.get("embeddings")
+        fetched = {}
+        for i, chunk_id in enumerate(results["ids"]):
+            score = 0.0
+            if query_embedding is not None and embeddings is not None:
+                score = float(np.dot(np.asarray(embeddings[i], dtype=np.float32), query_embedding))
+            fetched[chunk_id] = {
+                "id": chunk_id,
+                "text": results["documents"][i],
+                "source": (results["metadatas"][i] or {}).get("source"),
+                "score": score
+            }
+        return fetched
+
+    def retrieve(self, query, n_results=2, query_embedding=None):
+        return [doc["text"] for doc in self.retrieve_scored(query, n_results, query_embedding)]
 
 if __name__ == "__main__":
     rag = RAGEngine(kb_path="../data/knowledge_base")
@@ -0,0 +1,109 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+logger = logging.getLogger(__name__)
+
+
+class ComponentRegistry:
+    """
+    Builds each backend component exactly once and shares the instance.
+
+    Components are registered with a factory and the names of the
+    components they depend on. `start()` initialises everything in
+    background threads: independent components load in parallel, and a
+    component starts as soon as its dependencies are ready. Factories
+    receive their dependencies as keyword arguments.
+    """
+
+    def __init__(self):
+        self._specs = {}
+        self._instances = {}
+        self._status = {}
+        self._events = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def register(self, name, factory, depends=()):
+        self._specs[name] = (factory, tuple(depends))
+        self._status[name] = {"state": PENDING, "error": None, "load_seconds": None}
+        self._events[name] = threading.Event()
+
+    def get(self, name):
+        """Return the component if it is ready, otherwise None."""
+        return self._instances.get(name)
+
+    def is_ready(self, name):
+        return self._status.get(name, {}).get("state") == READY
+
+    def load(self, name):
+        """
+        Build `name` and its dependencies in the calling thread, without the
+        background pool (serve.py loads models this way before forking).
+        Components already loaded are skipped by a later `start()`.
+        """
+        if self._events[name].is_set():
+            return self.get(name)
+        for dep in self._specs[name][1]:
+            self.load(dep)
+        self._load(name)
+        return self.get(name)
+
+    def start(self):
+        """Kick off initialisation of all registered components without blocking."""
+        if self._executor is not None:
+            return
+        pending = [name for name in self._specs if not self._events[name].is_set()]
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, len(pending)),
+            thread_name_prefix="component-init"
+        )
+        for name in pending:
+            self._executor.submit(self._load, name)
+        self._executor.shutdown(wait=False)
+
+    def wait(self, timeout=None):
+        """Block until every component has finished loading (or failed)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for event in self._events.values():
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not event.wait(remaining):
+                return False
+        return True
+
+    def status(self):
+        with self._lock:
+            return {name: dict(info) for name, info in self._status.items()}
+
+    def _set_status(self, name, **fields):
+        with self._lock:
+            self._status[name].update(fields)
+
+    def _load(self, name):
+        factory, depends = self._specs[name]
+        try:
+            kwargs = {}
+            for dep in depends:
+                self._events[dep].wait()
+                if not self.is_ready(dep):
+                    raise RuntimeError(f"dependency '{dep}' is not available")
+                kwargs[dep] = self._instances[dep]
+
+            self._set_status(name, state=LOADING)
+            start = time.perf_counter()
+            instance = factory(**kwargs)
+            self._instances[name] = instance
+            elapsed = time.perf_counter() - start
+            self._set_status(name, state=READY, load_seconds=round(elapsed, 3))
+            logger.info("Component '%s' ready in %.2fs", name, elapsed)
+        except Exception as e:
+            logger.error("Failed to initialize component '%s': %s", name, e)
+            self._set_status(name, state=FAILED, error=str(e))
+        finally:
+            self._events[name].set()
@@ -0,0 +1,109 @@
+import glob
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class Reloader:
+    """
+    Re-syncs the matcher with dataset.json and the RAG collection with the
+    knowledge base. Reloads are serialised; each component diffs the files
+    against what it has indexed and only embeds what changed.
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self._lock = threading.Lock()
+        # Called with no arguments after the knowledge base content changed
+        self.on_kb_change = []
+
+    def reload(self, targets=("matcher", "rag")):
+        results = {}
+        with self._lock:
+            if "matcher" in targets:
+                matcher = self.registry.get("matcher")
+                results["matcher"] = matcher.load_data() if matcher else None
+            if "rag" in targets:
+                rag = self.registry.get("rag")
+                results["rag"] = rag.ingest_documents() if rag else None
+                changed = results["rag"] and (results["rag"]["added"] or results["rag"]["removed"])
+                if changed:
+                    for callback in self.on_kb_change:
+                        callback()
+        logger.info("Reload complete: %s", results)
+        return results
+
+
+class FileWatcher:
+    """
+    Polls the dataset file and knowledge-base directory for changes
+    (mtime and size) and triggers a reload of the affected component.
+    Polling keeps this dependency-free and works on every filesystem.
+    """
+
+    def __init__(self, reloader, dataset_path, kb_path, interval=2.0, thresholds_path=None):
+        self.reloader = reloader
+        self.dataset_path = dataset_path
+        # Calibrated matcher thresholds are reloaded along with the dataset
+        self.thresholds_path = thresholds_path
+        self.kb_path = kb_path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._state = None
+
+    def _fingerprint(self, paths):
+        state = {}
+        for path in paths:
+            try:
+                st = os.stat(path)
+                state[path] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                continue
+        return state
+
+    def _dataset_state(self):
+        return self._fingerprint([self.dataset_path] + ([self.thresholds_path] if self.thresholds_path else []))
+
+    def _kb_state(self):
+        return self._fingerprint(glob.glob(os.path.join(self.kb_path, "*.txt")))
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="file-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def poll(self):
+        """
+        Components whose files changed since the previous call (the first
+        call only records the current state). For callers that run their
+        own loop instead of `start()`, like serve.py's supervisor.
+        """
+        dataset_state, kb_state = self._dataset_state(), self._kb_state()
+        if self._state is None:
+            self._state = (dataset_state, kb_state)
+            return []
+        targets = []
+        if dataset_state != self._state[0]:
+            targets.append("matcher")
+        if kb_state != self._state[1]:
+            targets.append("rag")
+        self._state = (dataset_state, kb_state)
+        return targets
+
+    def _run(self):
+        self.poll()
+        while not self._stop.wait(self.interval):
+            targets = self.poll()
+            if targets:
+                logger.info("Detected changes, reloading %s", targets)
+                try:
+                    self.reloader.reload(targets)
+                except Exception as e:
+                    logger.error("Reload failed: %s", e)
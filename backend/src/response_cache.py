@@ -0,0 +1,228 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class CacheEntry:
+    def __init__(self, vector, response, source, created):
+        self.vector = vector
+        self.response = response
+        self.source = source
+        self.created = created
+        self.size = vector.nbytes + len(response.encode("utf-8"))
+
+
+class SemanticCache:
+    """
+    Response cache for generated (Tier 2/3) answers, keyed by query embedding.
+
+    A lookup returns the cached answer of the most similar stored query if
+    its cosine similarity is at least `threshold`. Entries expire after
+    `ttl` seconds and the least recently used ones are evicted once either
+    `max_entries` or `max_bytes` is exceeded. With a `shared` store every
+    worker sees the same entries.
+    """
+
+    def __init__(self, threshold=0.95, max_entries=2048, max_bytes=64 * 1024 * 1024, ttl=3600, shared=None):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.shared = shared
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        # Cached vectors live in a matrix allocated once for max_entries rows;
+        # an insert writes its row in place and an eviction frees it for the
+        # next one, so a put never copies the other vectors
+        self._matrix = None
+        self._reset_rows()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def lookup(self, query_embedding):
+        if self.shared is not None:
+            self.shared.sync(self)
+        with self._lock:
+            self._expire()
+            if not self._entries:
+                self.misses += 1
+                return None
+            scores = self._matrix[:self._used] @ query_embedding
+            best = int(scores.argmax())
+            key = self._keys[best]
+            if key is None or scores[best] < self.threshold:
+                self.misses += 1
+                return None
+            entry = self._entries[key]
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return {"response": entry.response, "source": entry.source, "score": float(scores[best])}
+
+    def put(self, query_embedding, response, source):
+        key = uuid.uuid4().hex
+        entry = CacheEntry(np.asarray(query_embedding, dtype=np.float32), response, source, time.time())
+        self._insert(key, entry)
+        if self.shared is not None:
+            self.shared.put(key, entry, self)
+
+    def clear(self):
+        """Drop every entry, e.g. after the knowledge base changed."""
+        self._reset()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _insert(self, key, entry):
+        with self._lock:
+            if key in self._entries or entry.size > self.max_bytes:
+                return
+            # Expired rows go first, so they never push out live entries
+            self._expire()
+            while self._entries and (len(self._entries) >= self.max_entries or self._bytes + entry.size > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            if self._matrix is None:
+                self._matrix = np.zeros((self.max_entries, entry.vector.shape[0]), dtype=np.float32)
+            row = self._free.pop()
+            self._matrix[row] = entry.vector
+            self._created[row] = entry.created
+            self._keys[row] = key
+            self._rows[key] = row
+            self._used = max(self._used, row + 1)
+            self._entries[key] = entry
+            self._bytes += entry.size
+
+    def _reset(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._matrix = None
+            self._reset_rows()
+
+    def _expire(self):
+        # Called with the lock held; free rows hold +inf and never match
+        if not self.ttl or not self._used:
+            return
+        for row in np.flatnonzero(self._created[:self._used] < time.time() - self.ttl):
+            self._remove(self._keys[row])
+            self.expirations += 1
+
+    def _reset_rows(self):
+        self._keys = [None] * self.max_entries
+        # Creation time per row, to sweep expired rows before a search
+        self._created = np.full(self.max_entries, np.inf)
+        self._rows = {}
+        # Popped from the end, so rows fill from the top and freed ones are reused first
+        self._free = list(range(self.max_entries - 1, -1, -1))
+        self._used = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        row = self._rows.pop(key)
+        self._keys[row] = None
+        self._matrix[row] = 0.0
+        self._created[row] = np.inf
+        self._free.append(row)
+
+
+class RedisCacheStore:
+    """
+    Shares SemanticCache entries between workers through Redis.
+
+    Every put is appended to a Redis stream, which serves as a change log:
+    a worker reads only the records added since the last one it saw and
+    skips its own, so an unchanged cache costs a single XREAD per lookup.
+    The stream keeps the newest `max_entries` records (a worker that falls
+    behind or starts late replays them), and entries older than `ttl`
+    seconds are trimmed by Redis itself. Needs Redis 6.2 or later.
+    """
+
+    def __init__(self, url, prefix="bfsi:response_cache", max_entries=2048, ttl=3600, batch=256):
+        if redis is None:
+            raise ImportError("redis is not installed; the shared response cache is unavailable.")
+        self.client = redis.Redis.from_url(url)
+        self.log_key = f"{prefix}:log"
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.batch = batch
+        # Tags this worker's records so sync() does not apply them twice
+        self.origin = uuid.uuid4().hex.encode("ascii")
+        self._last_id = b"0"
+        self._sync_lock = threading.Lock()
+
+    def put(self, key, entry, cache):
+        pipe = self.client.pipeline()
+        pipe.xadd(self.log_key, {
+            "op": "put",
+            "origin": self.origin,
+            "key": key,
+            "vector": entry.vector.tobytes(),
+            "response": entry.response,
+            "source": entry.source,
+            "created": repr(entry.created),
+        }, maxlen=self.max_entries, approximate=True)
+        if self.ttl:
+            # Record ids start with their creation time in milliseconds
+            pipe.xtrim(self.log_key, minid=int((entry.created - self.ttl) * 1000), approximate=True)
+            pipe.pexpire(self.log_key, int(self.ttl * 1000))
+        pipe.execute()
+
+    def sync(self, cache):
+        # Concurrent lookups need not wait: whichever holds the lock applies
+        # the new records for everyone
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            while True:
+                reply = self.client.xread({self.log_key: self._last_id}, count=self.batch)
+                records = reply[0][1] if reply else []
+                for record_id, fields in records:
+                    self._last_id = record_id
+                    if fields.get(b"origin") != self.origin:
+                        self._apply(fields, cache)
+                if len(records) < self.batch:
+                    return
+        finally:
+            self._sync_lock.release()
+
+    def _apply(self, fields, cache):
+        if fields[b"op"] == b"clear":
+            cache._reset()
+            return
+        created = float(fields[b"created"])
+        if cache.ttl and time.time() - created > cache.ttl:
+            return
+        vector = np.frombuffer(fields[b"vector"], dtype=np.float32)
+        entry = CacheEntry(vector, fields[b"response"].decode("utf-8"), fields[b"source"].decode("utf-8"), created)
+        cache._insert(fields[b"key"].decode("utf-8"), entry)
+
+    def clear(self):
+        # Workers that have not caught up yet still read the clear record
+        pipe = self.client.pipeline()
+        pipe.xtrim(self.log_key, maxlen=0, approximate=False)
+        pipe.xadd(self.log_key, {"op": "clear", "origin": self.origin})
+        pipe.execute()
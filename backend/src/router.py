@@ -0,0 +1,115 @@
+import re
+import threading
+from collections import deque
+
+import numpy as np
+
+# Greetings, thanks and other chit-chat that need neither retrieval nor the
+# SLM, by class: (pattern, canned reply)
+SMALL_TALK = {
+    "greeting": (
+        r"hi+|hello|hey|hiya|good (morning|afternoon|evening)",
+        "Hello! I'm your banking assistant. Ask me about loans, EMIs, interest rates, "
+        "account services or payments."
+    ),
+    "wellbeing": (
+        r"how are you( doing)?",
+        "I'm doing well, thank you! How can I help with your banking today?"
+    ),
+    "thanks": (
+        r"thanks?|thank you( so much)?",
+        "You're welcome! Let me know if you have any other questions about loans, "
+        "accounts or payments."
+    ),
+    "acknowledgement": (
+        r"ok(ay)?|cool|great",
+        "Glad to help. Is there anything else you'd like to know?"
+    ),
+    "farewell": (
+        r"bye|goodbye|see you",
+        "Goodbye! Come back any time you have a banking question."
+    ),
+    "identity": (
+        r"who are you|what can you do",
+        "I'm a banking assistant. I can answer questions about loans, EMIs, interest rates, "
+        "account services, cards and payments."
+    ),
+}
+SMALL_TALK_PATTERNS = {
+    kind: re.compile(rf"^\s*({pattern})(\s+(there|again|a lot|assistant|bot))?[\s!.?]*$", re.IGNORECASE)
+    for kind, (pattern, _) in SMALL_TALK.items()
+}
+
+FALLBACK_REPLY = (
+    "I can only help with banking, loans, insurance and payment questions. "
+    "Could you rephrase your question in that context?"
+)
+
+
+class TierRouter:
+    """
+    Decides how to answer a query that missed the dataset, using signals
+    the request already has: the Tier 1 similarity score (how close the
+    query is to anything in the BFSI dataset) and a BM25 lookup of the
+    knowledge base.
+
+    - small talk                          -> canned reply, no model call
+    - KB term hit or score >= rag_threshold -> RAG + SLM
+    - score < fallback_threshold          -> canned fallback, no generation
+    - anything in between                 -> SLM without retrieval
+
+    Also records how often each route is taken and how long it took.
+    """
+
+    def __init__(self, rag_threshold=0.45, fallback_threshold=0.25, lexical_coverage=0.5, window=1024):
+        self.rag_threshold = rag_threshold
+        self.fallback_threshold = fallback_threshold
+        self.lexical_coverage = lexical_coverage
+        self._lock = threading.Lock()
+        self._window = window
+        self._counts = {}
+        self._seconds = {}
+        self._recent = {}
+
+    def small_talk_reply(self, query):
+        """The canned reply if `query` is small talk, else None."""
+        for kind, pattern in SMALL_TALK_PATTERNS.items():
+            if pattern.match(query):
+                return SMALL_TALK[kind][1]
+        return None
+
+    def route(self, query, score, rag=None):
+        """Return "rag", "slm" or "fallback" for a Tier 1 miss with best similarity `score`."""
+        if score is None:
+            # Matcher not ready, nothing to judge by: keep the full pipeline
+            return "rag"
+        if score >= self.rag_threshold or self._lexical_hit(query, rag):
+            return "rag"
+        if score < self.fallback_threshold:
+            return "fallback"
+        return "slm"
+
+    def _lexical_hit(self, query, rag):
+        if rag is None or not self.lexical_coverage:
+            return False
+        hits = rag.lexical.search(query, k=1)
+        return bool(hits) and hits[0][2] >= self.lexical_coverage
+
+    def record(self, route, seconds):
+        with self._lock:
+            self._counts[route] = self._counts.get(route, 0) + 1
+            self._seconds[route] = self._seconds.get(route, 0.0) + seconds
+            self._recent.setdefault(route, deque(maxlen=self._window)).append(seconds)
+
+    def stats(self):
+        with self._lock:
+            stats = {}
+            for route, count in self._counts.items():
+                recent = np.array(self._recent[route]) * 1000
+                stats[route] = {
+                    "count": count,
+                    "avg_ms": round(self._seconds[route] * 1000 / count, 2),
+                    "p50_ms": round(float(np.percentile(recent, 50)), 2),
+                    "p95_ms": round(float(np.percentile(recent, 95)), 2),
+                }
+            return stats
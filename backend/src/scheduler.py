@@ -0,0 +1,227 @@
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+try:
+    from executor import PoolSaturated
+except ImportError:
+    from .executor import PoolSaturated
+
+# Lower runs first. Grounded (RAG) answers go ahead of open-ended SLM
+# answers, and bulk/offline work yields to interactive traffic.
+PRIORITIES = {"rag": 0, "slm": 1, "batch": 2}
+
+
+class GenerationCancelled(Exception):
+    pass
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class GenerationRequest:
+    def __init__(self, system_prompt, user_query, priority, deadline, max_tokens, on_token):
+        self.system_prompt = system_prompt
+        self.user_query = user_query
+        self.priority = priority
+        self.deadline = deadline
+        self.max_tokens = max_tokens
+        self.on_token = on_token
+        self.future = Future()
+        self.enqueued = time.monotonic()
+        # Filled in by the slot: queue_wait, prompt_eval (time to the first
+        # token), generate (the rest of decoding) and tokens
+        self.timings = {}
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Stop generation at the next token (or drop it if still queued)."""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def expired(self, now=None):
+        return self.deadline is not None and (now or time.monotonic()) > self.deadline
+
+
+class InferenceScheduler:
+    """
+    Multi-slot front end for SLMHandler.
+
+    Each slot owns its own llama.cpp context (forked from the base handler,
+    so the memory-mapped weights are shared) and a thread that decodes one
+    request at a time. With several slots, decoding steps of in-flight
+    requests interleave on the CPU instead of queueing behind each other.
+    Waiting requests are ordered by tier priority, then arrival. Requests can
+    be cancelled and carry a deadline, both checked between tokens.
+    `on_finish`, if given, is called with each served request and its outcome.
+    The forked slots split `cpus` cores (default: all of them) between them.
+    """
+
+    def __init__(self, slm, n_slots=1, max_queue=8, deadline=None, on_finish=None, cpus=None):
+        self.max_queue = max_queue
+        self.deadline = deadline
+        self.on_finish = on_finish
+        threads = max(1, (cpus or os.cpu_count() or 1) // max(1, n_slots))
+        self.slots = [slm] + [slm.fork(n_threads=threads) for _ in range(n_slots - 1)]
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._active = 0
+        self._stats = {
+            "completed": 0, "cancelled": 0, "expired": 0, "error": 0, "rejected": 0,
+            "tokens": 0, "decode_seconds": 0.0, "queue_wait_seconds": 0.0, "max_queue_wait": 0.0,
+        }
+        self._threads = []
+        for i, slot in enumerate(self.slots):
+            thread = threading.Thread(target=self._run, args=(slot,), name=f"slm-slot-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, system_prompt, user_query, tier="slm", max_tokens=256, on_token=None, deadline=None):
+        """Queue a generation and return its GenerationRequest (result in .future)."""
+        timeout = deadline if deadline is not None else self.deadline
+        request = GenerationRequest(
+            system_prompt, user_query,
+            priority=PRIORITIES.get(tier, PRIORITIES["slm"]),
+            deadline=(time.monotonic() + timeout) if timeout else None,
+            max_tokens=max_tokens,
+            on_token=on_token,
+        )
+        with self._cond:
+            if self._closed or len(self._heap) >= self.max_queue:
+                self._stats["rejected"] += 1
+                raise PoolSaturated("generation queue is full")
+            heapq.heappush(self._heap, (request.priority, next(self._seq), request))
+            self._cond.notify()
+        return request
+
+    async def generate(self, system_prompt, user_query, tier="slm", max_tokens=256, deadline=None):
+        request = self.submit(system_prompt, user_query, tier=tier, max_tokens=max_tokens, deadline=deadline)
+        try:
+            return await asyncio.wrap_future(request.future)
+        except asyncio.CancelledError:
+            request.cancel()
+            raise
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["slots"] = len(self.slots)
+            stats["active"] = self._active
+            stats["queued"] = len(self._heap)
+        finished = stats["completed"] + stats["cancelled"] + stats["expired"] + stats["error"]
+        stats["tokens_per_second"] = (stats["tokens"] / stats["decode_seconds"]) if stats["decode_seconds"] else 0.0
+        stats["avg_queue_wait"] = (stats["queue_wait_seconds"] / finished) if finished else 0.0
+        return stats
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            pending = [request for _, _, request in self._heap]
+            self._heap = []
+            self._cond.notify_all()
+        for request in pending:
+            if request.future.set_running_or_notify_cancel():
+                request.future.set_exception(GenerationCancelled("scheduler shut down"))
+
+    def _next(self):
+        with self._cond:
+            while not self._heap and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                return None
+            _, _, request = heapq.heappop(self._heap)
+            self._active += 1
+            return request
+
+    def _record(self, outcome, **values):
+        with self._cond:
+            self._stats[outcome] += 1
+            for key, value in values.items():
+                self._stats[key] += value
+            if "queue_wait_seconds" in values:
+                self._stats["max_queue_wait"] = max(self._stats["max_queue_wait"], values["queue_wait_seconds"])
+
+    def _run(self, slot):
+        while True:
+            request = self._next()
+            if request is None:
+                return
+            try:
+                self._serve(slot, request)
+            finally:
+                with self._cond:
+                    self._active -= 1
+
+    def _serve(self, slot, request):
+        started = time.monotonic()
+        waited = started - request.enqueued
+        if not request.future.set_running_or_notify_cancel() or request.cancelled:
+            self._record("cancelled", queue_wait_seconds=waited)
+            if not request.future.cancelled():
+                request.future.set_exception(GenerationCancelled("cancelled before start"))
+            return
+        if request.expired(started):
+            self._record("expired", queue_wait_seconds=waited)
+            request.future.set_exception(DeadlineExceeded("deadline passed while queued"))
+            return
+
+        pieces = []
+        outcome = "completed"
+        error = None
+        first_token = None
+        stream = slot.stream_response(request.system_prompt, request.user_query, max_tokens=request.max_tokens)
+        try:
+            for piece in stream:
+                if first_token is None:
+                    first_token = time.monotonic()
+                pieces.append(piece)
+                if request.on_token is not None:
+                    request.on_token(piece)
+                if request.cancelled:
+                    outcome = "cancelled"
+                    break
+                if request.expired():
+                    outcome = "expired"
+                    break
+        except Exception as e:
+            outcome = "error"
+            error = e
+        finally:
+            stream.close()
+
+        finished = time.monotonic()
+        if outcome == "error":
+            # A failed decode says nothing about throughput
+            self._record(outcome, queue_wait_seconds=waited)
+        else:
+            self._record(outcome, tokens=len(pieces), decode_seconds=finished - started, queue_wait_seconds=waited)
+        first_token = first_token or finished
+        request.timings = {
+            "queue_wait": waited,
+            "prompt_eval": first_token - started,
+            "generate": finished - first_token,
+            "tokens": len(pieces),
+        }
+        if self.on_finish is not None:
+            try:
+                self.on_finish(request, outcome)
+            except Exception:
+                pass
+        if outcome == "error":
+            request.future.set_exception(error)
+        elif outcome == "cancelled":
+            request.future.set_exception(GenerationCancelled("cancelled"))
+        elif outcome == "expired":
+            request.future.set_exception(DeadlineExceeded("deadline passed during generation"))
+        else:
+            request.future.set_result("".join(pieces).strip())
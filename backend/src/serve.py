@@ -0,0 +1,214 @@
+# serve.py - Multi-worker server with shared model weights
+# A supervisor process loads the embedding model, binds the port and forks
+# --workers uvicorn workers that accept from the same socket. Workers share
+# the model weights (copy-on-write after fork, and the GGUF model and
+# embedding caches through the page cache, as they are memory-mapped).
+#
+# The supervisor is the single writer of shared state: it runs every
+# ingestion (dataset embedding cache, Chroma collection) in a short-lived
+# child, then signals the workers, which only reload read-only. It watches
+# the data files when WATCH_FILES=1, re-syncs a component when a worker
+# sends its RELOAD_SIGNALS signal (POST /admin/reload does) or everything
+# on SIGHUP, and restarts workers that exit.
+#
+#   python backend/src/serve.py --workers 4
+#   WORKERS=8 EMBED_BACKEND=numpy RAG_STORE=compact python backend/src/serve.py
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Sent to workers once the supervisor has re-synced a component's files,
+# and by a worker to the supervisor to ask for that re-sync
+RELOAD_SIGNALS = {"matcher": signal.SIGUSR1, "rag": signal.SIGUSR2}
+
+
+def bind(host, port, backlog=2048):
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def fork(target, *args):
+    """Run `target(*args)` in a child process and return its pid."""
+    # Anything still buffered would be written again by the child
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid:
+        return pid
+    code = 1
+    try:
+        for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP):
+            signal.signal(signum, signal.SIG_DFL)
+        target(*args)
+        code = 0
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+def run_worker(app_module, sock, log_level):
+    import uvicorn
+
+    app_module.init_worker()
+    for target, signum in RELOAD_SIGNALS.items():
+        signal.signal(signum, reload_handler(app_module, target))
+    config = uvicorn.Config(app_module.app, log_level=log_level.lower())
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def reload_handler(app_module, target):
+    def handle(signum, frame):
+        # A reload reads files and rebuilds indexes: keep it off the handler
+        threading.Thread(target=app_module.reloader.reload, args=([target],), name="reload", daemon=True).start()
+    return handle
+
+
+def run_writer(app_module, targets):
+    app_module.init_worker()
+    try:
+        app_module.sync_shared_state(targets)
+    finally:
+        app_module.log_listener.stop()
+
+
+class Supervisor:
+    """
+    Forks and restarts the workers and serialises writes to shared state.
+    Single-threaded on purpose: it forks again whenever a worker exits or a
+    re-sync runs, and threads do not survive fork().
+    """
+
+    def __init__(self, app_module, sock, workers, interval=2.0, log_level="INFO"):
+        self.app_module = app_module
+        self.sock = sock
+        self.workers = workers
+        self.interval = interval
+        self.log_level = log_level
+        self.children = set()
+        self.pending = set()
+        self.stopping = False
+        # A worker that exits is replaced after a pause, so one failing at
+        # startup does not make the supervisor fork in a tight loop
+        self.restart_at = 0.0
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGHUP, self._resync)
+        for signum in RELOAD_SIGNALS.values():
+            signal.signal(signum, self._resync)
+
+        watcher = self.app_module.watcher if self.app_module.WATCH_FILES else None
+        if watcher is not None:
+            watcher.poll()
+        self.sync(("matcher", "rag"), notify=False)
+        next_poll = time.monotonic() + self.interval
+        while not self.stopping:
+            self.reap()
+            while len(self.children) < self.workers and not self.stopping and time.monotonic() >= self.restart_at:
+                self.children.add(fork(run_worker, self.app_module, self.sock, self.log_level))
+            if watcher is not None and time.monotonic() >= next_poll:
+                self.pending.update(watcher.poll())
+                next_poll = time.monotonic() + self.interval
+            if self.pending:
+                targets, self.pending = tuple(self.pending), set()
+                print(f"Re-syncing {', '.join(targets)}")
+                self.sync(targets)
+            time.sleep(0.1)
+        self.shutdown()
+
+    def sync(self, targets, notify=True):
+        """Run the writer in a child; on success tell the workers to reload `targets`."""
+        _, status = os.waitpid(fork(run_writer, self.app_module, targets), 0)
+        code = os.waitstatus_to_exitcode(status)
+        if code != 0:
+            print(f"Warning: syncing {', '.join(targets)} failed (exit code {code}); workers keep the previous state.")
+            return False
+        if notify:
+            for target in targets:
+                self.signal(RELOAD_SIGNALS[target])
+        return True
+
+    def signal(self, signum):
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                self.children.discard(pid)
+
+    def reap(self):
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.children.clear()
+                return
+            if pid == 0:
+                return
+            self.children.discard(pid)
+            if not self.stopping:
+                print(f"Worker {pid} exited with code {os.waitstatus_to_exitcode(status)}; starting a new one.")
+                self.restart_at = time.monotonic() + 1.0
+
+    def shutdown(self, timeout=30.0):
+        self.signal(signal.SIGTERM)
+        deadline = time.monotonic() + timeout
+        while self.children and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        self.signal(signal.SIGKILL)
+        self.reap()
+
+    def _stop(self, signum, frame):
+        self.stopping = True
+
+    def _resync(self, signum, frame):
+        self.pending.update(target for target, sent in RELOAD_SIGNALS.items() if signum in (sent, signal.SIGHUP))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the API from several pre-forked worker processes.")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WORKERS", "0")) or os.cpu_count() or 1)
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "8000")))
+    parser.add_argument("--no-preload", action="store_true", help="Let every worker load its own embedding model")
+    args = parser.parse_args()
+
+    sock = bind(args.host, args.port)
+    # app.py reads its configuration at import time
+    os.environ["SERVE_WORKERS"] = str(max(1, args.workers))
+    import app as app_module
+
+    if not args.no_preload:
+        app_module.preload()
+    # From here on the supervisor runs no threads (see Supervisor)
+    app_module.log_listener.stop()
+    # Move everything loaded so far out of the collector's reach: a collection
+    # in a worker would write to these objects and un-share their pages
+    gc.freeze()
+    print(f"Serving on {args.host}:{args.port} with {app_module.WORKERS} workers")
+    Supervisor(
+        app_module, sock, app_module.WORKERS,
+        interval=app_module.WATCH_INTERVAL,
+        log_level=app_module.LOG_LEVEL
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,13 +4,44 @@ try:
     from llama_cpp import Llama
 except ImportError:
     Llama = None
+try:
+    from llama_cpp import LlamaRAMCache, LlamaDiskCache
+except ImportError:
+    LlamaRAMCache = None
+    LlamaDiskCache = None
 
 class SLMHandler:
-    def __init__(self, model_path="models/tiny_model.gguf"):
+    def __init__(self, model_path="models/tiny_model.gguf", n_ctx=2048, n_threads=None,
+                 prompt_cache="ram", prompt_cache_bytes=512 * 1024 * 1024, prompt_cache_dir=None):
         self.model_path = model_path
+        self.n_ctx = n_ctx
+        self.n_threads = n_threads
+        # Prefix-state cache: "ram" (bounded pool), "disk" (persistent) or None
+        self.prompt_cache_type = prompt_cache
+        self.prompt_cache_bytes = prompt_cache_bytes
+        self.prompt_cache_dir = prompt_cache_dir
+        self.prompt_cache = None
+        self.warm_prompt = None
         self.llm = None
         self.load_model()
 
+    def fork(self, n_threads=None):
+        """
+        Another handler on the same GGUF file with its own context (KV cache).
+        llama.cpp memory-maps the weights, so forks share them in the page cache.
+        """
+        handler = SLMHandler(
+            model_path=self.model_path,
+            n_ctx=self.n_ctx,
+            n_threads=n_threads,
+            prompt_cache=self.prompt_cache_type,
+            prompt_cache_bytes=self.prompt_cache_bytes,
+            prompt_cache_dir=self.prompt_cache_dir
+        )
+        if self.warm_prompt is not None:
+            handler.warm_prefix(self.warm_prompt)
+        return handler
+
     def load_model(self):
         if not Llama:
             print("Warning: llama-cpp-python not installed. Using mock SLM.")
@@ -23,19 +54,72 @@ class SLMHandler:
         try:
             self.llm = Llama(
                 model_path=self.model_path,
-                n_ctx=2048,  # Context window
+                n_ctx=self.n_ctx,  # Context window
+                n_threads=self.n_threads,
                 n_gpu_layers=0, # Force CPU for compatibility
+                use_mmap=True,  # Weights shared between contexts via the page cache
                 verbose=False
             )
             print("SLM Model loaded successfully.")
         except Exception as e:
             print(f"Error loading model: {e}")
+            return
+
+        self.setup_prompt_cache()
+
+    def setup_prompt_cache(self):
+        """
+        Attach a llama.cpp state cache. After each completion the evaluated
+        KV state is stored under its tokens; the next prompt restores the
+        state with the longest common token prefix (the system prompt,
+        often plus the same retrieved policy chunks) and only evaluates the
+        remaining suffix.
+        """
+        if self.prompt_cache_type == "disk" and LlamaDiskCache and self.prompt_cache_dir:
+            self.prompt_cache = LlamaDiskCache(cache_dir=self.prompt_cache_dir, capacity_bytes=self.prompt_cache_bytes)
+        elif self.prompt_cache_type == "ram" and LlamaRAMCache:
+            self.prompt_cache = LlamaRAMCache(capacity_bytes=self.prompt_cache_bytes)
+        if self.prompt_cache is not None:
+            self.llm.set_cache(self.prompt_cache)
+
+    def warm_prefix(self, system_prompt):
+        """Evaluate the static system-prompt prefix once and keep its state."""
+        self.warm_prompt = system_prompt
+        if not self.llm or self.prompt_cache is None:
+            return
+        prefix = f"<|system|>\n{system_prompt}"
+        tokens = self.llm.tokenize(prefix.encode("utf-8"))
+        try:
+            self.llm.reset()
+            self.llm.eval(tokens)
+            self.prompt_cache[tokens] = self.llm.save_state()
+            print(f"Cached prompt prefix ({len(tokens)} tokens).")
+        except Exception as e:
+            print(f"Warning: could not warm prompt prefix: {e}")
+
+    def build_prompt(self, system_prompt, user_query):
+        return f"<|system|>\n{system_prompt}</s>\n<|user|>\n{user_query}</s>\n<|assistant|>\n"
+
+    def count_tokens(self, text):
+        """Tokens in `text` according to the model's own tokenizer."""
+        if not self.llm:
+            # Rough estimate for the mock path: ~4 characters per token
+            return len(text) // 4 + 1
+        return len(self.llm.tokenize(text.encode("utf-8"), add_bos=False))
+
+    def context_budget(self, system_prompt, user_query, max_tokens=256, margin=16):
+        """Tokens left for retrieved context once prompt and answer are accounted for."""
+        used = self.count_tokens(self.build_prompt(system_prompt + "\nContext:\n", user_query))
+        return self.n_ctx - max_tokens - used - margin
+
+    def mock_response(self, user_query):
+        return f"[SLM Mock Response] Based on fine-tuned knowledge: Here is a helpful response to '{user_query}'."
 
     def generate_response(self, system_prompt, user_query, max_tokens=256):
         if not self.llm:
-            return f"[SLM Mock Response] Based on fine-tuned knowledge: Here is a helpful response to '{user_query}'."
+            return self.mock_response(user_query)
 
-        prompt = f"<|system|>\n{system_prompt}</s>\n<|user|>\n{user_query}</s>\n<|assistant|>\n"
+        prompt = self.build_prompt(system_prompt, user_query)
         
         output = self.llm(
             prompt, 
@@ -45,6 +129,27 @@ class SLMHandler:
         )
         return output['choices'][0]['text'].strip()
 
+    def stream_response(self, system_prompt, user_query, max_tokens=256):
+        """Yield pieces of the answer as llama.cpp produces them."""
+        if not self.llm:
+            words = self.mock_response(user_query).split(" ")
+            for i, word in enumerate(words):
+                yield word if i == len(words) - 1 else word + " "
+            return
+
+        prompt = self.build_prompt(system_prompt, user_query)
+
+        for chunk in self.llm(
+            prompt,
+            max_tokens=max_tokens,
+            stop=["</s>"],
+            echo=False,
+            stream=True
+        ):
+            text = chunk['choices'][0]['text']
+            if text:
+                yield text
+
 if __name__ == "__main__":
     slm = SLMHandler(model_path="../models/tiny_model.gguf")
     print(slm.generate_response("You are a helpful assistant.", "What is a loan?"))
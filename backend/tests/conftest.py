@@ -0,0 +1,35 @@
+# Shared fixtures. Everything runs offline: the embedder is the hashing
+# stand-in from bench_pipeline.py and the SLM is SLMHandler's mock (no GGUF
+# model under the given path).
+#
+#   python -m pytest backend/tests
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(TESTS_DIR, "..", "src"))
+sys.path.append(os.path.join(TESTS_DIR, "..", "scripts"))
+
+from bench_pipeline import HashingEncoder
+from embedder import EmbeddingService
+from slm import SLMHandler
+
+
+@pytest.fixture
+def embedder():
+    return EmbeddingService(model=HashingEncoder(dim=64), model_name="hashing-64")
+
+
+@pytest.fixture
+def mock_slm(tmp_path):
+    return SLMHandler(model_path=str(tmp_path / "missing.gguf"), prompt_cache=None)
+
+
+def unit_vectors(n, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
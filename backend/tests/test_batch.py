@@ -0,0 +1,106 @@
+import asyncio
+import importlib
+import json
+import os
+import shutil
+
+import httpx
+import pytest
+
+from bench_pipeline import make_embedder
+from slm import SLMHandler
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+DATASET_QUESTION = "What is the eligibility for a Personal Loan?"
+OPEN_QUESTION = "Could you walk me through the steps for disputing a card transaction?"
+
+
+async def post_batches(app_module, requests):
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with app_module.lifespan(app_module.app):
+        assert await asyncio.to_thread(app_module.registry.wait, 60)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as client:
+            results = []
+            for kwargs in requests:
+                response = await client.post("/query/batch", **kwargs)
+                assert response.status_code == 200
+                assert response.headers["content-type"].startswith("application/x-ndjson")
+                results.append([json.loads(line) for line in response.text.splitlines() if line.strip()])
+            return results
+
+
+@pytest.fixture(scope="module")
+def batches(tmp_path_factory):
+    data_dir = tmp_path_factory.mktemp("data")
+    shutil.copytree(os.path.join(DATA_DIR, "knowledge_base"), data_dir / "knowledge_base")
+    shutil.copy(os.path.join(DATA_DIR, "dataset.json"), data_dir / "dataset.json")
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        # The app reads its configuration at import time
+        monkeypatch.setenv("DATA_DIR", str(data_dir))
+        monkeypatch.setenv("WATCH_FILES", "0")
+        monkeypatch.setenv("RESPONSE_CACHE", "0")
+        monkeypatch.setenv("RAG_STORE", "compact")
+        monkeypatch.setenv("LOG_LEVEL", "WARNING")
+        app_module = importlib.import_module("app")
+        app_module.registry.register("embedder", lambda: make_embedder(
+            "hashing",
+            max_batch_size=app_module.EMBED_BATCH_SIZE,
+            max_wait_ms=app_module.EMBED_BATCH_WAIT_MS,
+            max_queue=app_module.EMBED_QUEUE,
+            on_batch=app_module.observe_embed_batch
+        ))
+        app_module.registry.register("slm", lambda: SLMHandler(
+            model_path=str(data_dir / "missing.gguf"), prompt_cache=None
+        ))
+        return asyncio.run(post_batches(app_module, [
+            {"json": [
+                DATASET_QUESTION,
+                {"query": OPEN_QUESTION, "id": "open"},
+                {"query": "bye", "id": 7},
+                {"question": "wrong key"},
+                "  what is the ELIGIBILITY for a personal loan ",
+                42,
+            ]},
+            {
+                "content": "\n".join([json.dumps("thanks"), "{not json", "", json.dumps({"query": OPEN_QUESTION})]),
+                "headers": {"content-type": "application/x-ndjson"},
+            },
+        ]))
+
+
+def test_lines_come_back_in_input_order(batches):
+    for lines in batches:
+        assert [line["index"] for line in lines] == list(range(len(lines)))
+
+
+def test_lines_are_flat_and_carry_ids_only_when_given(batches):
+    lines = batches[0]
+    assert [line.get("id") for line in lines] == [None, "open", 7, None, None, None]
+    assert "id" not in lines[0]
+    for line in lines:
+        assert "result" not in line
+        if "error" not in line:
+            assert set(line) >= {"response", "source", "confidence", "path"}
+    assert lines[0]["source"] == "dataset" and lines[0]["path"] == "exact"
+    assert lines[1]["path"] in ("rag", "slm", "fallback")
+
+
+def test_invalid_items_get_an_error_line(batches):
+    lines = batches[0]
+    for line in (lines[3], lines[5]):
+        assert line["error"] == 'Expected a string or an object with a "query" string.'
+        assert "response" not in line
+    assert batches[1][1]["error"] == "Line is not valid JSON."
+
+
+def test_repeated_questions_share_one_answer(batches):
+    lines = batches[0]
+    assert lines[4]["response"] == lines[0]["response"]
+    assert batches[1][2]["response"] == lines[1]["response"]
+
+
+def test_small_talk_gets_a_fitting_reply(batches):
+    farewell, thanks = batches[0][2], batches[1][0]
+    assert farewell["path"] == thanks["path"] == "smalltalk"
+    assert farewell["response"].startswith("Goodbye")
+    assert thanks["response"].startswith("You're welcome")
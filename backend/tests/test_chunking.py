@@ -0,0 +1,66 @@
+from chunking import TextChunker, split_sentences, approx_token_count
+from rag import RAGEngine
+
+
+def sentences(n, words=8):
+    return [f"Clause {i} says " + " ".join(f"term{i}x{j}" for j in range(words - 4)) + " applies." for i in range(n)]
+
+
+def test_chunks_respect_the_budget_and_overlap():
+    chunker = TextChunker(max_tokens=40, overlap_tokens=12)
+    text = sentences(20)
+    chunks = list(chunker.chunk([" ".join(text[:10]), " ".join(text[10:])]))
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert approx_token_count(chunk) <= 40 + len(split_sentences(chunk))
+    # Consecutive chunks share the trailing sentence(s) of the first
+    for previous, following in zip(chunks, chunks[1:]):
+        assert split_sentences(previous)[-1] in split_sentences(following)
+    # Nothing is dropped
+    covered = {sentence for chunk in chunks for sentence in split_sentences(chunk)}
+    assert covered == set(text)
+
+
+def test_oversized_sentence_is_split_into_word_windows():
+    chunker = TextChunker(max_tokens=20, overlap_tokens=0)
+    long_sentence = " ".join(f"word{i}" for i in range(100)) + "."
+    chunks = list(chunker.chunk([long_sentence]))
+    assert len(chunks) > 1
+    assert " ".join(chunks).split() == long_sentence.split()
+
+
+def test_short_paragraphs_are_merged():
+    chunker = TextChunker(max_tokens=100, overlap_tokens=0)
+    assert list(chunker.chunk(["Short one.", "Short two."])) == ["Short one. Short two."]
+
+
+def write_kb(path, paragraphs):
+    path.mkdir(exist_ok=True)
+    (path / "policy.txt").write_text("\n\n".join(paragraphs), encoding="utf-8")
+
+
+def test_chunk_ids_are_content_addressed_and_reingestion_is_incremental(tmp_path, embedder):
+    kb = tmp_path / "kb"
+    paragraphs = [" ".join(sentences(6)[i:i + 3]) for i in range(0, 6, 3)] + [" ".join(sentences(3, words=10))]
+    write_kb(kb, paragraphs)
+
+    encoded = []
+    encode = embedder.encode
+    embedder.encode = lambda texts, *args, **kwargs: encoded.extend(texts) or encode(texts, *args, **kwargs)
+    rag = RAGEngine(kb_path=str(kb), embedder=embedder, db_path=str(tmp_path / "chroma_db"), store="compact",
+                    cache_dir=str(tmp_path / "cache"), chunk_tokens=30, overlap_tokens=0)
+    before = {chunk_id: text for chunk_id, text, _ in rag.iter_chunks()}
+    assert rag.last_ingest["added"] == len(before) == len(set(encoded))
+
+    # The same files always give the same ids
+    assert {chunk_id for chunk_id, _, _ in rag.iter_chunks()} == set(before)
+
+    # Editing the last paragraph only changes (and re-embeds) its chunks
+    encoded.clear()
+    write_kb(kb, paragraphs[:-1] + ["A completely new paragraph about gold loan foreclosure charges."])
+    stats = rag.ingest_documents()
+    after = {chunk_id: text for chunk_id, text, _ in rag.iter_chunks()}
+    kept = set(before) & set(after)
+    assert kept and stats["added"] == len(set(after) - kept) and stats["removed"] == len(set(before) - kept)
+    assert set(encoded) == {after[chunk_id] for chunk_id in set(after) - kept}
+    assert "gold loan foreclosure charges" in rag.retrieve("gold loan foreclosure charges", n_results=1)[0]
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from conftest import unit_vectors
+from index import build_index, search_batch, hnswlib
+
+
+def clustered(n=4000, dim=64, clusters=40, seed=0):
+    # Intents come in families of paraphrases; queries are noisy copies of rows
+    rng = np.random.default_rng(seed)
+    centers = unit_vectors(clusters, dim, seed)
+    data = centers[rng.integers(0, clusters, n)] + 0.35 * rng.standard_normal((n, dim)).astype(np.float32)
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    queries = data[rng.choice(n, 200, replace=False)] + 0.05 * rng.standard_normal((200, dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return data.astype(np.float32), queries.astype(np.float32)
+
+
+def recall(index, exact, queries, k):
+    found = 0
+    for query in queries:
+        expected = set(exact.search(query, k)[0].tolist())
+        found += len(expected & set(index.search(query, k)[0].tolist()))
+    return found / (k * len(queries))
+
+
+@pytest.fixture(scope="module")
+def data():
+    return clustered()
+
+
+def test_exact_batch_search_matches_single_search(data):
+    vectors, queries = data
+    exact = build_index(vectors, "exact")
+    rows, scores = search_batch(exact, queries, k=5)
+    for query, batch_rows, batch_scores in zip(queries, rows, scores):
+        single_rows, single_scores = exact.search(query, k=5)
+        assert batch_rows.tolist() == single_rows.tolist()
+        np.testing.assert_allclose(batch_scores, single_scores, rtol=1e-5)
+
+
+def test_ivf_default_nprobe_keeps_recall(data):
+    vectors, queries = data
+    exact = build_index(vectors, "exact")
+    ivf = build_index(vectors, "ivf")
+    assert ivf.nprobe == ivf.nlist // 4
+    assert recall(ivf, exact, queries, k=1) >= 0.95
+    # One copy of the vectors, in list order
+    assert not hasattr(ivf, "vectors") and ivf.list_vectors.shape == vectors.shape
+
+
+def test_ivf_probing_every_list_is_exact(data):
+    vectors, queries = data
+    exact = build_index(vectors, "exact")
+    ivf = build_index(vectors, "ivf", nlist=16, nprobe=16)
+    assert recall(ivf, exact, queries, k=10) == 1.0
+
+
+@pytest.mark.parametrize("index_type", ["fp16", "int8", "pq"])
+def test_quantized_indexes_with_rerank(data, index_type):
+    vectors, queries = data
+    exact = build_index(vectors, "exact")
+    index = build_index(vectors, index_type)
+    assert index.nbytes < vectors.nbytes
+    # Product quantisation is lossy even after the re-rank
+    assert recall(index, exact, queries, k=10) >= (0.7 if index_type == "pq" else 0.98)
+
+
+@pytest.mark.skipif(hnswlib is None, reason="hnswlib is not installed")
+def test_hnsw_recall(data):
+    vectors, queries = data
+    exact = build_index(vectors, "exact")
+    assert recall(build_index(vectors, "hnsw"), exact, queries, k=10) >= 0.95
@@ -0,0 +1,113 @@
+import time
+
+import numpy as np
+import pytest
+
+from conftest import unit_vectors
+from response_cache import SemanticCache, RedisCacheStore
+
+
+def near(vector, seed=1, noise=0.01):
+    other = vector + noise * unit_vectors(1, vector.shape[0], seed)[0]
+    return other / np.linalg.norm(other)
+
+
+def test_lookup_hits_above_threshold_only():
+    cache = SemanticCache(threshold=0.9)
+    vectors = unit_vectors(2)
+    cache.put(vectors[0], "cached answer", "rag")
+    hit = cache.lookup(near(vectors[0]))
+    assert hit["response"] == "cached answer" and hit["source"] == "rag" and hit["score"] >= 0.9
+    assert cache.lookup(vectors[1]) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_lookup_matches_brute_force_under_churn():
+    cache = SemanticCache(threshold=0.5, max_entries=8, ttl=0)
+    vectors = unit_vectors(60, seed=2)
+    queries = unit_vectors(60, seed=3)
+    for i, vector in enumerate(vectors):
+        cache.put(vector, f"answer {i}", "rag")
+        live = {entry.response: entry.vector for entry in cache._entries.values()}
+        best = max(live, key=lambda response: live[response] @ queries[i])
+        hit = cache.lookup(queries[i])
+        if live[best] @ queries[i] >= 0.5:
+            assert hit["response"] == best
+        else:
+            assert hit is None
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = SemanticCache(threshold=0.9, max_entries=3)
+    vectors = unit_vectors(4)
+    for i in range(3):
+        cache.put(vectors[i], f"answer {i}", "rag")
+    assert cache.lookup(vectors[0])["response"] == "answer 0"
+    cache.put(vectors[3], "answer 3", "rag")
+    assert cache.lookup(vectors[1]) is None
+    assert cache.lookup(vectors[0])["response"] == "answer 0"
+    assert cache.stats()["entries"] == 3 and cache.stats()["evictions"] == 1
+
+
+def test_byte_bound():
+    cache = SemanticCache(max_entries=100, max_bytes=2000)
+    for vector in unit_vectors(10):
+        cache.put(vector, "x" * 500, "rag")
+    stats = cache.stats()
+    assert stats["bytes"] <= 2000 and stats["entries"] == 3
+    # An answer larger than the whole budget is not cached at all
+    cache.put(unit_vectors(1, seed=5)[0], "x" * 5000, "rag")
+    assert cache.stats()["entries"] == 3
+
+
+def test_expired_entries_are_swept_before_search():
+    cache = SemanticCache(threshold=0.9, max_entries=4, ttl=0.1)
+    vector = unit_vectors(1)[0]
+    cache.put(vector, "stale", "rag")
+    time.sleep(0.15)
+    cache.put(near(vector), "fresh", "rag")
+    # The stale entry is the closer one, but must neither answer nor hide "fresh"
+    assert cache.lookup(vector)["response"] == "fresh"
+    assert cache.stats()["entries"] == 1 and cache.stats()["expirations"] == 1
+
+    for i, other in enumerate(unit_vectors(3, seed=7)):
+        cache.put(other, f"answer {i}", "rag")
+    time.sleep(0.15)
+    cache.put(unit_vectors(1, seed=8)[0], "new", "rag")
+    # Expired rows made room; no live entry was evicted
+    assert cache.stats()["entries"] == 1 and cache.stats()["evictions"] == 0
+
+
+def test_clear():
+    cache = SemanticCache(threshold=0.9)
+    vector = unit_vectors(1)[0]
+    cache.put(vector, "before", "rag")
+    cache.clear()
+    assert cache.lookup(vector) is None
+    cache.put(vector, "after", "rag")
+    assert cache.lookup(vector)["response"] == "after"
+
+
+def test_shared_store_propagates_puts_and_clears(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    import redis
+
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis.Redis, "from_url", staticmethod(lambda url: fakeredis.FakeRedis(server=server)))
+
+    def worker():
+        return SemanticCache(threshold=0.9, max_entries=8, shared=RedisCacheStore("redis://test", max_entries=8))
+
+    first, second = worker(), worker()
+    vectors = unit_vectors(20)
+    first.put(vectors[0], "from first", "rag")
+    assert second.lookup(vectors[0])["response"] == "from first"
+
+    for i in range(1, 20):
+        first.put(vectors[i], f"answer {i}", "rag")
+    late = worker()
+    assert late.lookup(vectors[19])["response"] == "answer 19"
+    assert late.stats()["entries"] == 8
+
+    second.clear()
+    assert first.lookup(vectors[19]) is None and late.lookup(vectors[19]) is None
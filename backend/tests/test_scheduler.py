@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from executor import PoolSaturated
+from scheduler import InferenceScheduler, GenerationCancelled, DeadlineExceeded
+
+
+class ScriptedSlot:
+    """Streams `tokens` pieces, `delay` seconds apart; raises on the query "boom"."""
+
+    def __init__(self, tokens=5, delay=0.0):
+        self.tokens = tokens
+        self.delay = delay
+        self.started = threading.Event()
+        self.release = None
+        self.order = []
+
+    def stream_response(self, system_prompt, user_query, max_tokens=256):
+        self.order.append(user_query)
+        self.started.set()
+        if self.release is not None:
+            self.release.wait(5)
+        for i in range(self.tokens):
+            time.sleep(self.delay)
+            yield f"t{i} "
+            if user_query == "boom":
+                raise RuntimeError("decode failed")
+
+
+def make_scheduler(slot, **kwargs):
+    outcomes = []
+    scheduler = InferenceScheduler(slot, on_finish=lambda request, outcome: outcomes.append(outcome), **kwargs)
+    return scheduler, outcomes
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_mock_slm_generation_completes(mock_slm):
+    scheduler, outcomes = make_scheduler(mock_slm)
+    try:
+        answer = asyncio.run(scheduler.generate("system", "What is an EMI?"))
+    finally:
+        scheduler.shutdown()
+    assert answer == mock_slm.mock_response("What is an EMI?")
+    assert outcomes == ["completed"]
+    stats = scheduler.stats()
+    assert stats["completed"] == 1 and stats["tokens"] > 0 and stats["tokens_per_second"] > 0
+
+
+def test_failed_generation_is_an_error_not_a_completion():
+    scheduler, outcomes = make_scheduler(ScriptedSlot())
+    try:
+        request = scheduler.submit("system", "boom")
+        with pytest.raises(RuntimeError):
+            request.future.result(5)
+        wait_for(lambda: outcomes)
+    finally:
+        scheduler.shutdown()
+    stats = scheduler.stats()
+    assert outcomes == ["error"]
+    assert stats["error"] == 1 and stats["completed"] == 0
+    assert stats["tokens"] == 0 and stats["decode_seconds"] == 0.0
+
+
+def test_cancel_stops_generation_between_tokens():
+    slot = ScriptedSlot(tokens=200, delay=0.005)
+    scheduler, outcomes = make_scheduler(slot)
+    try:
+        request = scheduler.submit("system", "long answer")
+        slot.started.wait(5)
+        request.cancel()
+        with pytest.raises(GenerationCancelled):
+            request.future.result(5)
+        wait_for(lambda: outcomes)
+    finally:
+        scheduler.shutdown()
+    assert outcomes == ["cancelled"]
+    assert request.timings["tokens"] < 200
+
+
+def test_deadline_expires_while_queued_and_during_generation():
+    slot = ScriptedSlot(tokens=100, delay=0.01)
+    slot.release = threading.Event()
+    scheduler, outcomes = make_scheduler(slot)
+    try:
+        running = scheduler.submit("system", "first", deadline=0.2)
+        slot.started.wait(5)
+        queued = scheduler.submit("system", "second", deadline=0.05)
+        time.sleep(0.1)
+        slot.release.set()
+        with pytest.raises(DeadlineExceeded):
+            running.future.result(5)
+        with pytest.raises(DeadlineExceeded):
+            queued.future.result(5)
+        wait_for(lambda: scheduler.stats()["expired"] == 2)
+    finally:
+        scheduler.shutdown()
+    # The queued request was dropped without reaching the model, so only
+    # the running one was reported to on_finish
+    assert slot.order == ["first"]
+    assert outcomes == ["expired"]
+
+
+def test_priority_order_and_full_queue():
+    slot = ScriptedSlot(tokens=1)
+    slot.release = threading.Event()
+    scheduler, outcomes = make_scheduler(slot, max_queue=3)
+    try:
+        blocker = scheduler.submit("system", "blocker", tier="slm")
+        slot.started.wait(5)
+        requests = [
+            scheduler.submit("system", "batch", tier="batch"),
+            scheduler.submit("system", "slm", tier="slm"),
+            scheduler.submit("system", "rag", tier="rag"),
+        ]
+        with pytest.raises(PoolSaturated):
+            scheduler.submit("system", "one too many")
+        slot.release.set()
+        for request in [blocker] + requests:
+            request.future.result(5)
+    finally:
+        scheduler.shutdown()
+    assert slot.order == ["blocker", "rag", "slm", "batch"]
+    assert scheduler.stats()["rejected"] == 1
@@ -38,22 +38,52 @@ export default function App() {
     setIsLoading(true);
 
     try {
-      const res = await fetch('http://localhost:8000/query', {
+      // Stream the answer: tokens are appended to the bot message as they arrive
+      const res = await fetch('http://localhost:8000/query/stream', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ query: userMsg.content })
       });
-      
-      const data = await res.json();
-      
+      if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`);
+
       const botMsg = { 
         role: 'assistant', 
-        content: data.response, 
-        source: data.source,
-        confidence: data.confidence, 
+        content: '', 
         timestamp: new Date().toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' })
       };
-      setMessages(prev => [...prev, botMsg]);
+      const updateBot = (fields) => setMessages(prev => [...prev.slice(0, -1), { ...prev[prev.length - 1], ...fields }]);
+
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let content = '';
+      let errored = false;
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // SSE events are separated by a blank line
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        for (const raw of events) {
+          const event = raw.match(/^event: (.*)$/m)?.[1];
+          const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] || '{}');
+          if (event === 'meta') {
+            setMessages(prev => [...prev, { ...botMsg, source: data.source, confidence: data.confidence }]);
+            setIsLoading(false);
+          } else if (event === 'token') {
+            content += data.text;
+            updateBot({ content });
+          } else if (event === 'done') {
+            // After an error the backend still sends done; keep the error text
+            if (!errored) updateBot({ content: data.response || content });
+          } else if (event === 'error') {
+            errored = true;
+            updateBot({ content: data.detail, isError: true, source: 'error' });
+          }
+        }
+      }
     } catch (err) {
       setMessages(prev => [...prev, { role: 'assistant', content: "I'm unavailable right now. Please check if the backend is running.", isError: true, source: 'error' }]);
     } finally {